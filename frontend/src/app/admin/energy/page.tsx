@@ -131,6 +131,9 @@ export default function EnergyAuditPage() {
                                     >
                                         <option value="Vestas V90 3MW">Vestas V90 3MW</option>
                                         <option value="Vestas V162 6MW">Vestas V162 6MW</option>
+                                        <option value="Gamesa G90 2MW">Gamesa G90 2MW</option>
+                                        <option value="Enercon E-82 2.3MW">Enercon E-82 2.3MW</option>
+                                        <option value="Nordex N149 5.7MW">Nordex N149 5.7MW</option>
                                     </select>
                                 </div>
                                 <div>
@@ -2,49 +2,86 @@ import { NextRequest, NextResponse } from 'next/server';
 import { spawn } from 'child_process';
 import path from 'path';
 
+// Long audits should be submitted as jobs (job_submit); this only guards against a hung server
+const PY_SERVICE_TIMEOUT_MS = Number(process.env.PY_SERVICE_TIMEOUT_MS || 300000);
+
 export async function POST(req: NextRequest) {
     try {
         const body = await req.json();
 
-        // Path to python script
-        // In development, services is at root. In production, this needs adjustment.
-        // Assuming we run 'npm run dev' from 'frontend' folder, services is '../services'
-        const scriptPath = path.resolve(process.cwd(), '../services/api_wrapper.py');
-
-        return new Promise((resolve) => {
-            const pythonProcess = spawn('python', [scriptPath]);
-
-            let dataString = '';
-            let errorString = '';
-
-            // Send data to python script via stdin
-            pythonProcess.stdin.write(JSON.stringify(body));
-            pythonProcess.stdin.end();
-
-            pythonProcess.stdout.on('data', (data) => {
-                dataString += data.toString();
-            });
-
-            pythonProcess.stderr.on('data', (data) => {
-                errorString += data.toString();
-            });
-
-            pythonProcess.on('close', (code) => {
-                if (code !== 0) {
-                    console.error('Python script error:', errorString);
-                    resolve(NextResponse.json({ error: errorString }, { status: 500 }));
-                } else {
-                    try {
-                        const jsonResult = JSON.parse(dataString);
-                        resolve(NextResponse.json(jsonResult));
-                    } catch (e) {
-                        console.error('JSON parse error:', dataString);
-                        resolve(NextResponse.json({ error: 'Invalid JSON from Python script', raw: dataString }, { status: 500 }));
-                    }
+        // Persistent Python server (services/api_server.py). When configured,
+        // requests skip the per-call interpreter spawn below.
+        const serviceUrl = process.env.PY_SERVICE_URL;
+        if (serviceUrl) {
+            let response: Response;
+            try {
+                response = await fetch(serviceUrl, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(body),
+                    signal: AbortSignal.timeout(PY_SERVICE_TIMEOUT_MS)
+                });
+            } catch (error) {
+                if (error instanceof Error && error.name === 'TimeoutError') {
+                    return NextResponse.json({ error: 'Python service timed out' }, { status: 504 });
                 }
-            });
-        });
+                // Server down or unreachable: run the request in a spawned interpreter instead
+                console.error('Python service unreachable, falling back to spawn:', error);
+                return runSpawned(body);
+            }
+
+            const text = await response.text();
+            try {
+                return NextResponse.json(JSON.parse(text), { status: response.status });
+            } catch (e) {
+                console.error('JSON parse error:', text);
+                return NextResponse.json({ error: 'Invalid JSON from Python service', raw: text }, { status: 502 });
+            }
+        }
+
+        return runSpawned(body);
     } catch (error) {
         return NextResponse.json({ error: 'Internal Server Error' }, { status: 500 });
     }
 }
+
+function runSpawned(body: unknown): Promise<NextResponse> {
+    // Path to python script
+    // In development, services is at root. In production, this needs adjustment.
+    // Assuming we run 'npm run dev' from 'frontend' folder, services is '../services'
+    const scriptPath = path.resolve(process.cwd(), '../services/api_wrapper.py');
+
+    return new Promise((resolve) => {
+        const pythonProcess = spawn('python', [scriptPath]);
+
+        let dataString = '';
+        let errorString = '';
+
+        // Send data to python script via stdin
+        pythonProcess.stdin.write(JSON.stringify(body));
+        pythonProcess.stdin.end();
+
+        pythonProcess.stdout.on('data', (data) => {
+            dataString += data.toString();
+        });
+
+        pythonProcess.stderr.on('data', (data) => {
+            errorString += data.toString();
+        });
+
+        pythonProcess.on('close', (code) => {
+            if (code !== 0) {
+                console.error('Python script error:', errorString);
+                resolve(NextResponse.json({ error: errorString }, { status: 500 }));
+            } else {
+                try {
+                    const jsonResult = JSON.parse(dataString);
+                    resolve(NextResponse.json(jsonResult));
+                } catch (e) {
+                    console.error('JSON parse error:', dataString);
+                    resolve(NextResponse.json({ error: 'Invalid JSON from Python script', raw: dataString }, { status: 500 }));
+                }
+            }
+        });
+    });
+}
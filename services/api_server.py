@@ -0,0 +1,131 @@
+"""
+Persistent API Server for the Python services.
+
+Runs the same {action, data} contract as api_wrapper.main(), but inside a
+long-lived process, so the interpreter, the imported modules (pandas, pvlib,
+requests...) and the auditor instances stay warm between requests.
+
+Usage:
+    python api_server.py --port 8765 --workers 4 --preload
+
+The Next.js bridge (/api/py-bridge) uses it when PY_SERVICE_URL is set,
+e.g. PY_SERVICE_URL=http://127.0.0.1:8765
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import api_wrapper
+import metrics
+
+MAX_BODY_BYTES = 10 * 1024 * 1024  # Census uploads are passed by path, not inline
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that handles each connection on a bounded worker pool.
+    ThreadingHTTPServer would spawn one thread per request with no limit.
+    """
+
+    def __init__(self, server_address, handler_class, workers: int = 4):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SOCMServices/1.0"
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json({"status": "ok", "workers": self.server.workers})
+        elif self.path == "/metrics":
+            body = metrics.REGISTRY.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json({"error": "Not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self._send_json({"error": "No input data provided"}, status=400)
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json({"error": "Request too large"}, status=413)
+            return
+
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._send_json({"error": f"Invalid JSON: {e}"}, status=400)
+            return
+        if not isinstance(request, dict):
+            self._send_json({"error": "Request must be a JSON object"}, status=400)
+            return
+
+        self._send_json(api_wrapper.dispatch(request))
+
+    def log_message(self, format, *args):
+        # stdout is reserved for results in the one-shot mode; keep logs on stderr
+        sys.stderr.write("%s - %s\n" % (self.address_string(), format % args))
+
+
+def run_server(host: str = "127.0.0.1", port: int = 8765, workers: int = 4,
+               preload: bool = False, job_workers: int = 2):
+    # Long audits submitted via job_submit run here, off the request workers
+    api_wrapper.enable_job_workers(job_workers)
+
+    if preload:
+        warmed = api_wrapper.warm_up()
+        print(f"Preloaded modules: {', '.join(warmed) or 'none'}", file=sys.stderr)
+
+    server = PooledHTTPServer((host, port), APIRequestHandler, workers=workers)
+    print(f"API server listening on http://{host}:{port} ({workers} workers)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent server for api_wrapper actions")
+    parser.add_argument("--host", default=os.environ.get("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", 8765)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("API_WORKERS", 4)))
+    parser.add_argument("--job-workers", type=int, default=int(os.environ.get("API_JOB_WORKERS", 2)))
+    parser.add_argument("--preload", action="store_true", help="Import heavy modules before serving")
+    args = parser.parse_args()
+
+    run_server(args.host, args.port, args.workers, args.preload, args.job_workers)
@@ -1,18 +1,38 @@
 import sys
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from result_cache import ResultCache
 
 # Lazy imports are used inside functions to prevent "ModuleNotFoundError"
 # from crashing the entire script if one dependency is missing.
 
+# Service instances are kept here so that a long-lived process (see
+# api_server.py) reuses them across requests instead of rebuilding them.
+# In one-shot mode (stdin -> stdout) they simply live for a single call.
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_instance(key, factory):
+    """Returns the cached instance for `key`, creating it with `factory` once."""
+    with _instances_lock:
+        instance = _instances.get(key)
+        if instance is None:
+            instance = factory()
+            _instances[key] = instance
+        return instance
+
 def handle_energy_audit(data):
     from energy_audit_advanced import AdvancedEnergyAuditor
     # ESIOS Token should ideally come from env vars
-    token = os.environ.get("ESIOS_TOKEN", None) 
-    auditor = AdvancedEnergyAuditor(esios_token=token)
-    
+    token = os.environ.get("ESIOS_TOKEN", None)
+    auditor = get_instance(("energy_audit", token), lambda: AdvancedEnergyAuditor(esios_token=token))
+
     if data.get("type") == "wind":
-        return auditor.audit_wind_park(
+        return auditor.audit_wind_historical(
             lat=float(data["lat"]),
             lon=float(data["lon"]),
             turbine_model=data["turbine_model"],
@@ -22,7 +42,7 @@ def handle_energy_audit(data):
             company_payment=float(data["company_payment"])
         )
     else:
-        return auditor.audit_solar_park(
+        return auditor.audit_solar_historical(
             lat=float(data["lat"]),
             lon=float(data["lon"]),
             peak_power_kwp=float(data["peak_power_kwp"]),
@@ -41,20 +61,20 @@ def handle_census_import(data):
     file_path = data.get("file_path")
     if not file_path:
         return {"error": "Missing file_path"}
-    
+
     return run_import(file_path)
 
 def handle_document_generation(data):
     from document_generator import DocumentGenerator
-    generator = DocumentGenerator()
+    generator = get_instance("generate_document", DocumentGenerator)
     doc_type = data.get("type")
-    
+
     try:
         if doc_type == "minutes":
             path = generator.generate_minutes_pdf(
                 title=data["title"],
                 date=data["date"],
-                attendees=data["attendees"], 
+                attendees=data["attendees"],
                 content=data["content"]
             )
         elif doc_type == "request":
@@ -65,16 +85,264 @@ def handle_document_generation(data):
             )
         else:
             return {"error": "Invalid document type"}
-            
+
         return {"status": "success", "file_path": path, "download_url": f"/api/download?path={path}"}
-        
+
     except Exception as e:
         return {"error": f"Generation failed: {str(e)}"}
 
-def handle_deep_audit(data):
+def handle_deep_audit(data, progress=None):
     from energy_audit_deep_research import DeepResearchAuditor
-    auditor = DeepResearchAuditor()
-    return auditor.run_audit(data)
+    token = os.environ.get("ESIOS_TOKEN", None)
+    auditor = get_instance(("deep_audit", token), lambda: DeepResearchAuditor(esios_token=token))
+    return auditor.run_audit(data, progress=progress)
+
+def handle_portfolio_audit(data, progress=None):
+    from portfolio_audit import PortfolioAuditor
+    token = os.environ.get("ESIOS_TOKEN", None)
+    auditor = get_instance(("portfolio_audit", token), lambda: PortfolioAuditor(esios_token=token))
+    return auditor.run(data, progress=progress)
+
+def handle_screening(data, progress=None):
+    from screening import RegionalScreener
+    token = os.environ.get("ESIOS_TOKEN", None)
+    screener = get_instance(("screening", token), lambda: RegionalScreener(esios_token=token))
+    return screener.run(data, progress=progress)
+
+def handle_uncertainty_audit(data, progress=None):
+    from uncertainty import UncertaintyAuditor
+    token = os.environ.get("ESIOS_TOKEN", None)
+    auditor = get_instance(("uncertainty_audit", token), lambda: UncertaintyAuditor(esios_token=token))
+    return auditor.run(data, progress=progress)
+
+def handle_solar_orientation(data, progress=None):
+    from solar_orientation import OrientationOptimizer
+    token = os.environ.get("ESIOS_TOKEN", None)
+    optimizer = get_instance(("solar_orientation", token), lambda: OrientationOptimizer(esios_token=token))
+    return optimizer.run(data, progress=progress)
+
+def handle_repowering(data, progress=None):
+    from repowering import RepoweringComparator
+    token = os.environ.get("ESIOS_TOKEN", None)
+    comparator = get_instance(("repowering", token), lambda: RepoweringComparator(esios_token=token))
+    return comparator.run(data, progress=progress)
+
+def handle_streaming_audit(data, progress=None):
+    from streaming_audit import StreamingAuditor
+    token = os.environ.get("ESIOS_TOKEN", None)
+    auditor = get_instance(("streaming_audit", token), lambda: StreamingAuditor(esios_token=token))
+    return auditor.run(data, progress=progress)
+
+def handle_metrics(data):
+    return {
+        "content_type": "text/plain; version=0.0.4",
+        "metrics": metrics.REGISTRY.render_prometheus()
+    }
+
+def handle_canon_update(data):
+    from canon_indexer import CanonIndexer
+    indexer = get_instance("canon_update", CanonIndexer)
+    return indexer.calculate_update(
+        float(data.get('current_canon')),
+        data.get('old_date'),
+        data.get('new_date')
+    )
+
+# --- ASYNC JOBS (job_queue.py) ---
+# Actions that accept a progress(stage, fraction) callback when run as a job.
+PROGRESS_ACTIONS = {
+    "deep_audit": handle_deep_audit,
+    "portfolio_audit": handle_portfolio_audit,
+    "screening": handle_screening,
+    "uncertainty_audit": handle_uncertainty_audit,
+    "solar_orientation": handle_solar_orientation,
+    "repowering": handle_repowering,
+    "streaming_audit": handle_streaming_audit,
+}
+
+# Set by api_server.py: jobs then run on an in-process worker pool.
+# Otherwise each job is handed to a detached runner process.
+_job_queue = None
+
+def run_job_action(action, data, progress):
+    """Runner used by the job queue for a single stored job."""
+    if action not in PROGRESS_ACTIONS:
+        progress("started", 0.0)
+    # Same path as a direct request: result cache and metrics included
+    return dispatch({"action": action, "data": data}, progress=progress)
+
+def enable_job_workers(workers):
+    global _job_queue
+    from job_queue import JobQueue
+    _job_queue = JobQueue(run_job_action, workers=workers)
+    return _job_queue
+
+def handle_job_submit(data):
+    from job_queue import JobStore, spawn_detached_runner
+    action = data.get("action")
+    if action not in ACTIONS or action.startswith("job_"):
+        return {"error": f"Action cannot be queued: {action}"}
+
+    job_data = data.get("data") or {}
+    if _job_queue is not None:
+        job_id = _job_queue.submit(action, job_data)
+    else:
+        store = get_instance("job_store", JobStore)
+        job_id = store.create(action, job_data)
+        spawn_detached_runner(job_id, store.db_path)
+
+    return {"job_id": job_id, "status": "queued"}
+
+def handle_job_status(data):
+    from job_queue import JobStore, format_job
+    store = _job_queue.store if _job_queue is not None else get_instance("job_store", JobStore)
+    job = store.get(data.get("job_id", ""))
+    if job is None:
+        return {"error": f"Unknown job: {data.get('job_id')}"}
+    return format_job(job)
+
+ACTIONS = {
+    "energy_audit": handle_energy_audit,
+    "import_census": handle_census_import,
+    "generate_document": handle_document_generation,
+    "deep_audit": handle_deep_audit,
+    "portfolio_audit": handle_portfolio_audit,
+    "screening": handle_screening,
+    "uncertainty_audit": handle_uncertainty_audit,
+    "solar_orientation": handle_solar_orientation,
+    "repowering": handle_repowering,
+    "streaming_audit": handle_streaming_audit,
+    "canon_update": handle_canon_update,
+    "job_submit": handle_job_submit,
+    "job_status": handle_job_status,
+    "metrics": handle_metrics,
+}
+
+def dispatch(request, progress=None):
+    """
+    Runs a single {action, data} request and returns the JSON-able result.
+    Shared by the one-shot stdin mode, the persistent server and the job
+    queue (which passes `progress` on to PROGRESS_ACTIONS handlers).
+    A {"batch": [...]} envelope is fanned out by handle_batch().
+
+    Cacheable actions go through the result cache; "no_cache": true in the
+    envelope forces a fresh computation (and refreshes the cached entry).
+    "timings": true attaches the per-call latency breakdown as `_timings`.
+    "profile": true (or an options dict, see profiling.py) runs the handler
+    under a profiler and attaches the report as `_profile`.
+    """
+    if "batch" in request:
+        return handle_batch(request)
+
+    try:
+        action = request.get("action")
+        data = request.get("data")
+
+        handler = ACTIONS.get(action)
+        if handler is None:
+            return {"error": f"Unknown action: {action}"}
+
+        if progress is not None and action in PROGRESS_ACTIONS:
+            call = lambda: PROGRESS_ACTIONS[action](data, progress=progress)
+        else:
+            call = lambda: handler(data)
+        compute = call
+        profile_options = request.get("profile")
+        profile_report = None
+        if profile_options:
+            from profiling import run_profiled
+
+            def compute():
+                nonlocal profile_report
+                result, profile_report = run_profiled(call, profile_options, label=action)
+                return result
+
+        cache = get_instance("result_cache", ResultCache)
+        with metrics.track_action(action) as timings:
+            # A cache hit would leave nothing to profile
+            result, timings.cache_status = cache.get_or_compute(
+                action, data, compute, bypass=bool(request.get("no_cache") or profile_options)
+            )
+            timings.failed = isinstance(result, dict) and "error" in result
+
+        if request.get("timings") and isinstance(result, dict):
+            result = dict(result, _timings=timings.as_dict())
+        if profile_report is not None and isinstance(result, dict):
+            result = dict(result, _profile=profile_report)
+        return result
+
+    except Exception as e:
+        return {"error": str(e)}
+
+MAX_BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", 8))
+
+def _run_batch_item(item):
+    if not isinstance(item, dict) or "batch" in item:
+        return {"error": "Invalid batch item"}
+    return dispatch(item)
+
+def handle_batch(request):
+    """
+    Runs a list of {id, action, data} items concurrently on a thread pool.
+
+    Results come back in the same order as the input, each tagged with its
+    client `id`. A failing item only marks that entry as an error.
+
+    Example:
+        {"batch": [{"id": "q1", "action": "canon_update", "data": {...}}, ...],
+         "max_workers": 4}
+    """
+    items = request.get("batch")
+    if not isinstance(items, list):
+        return {"error": "batch must be a list of {id, action, data} objects"}
+    if not items:
+        return {"batch": [], "succeeded": 0, "failed": 0}
+
+    try:
+        max_workers = int(request.get("max_workers") or MAX_BATCH_WORKERS)
+    except (TypeError, ValueError):
+        return {"error": "max_workers must be a positive integer"}
+    if max_workers < 1:
+        return {"error": "max_workers must be a positive integer"}
+    max_workers = min(max_workers, MAX_BATCH_WORKERS, len(items))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+        results = list(executor.map(_run_batch_item, items))
+
+    responses = []
+    for index, (item, result) in enumerate(zip(items, results)):
+        item_id = item.get("id", index) if isinstance(item, dict) else index
+        failed = isinstance(result, dict) and "error" in result
+        responses.append({
+            "id": item_id,
+            "status": "error" if failed else "ok",
+            "result": result
+        })
+
+    return {
+        "batch": responses,
+        "succeeded": sum(1 for r in responses if r["status"] == "ok"),
+        "failed": sum(1 for r in responses if r["status"] == "error")
+    }
+
+# Modules behind every action (import_report.ACTION_MODULES), preloaded by warm_up
+WARM_UP_MODULES = ("canon_indexer", "document_generator", "energy_audit_advanced", "energy_audit_deep_research",
+                   "portfolio_audit", "screening", "uncertainty", "solar_orientation", "repowering",
+                   "streaming_audit")
+
+def warm_up():
+    """
+    Imports the service modules ahead of the first request so the server
+    pays the import cost at startup. Missing dependencies are skipped.
+    """
+    warmed = []
+    for module_name in WARM_UP_MODULES:
+        try:
+            __import__(module_name)
+            warmed.append(module_name)
+        except ImportError as e:
+            print(f"Warm-up skipped {module_name}: {e}", file=sys.stderr)
+    return warmed
 
 def main():
     try:
@@ -85,29 +353,10 @@ def main():
             return
 
         request = json.loads(input_data)
-        action = request.get("action")
-        data = request.get("data")
-
-        result = {}
-        
-        if action == "energy_audit":
-            result = handle_energy_audit(data)
-        elif action == "import_census":
-            result = handle_census_import(data)
-        elif action == "generate_document":
-            result = handle_document_generation(data)
-        elif action == "deep_audit":
-            result = handle_deep_audit(data)
-        elif action == "canon_update":
-            from canon_indexer import CanonIndexer
-            indexer = CanonIndexer()
-            result = indexer.calculate_update(
-                float(data.get('current_canon')),
-                data.get('old_date'),
-                data.get('new_date')
-            )
-        else:
-            result = {"error": f"Unknown action: {action}"}
+        if not isinstance(request, dict):
+            print(json.dumps({"error": "Request must be a JSON object"}))
+            return
+        result = dispatch(request)
 
         # Print result to stdout
         print(json.dumps(result))
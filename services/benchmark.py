@@ -0,0 +1,425 @@
+"""
+Benchmark Suite for the services hot paths.
+
+Every case runs on synthetic, seeded data (no network, no Supabase), at
+several sizes, so we can see how throughput scales with the data:
+
+    simulate_wind / simulate_solar        1-20 years of hourly meteo
+    simulate_wind_layout                  50 turbines with wakes, 1-10 years
+    uncertainty_scenarios                 1k-10k Monte Carlo scenarios over a year
+    solar_orientation                     tilt x azimuth grids over a year of meteo
+    repowering                            model x count x hub height options, 1 year
+    streaming_audit                       1-20 years in month chunks
+    audit_wind_historical                 1-20 years of hourly wind + prices
+    audit_solar_historical                1-20 yearly audits
+    census_validate                       1k-100k census rows (import_census)
+    calculate_update                      bulk canon updates
+    generate_pdf                          batch of meeting minutes PDFs
+
+Usage:
+    python benchmark.py                          # all cases, full sizes
+    python benchmark.py simulate_wind --quick    # small sizes only
+    python benchmark.py --save-baseline          # store results as the baseline
+    python benchmark.py --fail-on-regression     # exit 1 if slower than baseline
+
+Results are written as JSON (--output); when a baseline exists each result is
+compared against it (--tolerance, default 25% slower = regression).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(SERVICES_DIR, ".cache", "benchmarks", "latest.json")
+DEFAULT_BASELINE = os.path.join(SERVICES_DIR, "benchmark_baseline.json")
+DEFAULT_SEED = 42
+DEFAULT_TOLERANCE = 0.25
+
+# Site used by every synthetic case (Galicia, like the examples in the auditors)
+LAT, LON = 42.5, -7.8
+START_YEAR = 2004
+
+
+# --- SYNTHETIC DATA ---
+
+def synthetic_meteo(years: int, seed: int = DEFAULT_SEED):
+    """Hourly meteo DataFrame with the columns DeepResearchAuditor.get_meteo_data returns."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(f"{START_YEAR}-01-01", f"{START_YEAR + years - 1}-12-31 23:00", freq="h")
+    n = len(index)
+    hour = index.hour.to_numpy()
+    doy = index.dayofyear.to_numpy()
+
+    # Weibull-like wind at 100m, 10m slower (shear)
+    wind_100 = rng.weibull(2.0, n) * 8.0
+    wind_10 = wind_100 * rng.uniform(0.55, 0.85, n)
+
+    # Clear-sky-ish bell between 7h and 20h, seasonal amplitude, random clouds
+    daylight = np.clip(np.sin((hour - 6) / 14 * np.pi), 0, None)
+    season = 0.6 + 0.4 * np.sin((doy - 80) / 365 * 2 * np.pi)
+    ghi = 950 * daylight * season * rng.uniform(0.3, 1.0, n)
+    dhi = ghi * rng.uniform(0.15, 0.5, n)
+    dni = np.clip((ghi - dhi) / np.maximum(np.sin(daylight * np.pi / 2), 0.1), 0, 1000)
+    # Prevailing SW wind; own generator so the other columns stay as they were
+    direction = np.mod(225 + np.random.default_rng(seed + 1).normal(0, 60, n), 360)
+
+    return pd.DataFrame({
+        "temp_air": 12 + 8 * np.sin((doy - 110) / 365 * 2 * np.pi) + 4 * daylight + rng.normal(0, 1.5, n),
+        "pressure": 1013 + rng.normal(0, 6, n),
+        "wind_speed_100m": wind_100,
+        "wind_speed_10m": np.maximum(wind_10, 0.1),
+        "ghi": ghi,
+        "dni": dni,
+        "dhi": dhi,
+        "wind_direction_100m": direction
+    }, index=index)
+
+
+def synthetic_wind_hourly(years: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """Hourly wind in the format of AdvancedEnergyAuditor.get_open_meteo_wind."""
+    meteo = synthetic_meteo(years, seed)
+    return [
+        {"datetime": t.strftime("%Y-%m-%dT%H:%M:%S"), "wind_speed_ms": round(float(v), 2)}
+        for t, v in zip(meteo.index, meteo["wind_speed_100m"])
+    ]
+
+
+def synthetic_solar_hourly(year: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """Hourly production in the format of AdvancedEnergyAuditor.get_pvgis_hourly_solar (1 MWp)."""
+    meteo = synthetic_meteo(1, seed + year)
+    index = pd.date_range(f"{year}-01-01 00:10", periods=len(meteo), freq="h")
+    return [
+        {"datetime": t.strftime("%Y-%m-%dT%H:%M:%S"), "production_kwh": round(float(g) * 0.8, 3)}
+        for t, g in zip(index, meteo["ghi"])
+    ]
+
+
+# Valid DNIs are built from the official control letter table
+_DNI_LETTERS = "TRWAGMYFPDXBNJZSQVHLCKE"
+
+
+def synthetic_census(rows: int, seed: int = DEFAULT_SEED, invalid_share: float = 0.1):
+    """Census DataFrame (Name, DNI, Address, Phone) with ~invalid_share broken rows."""
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(0, 100_000_000, rows)
+    dnis = [f"{n:08d}{_DNI_LETTERS[n % 23]}" for n in numbers]
+    broken = rng.random(rows) < invalid_share
+    for i in np.flatnonzero(broken):
+        # Wrong control letter (every third broken row also lacks the address)
+        dnis[i] = dnis[i][:8] + ("A" if dnis[i][8] != "A" else "B")
+    addresses = [f"Lugar de Abaixo {i % 250}, {15000 + i % 900} Lugo" for i in range(rows)]
+    for i in np.flatnonzero(broken)[::3]:
+        addresses[i] = ""
+    return pd.DataFrame({
+        "Name": [f"Comunero {i}" for i in range(rows)],
+        "DNI": dnis,
+        "Address": addresses,
+        "Phone": [f"6{n:08d}" for n in rng.integers(0, 100_000_000, rows)]
+    })
+
+
+# --- CASES ---
+# Each case is setup(size, seed) -> run() -> number of processed units.
+# Setup (synthetic data generation) is not timed.
+
+def _case_simulate_wind(size, seed):
+    from energy_audit_deep_research import DeepResearchAuditor
+    meteo = synthetic_meteo(size, seed)
+    auditor = DeepResearchAuditor()
+    return lambda: len(auditor.simulate_wind(meteo, 10, "Vestas V90 3MW"))
+
+
+def _case_simulate_wind_layout(size, seed):
+    from energy_audit_deep_research import DeepResearchAuditor
+    meteo = synthetic_meteo(size, seed)
+    auditor = DeepResearchAuditor()
+    # 5 rows x 10 turbines, ~500 m apart
+    turbines = [{"id": f"T{i:02d}", "lat": LAT + 0.0045 * (i // 10), "lon": LON + 0.006 * (i % 10),
+                 "model": "Vestas V90 3MW"} for i in range(50)]
+    return lambda: len(auditor.simulate_wind_layout(meteo, turbines)) * len(turbines)
+
+
+def _case_uncertainty_scenarios(size, seed):
+    from uncertainty import DEFAULT_SPREADS, UncertaintyAuditor
+    uncertainty = UncertaintyAuditor()
+    meteo = synthetic_meteo(1, seed)
+    prices = uncertainty.auditor.get_prices(f"{START_YEAR}-01-01", f"{START_YEAR}-12-31")
+    park = {"type": "wind", "turbine_model": "Vestas V90 3MW", "num_turbines": 10}
+    base = uncertainty.park_base(park, meteo, prices)
+    return lambda: len(uncertainty.simulate(base, size, seed, DEFAULT_SPREADS)["revenue_eur"])
+
+
+def _case_solar_orientation(size, seed):
+    from solar_orientation import OrientationOptimizer
+    meteo = synthetic_meteo(1, seed)
+    meteo = meteo[~meteo.index.duplicated()]
+    optimizer = OrientationOptimizer()
+    optimizer.auditor.get_meteo_data = lambda *args: meteo
+    # size = number of fixed orientations (square-ish grid)
+    tilts = list(np.linspace(0, 60, 13))
+    azimuths = list(np.linspace(90, 270, max(1, size // 13)))
+    config = {"lat": LAT, "lon": LON, "start_date": f"{START_YEAR}-01-01", "end_date": f"{START_YEAR}-12-31",
+              "tilts": tilts, "azimuths": azimuths, "tracking": False}
+    return lambda: len(optimizer.run(config)["grid"]["revenue_eur"]) * len(azimuths)
+
+
+def _case_repowering(size, seed):
+    from repowering import RepoweringComparator
+    from turbine_catalog import get_catalog
+    meteo = synthetic_meteo(1, seed)
+    comparator = RepoweringComparator()
+    comparator.auditor.get_meteo_data = lambda *args: meteo
+    # size = number of options: every catalog model x 10 counts x heights
+    models = get_catalog().names()
+    heights = list(np.linspace(100, 160, max(1, size // (10 * len(models)))))
+    options = [{"turbine_model": m, "num_turbines": list(range(1, 11)), "hub_height": heights} for m in models]
+    config = {"lat": LAT, "lon": LON, "start_date": f"{START_YEAR}-01-01", "end_date": f"{START_YEAR}-12-31",
+              "options": options}
+    return lambda: len(comparator.run(config)["options"])
+
+
+def _case_streaming_audit(size, seed):
+    from streaming_audit import StreamingAuditor
+    meteo = synthetic_meteo(size, seed)
+    auditor = StreamingAuditor()
+    auditor.auditor.get_meteo_data = lambda lat, lon, start, end, variables=None: meteo.loc[start:end]
+    config = {"type": "wind", "lat": LAT, "lon": LON, "turbine_model": "Vestas V90 3MW", "num_turbines": 10,
+              "start_date": f"{START_YEAR}-01-01", "end_date": f"{START_YEAR + size - 1}-12-31",
+              "chunk": "month", "rollup": "month", "company_payment": 1_000_000}
+    return lambda: auditor.run(config)["hours"]
+
+
+def _case_simulate_solar(size, seed):
+    from energy_audit_deep_research import DeepResearchAuditor
+    meteo = synthetic_meteo(size, seed)
+    auditor = DeepResearchAuditor()
+    return lambda: len(auditor.simulate_solar(meteo, LAT, LON, 1000))
+
+
+def _case_audit_wind_historical(size, seed):
+    from energy_audit_advanced import AdvancedEnergyAuditor
+    wind = synthetic_wind_hourly(size, seed)
+    auditor = AdvancedEnergyAuditor()
+    # Synthetic wind instead of Open-Meteo; prices come from the built-in mock
+    auditor.get_open_meteo_wind = lambda *args, **kwargs: wind
+
+    def run():
+        auditor.audit_wind_historical(LAT, LON, "Vestas V90 3MW", 10, f"{START_YEAR}-01-01",
+                                      f"{START_YEAR + size - 1}-12-31", company_payment=1_000_000)
+        return len(wind)
+    return run
+
+
+def _case_audit_solar_historical(size, seed):
+    from energy_audit_advanced import AdvancedEnergyAuditor
+    years = range(START_YEAR, START_YEAR + size)
+    solar = {year: synthetic_solar_hourly(year, seed) for year in years}
+    auditor = AdvancedEnergyAuditor()
+    auditor.get_pvgis_hourly_solar = lambda lat, lon, kwp, year: solar[year]
+
+    def run():
+        for year in years:
+            auditor.audit_solar_historical(LAT, LON, 1000, year, company_payment=45000)
+        return sum(len(rows) for rows in solar.values())
+    return run
+
+
+def _case_census_validate(size, seed):
+    from import_census import validate_census
+    census = synthetic_census(size, seed)
+    return lambda: len(sum(validate_census(census.copy()), []))
+
+
+def _case_calculate_update(size, seed):
+    from canon_indexer import CanonIndexer
+    rng = np.random.default_rng(seed)
+    canons = rng.uniform(500, 50_000, size).round(2)
+    indexer = CanonIndexer(use_network=False)
+
+    def run():
+        for canon in canons:
+            indexer.calculate_update(float(canon), "2023-01-01", "2024-01-01")
+        return size
+    return run
+
+
+def _case_generate_pdf(size, seed):
+    from document_generator import DocumentGenerator
+    generator = DocumentGenerator()
+    generator.output_dir = tempfile.mkdtemp(prefix="bench_pdf_")
+    attendees = [f"Comunero {i}" for i in range(40)]
+    content = "Se aprueba por unanimidad el reparto del canon eólico. " * 60
+
+    def run():
+        for i in range(size):
+            generator.generate_minutes_pdf(f"Asamblea {i}", f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                                           attendees, content)
+        return size
+    return run
+
+
+# name -> (setup, unit, full sizes, quick sizes)
+CASES = {
+    "simulate_wind": (_case_simulate_wind, "hours", [1, 5, 10, 20], [1, 2]),
+    "simulate_wind_layout": (_case_simulate_wind_layout, "turbine_hours", [1, 5, 10], [1, 2]),
+    "uncertainty_scenarios": (_case_uncertainty_scenarios, "scenarios", [1_000, 10_000], [1_000]),
+    "solar_orientation": (_case_solar_orientation, "orientations", [65, 247, 1_040], [65]),
+    "repowering": (_case_repowering, "options", [50, 200, 500], [50]),
+    "streaming_audit": (_case_streaming_audit, "hours", [1, 5, 10, 20], [1, 2]),
+    "simulate_solar": (_case_simulate_solar, "hours", [1, 5, 10, 20], [1, 2]),
+    "audit_wind_historical": (_case_audit_wind_historical, "hours", [1, 5, 10, 20], [1, 2]),
+    "audit_solar_historical": (_case_audit_solar_historical, "hours", [1, 5, 10, 20], [1, 2]),
+    "census_validate": (_case_census_validate, "rows", [1_000, 10_000, 100_000], [1_000, 5_000]),
+    "calculate_update": (_case_calculate_update, "calls", [100, 1_000, 10_000], [100, 500]),
+    "generate_pdf": (_case_generate_pdf, "documents", [10, 50, 200], [5, 10]),
+}
+
+
+# --- RUNNER ---
+
+def run_case(name: str, size: int, seed: int = DEFAULT_SEED, repeat: int = 3) -> Dict:
+    """
+    Times one case at one size; returns the median/min over `repeat` runs.
+    One untimed warm-up run goes first (lazy imports, pvlib/numpy caches).
+    """
+    setup, unit = CASES[name][0], CASES[name][1]
+    run = setup(size, seed)
+    timings = []
+    units = 0
+    # The services print progress/mock notices on every call; keep them off the report
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        run()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            units = run()
+            timings.append(time.perf_counter() - started)
+
+    median = statistics.median(timings)
+    return {
+        "case": name,
+        "size": size,
+        "unit": unit,
+        "units": units,
+        "repeat": repeat,
+        "median_s": round(median, 6),
+        "min_s": round(min(timings), 6),
+        "throughput_per_s": round(units / median, 1) if median > 0 else None
+    }
+
+
+def run_suite(cases: List[str], quick: bool = False, seed: int = DEFAULT_SEED, repeat: int = 3,
+              on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+    results = []
+    for name in cases:
+        sizes = CASES[name][3] if quick else CASES[name][2]
+        for size in sizes:
+            result = run_case(name, size, seed, repeat)
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "seed": seed,
+            "repeat": repeat,
+            "quick": quick
+        },
+        "results": results
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    Compares median times per (case, size) against the baseline.
+    ratio > 1 means slower than the baseline; above 1 + tolerance is a regression.
+    """
+    reference = {(r["case"], r["size"]): r for r in baseline.get("results", [])}
+    comparison = []
+    for result in results["results"]:
+        base = reference.get((result["case"], result["size"]))
+        if base is None or not base["median_s"]:
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        comparison.append({
+            "case": result["case"],
+            "size": result["size"],
+            "baseline_s": base["median_s"],
+            "current_s": result["median_s"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + tolerance
+        })
+    return comparison
+
+
+def _write_json(path: str, payload: Dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _print_result(result: Dict):
+    print(f"  {result['case']:<24} {result['size']:>8} {result['median_s']:>10.4f} s "
+          f"{result['throughput_per_s'] or 0:>14,.0f} {result['unit']}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the services hot paths (synthetic data)")
+    parser.add_argument("cases", nargs="*", default=list(CASES), help=f"any of: {', '.join(CASES)}")
+    parser.add_argument("--quick", action="store_true", help="small sizes only (smoke run)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    print("=" * 70)
+    print(f"BENCHMARKS (seed {args.seed}, repeat {args.repeat}{', quick' if args.quick else ''})")
+    print("=" * 70)
+    print(f"  {'case':<24} {'size':>8} {'median':>12} {'throughput':>14}")
+    results = run_suite(args.cases, args.quick, args.seed, args.repeat, on_result=_print_result)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            comparison = compare(results, json.load(f), args.tolerance)
+        results["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "results": comparison}
+        regressions = [c for c in comparison if c["regression"]]
+
+        print(f"\nVs baseline ({args.baseline}):")
+        for c in comparison:
+            flag = "  REGRESSION" if c["regression"] else ""
+            print(f"  {c['case']:<24} {c['size']:>8} x{c['ratio']:<6}{flag}")
+
+    _write_json(args.output, results)
+    print(f"\nResults: {args.output}")
+    if args.save_baseline:
+        _write_json(args.baseline, results)
+        print(f"Baseline saved: {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
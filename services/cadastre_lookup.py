@@ -1,6 +1,7 @@
-import requests
 import xml.etree.ElementTree as ET
 
+from http_client import get_http_client
+
 class CadastreLookup:
     def __init__(self):
         self.base_url = "http://ovc.catastro.meh.es/ovcservweb/OVCSWLocalizacionRC/OVCCoordenadas.asmx/Consulta_RCCOOR"
@@ -12,7 +13,7 @@ class CadastreLookup:
         try:
             # SRS=EPSG:4326 requests WGS84 coordinates directly
             url = f"{self.base_url}?SRS=EPSG:4326&RC={rc}"
-            response = requests.get(url, timeout=10)
+            response = get_http_client().get(url)
             response.raise_for_status()
             
             # Parse XML response
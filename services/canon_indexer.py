@@ -1,25 +1,53 @@
-import requests
 import json
+import os
+import sys
 from datetime import datetime, date
 
+from http_client import get_http_client
+from http_replay import replay_enabled
+
 class CanonIndexer:
-    def __init__(self):
+    def __init__(self, use_network=None):
         self.ine_base_url = "https://servicios.ine.es/wstempus/js/es/DATOS_SERIE"
         # Series ID for "Total Nacional. Índice general"
         # Using IPC206449 as the standard linked series code
         self.series_code = "IPC206449" 
+        # The live INE call stays opt-in (CANON_INE_LIVE=1) because the API
+        # tends to hang; it is always on when replaying recorded fixtures.
+        if use_network is None:
+            use_network = os.environ.get("CANON_INE_LIVE") == "1" or replay_enabled()
+        self.use_network = use_network
+
+    def _fetch_ine_data(self):
+        url = f"{self.ine_base_url}/{self.series_code}?tip=AM"
+        r = get_http_client().get(url)
+        r.raise_for_status()
+        data = r.json()
+        if 'Data' not in data:
+            raise Exception("No Data field")
+
+        clean_data = [
+            {'year': point['Anyo'], 'month': point['Mes'], 'value': point['Valor'], 'date_ts': point['Fecha']}
+            for point in data['Data']
+        ]
+        clean_data.sort(key=lambda x: x['date_ts'], reverse=True)
+        return clean_data
 
     def get_ine_data(self):
         """
         Fetches the last 24 months of IPC data from INE API.
         Includes fallback to mock data if API fails.
         """
-        # FORCE MOCK DATA FOR DEBUGGING
-        # The API call seems to hang in this environment.
-        # We will skip the network call for now to ensure functionality.
-        
-        import sys
-        print("Using MOCK data (Network skipped for stability).", file=sys.stderr)
+        if self.use_network:
+            try:
+                return self._fetch_ine_data()
+            except Exception as e:
+                print(f"INE API Error: {e}. Using MOCK data fallback.", file=sys.stderr)
+        else:
+            # The API call seems to hang in this environment.
+            # Network is skipped unless explicitly enabled (see __init__).
+            print("Using MOCK data (Network skipped for stability).", file=sys.stderr)
+
         mock_data = [
             {'year': 2024, 'month': 1, 'value': 103.5}, # Jan 24
             {'year': 2023, 'month': 12, 'value': 103.4}, # Dec 23
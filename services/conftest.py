@@ -0,0 +1,188 @@
+"""
+Shared pytest fixtures for the services tests.
+Every on-disk cache a fixture installs lives under the test's tmp_path.
+"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ScriptedServer:
+    """
+    Local HTTP server answering from per-path scripts:
+    routes[path] = [(status, body), ...] are served in order, the last one repeats.
+    Every request is logged as (method, path, headers).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                status, body = server._next(self.command, self.path, dict(self.headers))
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def _next(self, method, path, headers):
+        with self._lock:
+            self.requests.append((method, path, headers))
+            script = self.routes.get(path.split("?")[0], [(404, {"error": "not found"})])
+            return script.pop(0) if len(script) > 1 else script[0]
+
+    def hits(self, path: str) -> int:
+        return sum(1 for _, p, _ in self.requests if p.split("?")[0] == path)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def http_server():
+    server = ScriptedServer()
+    yield server
+    server.close()
+
+
+class SyntheticWeather:
+    """
+    Open-Meteo stand-in for the meteo cache: plausible hourly weather for any
+    archive variable + a log of requests and locations. Like best_match, each
+    variable comes from the nearest point of its grid (meteo_grid.variable_grid),
+    so the series shift from one cell to the next.
+    """
+
+    def __init__(self):
+        self.locations = set()
+        self.requests = 0
+
+    def multi(self, locations, start_date, end_date, variables):
+        self.requests += 1
+        return [self.series(lat, lon, start_date, end_date, variables) for lat, lon in locations]
+
+    def __call__(self, lat, lon, start_date, end_date, variables):
+        self.requests += 1
+        return self.series(lat, lon, start_date, end_date, variables)
+
+    def series(self, lat, lon, start_date, end_date, variables):
+        self.locations.add((lat, lon))
+        hours = np.arange(np.datetime64(start_date, "h"),
+                          np.datetime64(end_date, "D") + np.timedelta64(1, "D"), dtype="datetime64[h]")
+        hour_of_day = (hours.astype(np.int64) % 24).astype(np.float32)
+        sun = np.clip(np.sin((hour_of_day - 6) / 12 * np.pi), 0, None).astype(np.float32)
+        values = {
+            "temperature_2m": 15 + 5 * sun, "surface_pressure": np.full(len(hours), 950, np.float32),
+            "wind_speed_100m": 6 + 3 * np.cos(hour_of_day / 24 * 2 * np.pi), "wind_speed_10m": 4 + sun,
+            "shortwave_radiation": 800 * sun, "direct_radiation": 550 * sun, "diffuse_radiation": 250 * sun,
+            "wind_direction_100m": np.full(len(hours), 270, np.float32)
+        }
+        return hours, {v: (values[v] + self.cell_shift(lat, lon, v)).astype(np.float32) for v in variables}
+
+    @staticmethod
+    def cell_shift(lat, lon, variable) -> float:
+        """0-1 offset of the grid cell serving `variable` at (lat, lon); none for pressure and radiation."""
+        from meteo_grid import grid_cell, variable_grid
+
+        if variable not in ("temperature_2m", "wind_speed_100m", "wind_speed_10m", "wind_direction_100m"):
+            return 0.0
+        cell_lat, cell_lon = grid_cell(lat, lon, variable_grid(variable))
+        return round((cell_lat * 7 + cell_lon * 3) % 1, 3)
+
+
+@pytest.fixture
+def synthetic_weather(monkeypatch, tmp_path):
+    """A fresh meteo cache under tmp_path, filled from SyntheticWeather."""
+    import meteo_cache
+
+    weather = SyntheticWeather()
+    monkeypatch.setattr(meteo_cache, "_cache", meteo_cache.MeteoCache(
+        cache_dir=str(tmp_path / "meteo"), fetcher=weather, multi_fetcher=weather.multi))
+    return weather
+
+
+@pytest.fixture
+def offline_prices(monkeypatch, tmp_path):
+    """An empty price archive under tmp_path with no fetcher: every hour is the mock price."""
+    from price_archive import PriceArchive
+
+    archive = PriceArchive(archive_dir=str(tmp_path / "prices"), fetcher=None)
+    monkeypatch.setattr("price_archive._archives", {(1001, 8741): archive})
+    return archive
+
+
+@pytest.fixture
+def fresh_sun_cache(monkeypatch, tmp_path):
+    """An empty solar geometry cache under tmp_path."""
+    import sun_cache
+
+    cache = sun_cache.SunCache(cache_dir=str(tmp_path / "sun"))
+    monkeypatch.setattr(sun_cache, "_cache", cache)
+    return cache
+
+
+class SyntheticMeteo:
+    """
+    Stand-in for DeepResearchAuditor.get_meteo_data: the frame it returns (naive
+    local time, renamed columns), every value a function of its timestamp so
+    any chunking of a period sees the same hours. wind_direction_100m is only
+    there when requested, as with Open-Meteo. Requests are logged in `calls`
+    as (lat, lon, variables).
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def get_meteo_data(self, lat, lon, start_date, end_date, variables=None):
+        self.calls.append((lat, lon, list(variables or [])))
+        return self.frame(start_date, end_date, variables)
+
+    @staticmethod
+    def frame(start_date, end_date, variables=None):
+        import pandas as pd
+
+        index = pd.date_range(start_date, f"{end_date} 23:00", freq="h")
+        hours = index.asi8 // 3_600_000_000_000
+        sun = np.clip(np.sin((index.hour.to_numpy() - 6) / 12 * np.pi), 0, None)
+        wind = 7 + 5 * np.sin(hours * 0.37) * np.cos(hours * 0.011)
+        columns = {"temp_air": 12 + 6 * sun, "pressure": np.full(len(index), 960.0), "wind_speed_100m": wind,
+                   "wind_speed_10m": wind * 0.7, "ghi": 800 * sun, "dni": 550 * sun, "dhi": 250 * sun}
+        if variables and "wind_direction_100m" in variables:
+            columns["wind_direction_100m"] = (hours * 47.0) % 360
+        return pd.DataFrame(columns, index=index)
+
+
+@pytest.fixture
+def synthetic_meteo(monkeypatch):
+    """Every DeepResearchAuditor (and the auditors built on it) reads SyntheticMeteo."""
+    from energy_audit_deep_research import DeepResearchAuditor
+
+    meteo = SyntheticMeteo()
+    monkeypatch.setattr(DeepResearchAuditor, "get_meteo_data", meteo.get_meteo_data)
+    return meteo
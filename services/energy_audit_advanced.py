@@ -2,12 +2,57 @@
 Advanced Energy Audit Module: Real Hourly Production × Price
 Integrates ESIOS API for real electricity prices and allows historical audits.
 """
-import requests
 import math
 from typing import Dict, Optional, List
-from datetime import datetime, timedelta
 import json
 
+import hour_index
+from http_client import get_http_client
+from lazy_imports import lazy_module
+from meteo_cache import get_meteo_cache
+from price_archive import get_price_archive
+from range_planner import find_gaps, run_parallel
+from turbine_catalog import get_catalog
+
+np = lazy_module("numpy")
+
+def generate_assessment(discrepancy_pct: float) -> str:
+    """Alert text for a payment discrepancy (% of the estimated revenue)."""
+    if abs(discrepancy_pct) < 5:
+        return "✓ PAGO CORRECTO: Diferencia < 5%"
+    elif discrepancy_pct > 0 and discrepancy_pct < 15:
+        return f"⚠ ALERTA MEDIA: La empresa paga un {discrepancy_pct:.1f}% menos"
+    elif discrepancy_pct >= 15:
+        return f"🚨 ALERTA ALTA: La empresa paga un {discrepancy_pct:.1f}% menos. RECLAMAR."
+    else:
+        return "⚪ La empresa está pagando más del estimado"
+
+
+def payment_discrepancy(revenue, payment):
+    """
+    (discrepancy_eur, discrepancy_pct) of a company payment against the
+    estimated revenue, positive when the company pays less. Takes scalars or
+    NumPy arrays (one value per scenario); the % is 0 without revenue.
+    """
+    if np.ndim(revenue) == 0:
+        discrepancy = float(revenue) - float(payment)
+        return discrepancy, (discrepancy / float(revenue) * 100) if revenue > 0 else 0
+    discrepancy = revenue - payment
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return discrepancy, np.where(revenue > 0, discrepancy / revenue * 100, 0.0)
+
+
+def discrepancy_summary(revenue: float, payment: float) -> Dict:
+    """Rounded revenue, payment, discrepancy and assessment, as the audits report them."""
+    discrepancy, discrepancy_pct = payment_discrepancy(revenue, payment)
+    return {
+        "estimated_revenue_eur": round(revenue, 2),
+        "company_payment_eur": round(payment, 2),
+        "discrepancy_eur": round(discrepancy, 2),
+        "discrepancy_pct": round(discrepancy_pct, 2),
+        "assessment": generate_assessment(discrepancy_pct)
+    }
+
 class AdvancedEnergyAuditor:
     """
     Complete energy audit with hourly production × hourly price calculation.
@@ -23,133 +68,61 @@ class AdvancedEnergyAuditor:
         self.esios_base_url = "https://api.esios.ree.es"
         self.pvgis_base_url = "https://re.jrc.ec.europa.eu/api/v5_3"
         self.open_meteo_archive_url = "https://archive-api.open-meteo.com/v1/archive"
-        
-        # Turbine models with power curves
-        self.turbine_models = {
-            "Vestas V90 3MW": {
-                "rated_power": 3000,
-                "cut_in": 3.5,
-                "rated_speed": 15.0,
-                "cut_out": 25.0,
-                "hub_height": 105, # Use 100m data from Open-Meteo
-                "rotor_radius": 45
-            },
-            "Vestas V162 6MW": {
-                "rated_power": 6000,
-                "cut_in": 3.0,
-                "rated_speed": 13.0,
-                "cut_out": 25.0,
-                "hub_height": 149,
-                "rotor_radius": 81
-            }
-        }
+
+    @property
+    def turbine_models(self) -> Dict[str, Dict]:
+        """Turbine specs by model name, from the shared catalog (turbine_catalog.json)."""
+        return {model.name: model.specs() for model in get_catalog()}
+
+    def get_price_hours(self, start_utc, end_utc):
+        """
+        Hourly prices for UTC hours [start_utc, end_utc] from the shared price
+        archive (synced from ESIOS first when a token is set).
+        Returns (int64 UTC hour index, €/MWh, bool mask of mock-filled hours).
+        """
+        hours, prices, real = get_price_archive().utc_series(start_utc, end_utc, token=self.esios_token)
+        return hour_index.from_utc(hours), prices.astype(np.float64).round(2), ~real
 
     def get_esios_hourly_prices(self, start_date: str, end_date: str) -> Dict[str, float]:
         """
-        Get hourly electricity prices from ESIOS (Red Eléctrica).
+        Compatibility shim for callers of the old string-keyed price dict: the
+        hourly prices of the local dates [start_date, end_date] from
+        get_price_hours, keyed by local ISO datetime (€/MWh). The audits use
+        get_price_hours + hour_index.align directly; use those in new code.
         """
-        if not self.esios_token:
-            # Return mock data for testing
-            return self._generate_mock_prices(start_date, end_date)
-        
-        # ESIOS indicator 1001 = "Precio mercado SPOT Diario" (€/MWh)
-        indicator_id = 1001
-        url = f"{self.esios_base_url}/indicators/{indicator_id}"
-        
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Authorization": f"Token token={self.esios_token}"
-        }
-        
-        params = {
-            "start_date": start_date + "T00:00:00",
-            "end_date": end_date + "T23:59:59"
-        }
-        
-        try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            prices = {}
-            for entry in data["indicator"]["values"]:
-                dt_str = entry["datetime"]
-                price = entry["value"]
-                prices[dt_str] = price
-            
-            return prices
-        
-        except Exception as e:
-            print(f"ESIOS API Error: {e}. Using mock data.")
-            return self._generate_mock_prices(start_date, end_date)
+        hours, prices, _ = self.get_price_hours(*hour_index.local_range_utc(start_date, end_date))
+        by_label = {}
+        # The repeated hour when DST ends keeps its first (summer time) price
+        for label, price in zip(hour_index.to_local(hours), prices.tolist()):
+            by_label.setdefault(label, price)
+        return by_label
 
     def get_open_meteo_wind(self, lat: float, lon: float, start_date: str, end_date: str, hub_height_approx: int) -> List[Dict]:
         """
         Get historical wind data from Open-Meteo (Free, No Key).
         Fetches wind speed at 100m (closest to typical hub height).
+        Served from the local meteo cache; only missing dates hit Open-Meteo.
         """
         # Open-Meteo supports 10m, 80m, 120m, 180m. We'll use 100m (interpolated by them) or closest.
         # Actually, standard variables are wind_speed_10m, wind_speed_100m.
         
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "start_date": start_date,
-            "end_date": end_date,
-            "hourly": "wind_speed_100m", # Direct 100m data
-            "timezone": "Europe/Madrid"
-        }
-        
         try:
-            response = requests.get(self.open_meteo_archive_url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            # Indexed by Europe/Madrid local time, as with timezone=Europe/Madrid
+            df = get_meteo_cache().get_frame(lat, lon, start_date, end_date, ["wind_speed_100m"])
             
-            hourly_data = []
-            hourly_units = data["hourly"]
-            
-            for i, time_str in enumerate(hourly_units["time"]):
-                # Open-Meteo format: "2024-01-01T00:00"
-                wind_speed = hourly_units["wind_speed_100m"][i]
-                
-                # Simple correction if hub height is significantly different from 100m
-                # But 100m is very close to V90 (105m). We'll use it directly for now.
-                
-                hourly_data.append({
-                    "datetime": f"{time_str}:00", # Add seconds to match ISO
-                    "wind_speed_ms": wind_speed
-                })
-                
-            return hourly_data
+            # Simple correction if hub height is significantly different from 100m
+            # But 100m is very close to V90 (105m). We'll use it directly for now.
+            times = df.index.strftime("%Y-%m-%dT%H:%M:%S")
+            speeds = df["wind_speed_100m"].to_numpy()
+            return [
+                {"datetime": t, "wind_speed_ms": None if np.isnan(v) else float(v)}
+                for t, v in zip(times, speeds)
+            ]
             
         except Exception as e:
             print(f"Open-Meteo Error: {e}")
             return []
     
-    def _generate_mock_prices(self, start_date: str, end_date: str) -> Dict[str, float]:
-        """Generate realistic mock prices (40-80 €/MWh)."""
-        start = datetime.fromisoformat(start_date)
-        end = datetime.fromisoformat(end_date)
-        
-        prices = {}
-        current = start
-        while current <= end:
-            for hour in range(24):
-                dt = current + timedelta(hours=hour)
-                # Simulate price variation: higher during day, lower at night
-                base_price = 50.0
-                if 9 <= hour <= 21:  # Day hours
-                    price = base_price + (hour - 15) * 2  # Peak around 15h
-                else:  # Night hours
-                    price = base_price - 15
-                
-                prices[dt.isoformat()] = round(price, 2)
-            
-            current += timedelta(days=1)
-        
-        return prices
-    
     def get_pvgis_hourly_solar(self, lat: float, lon: float, peak_power_kwp: float,
                                year: int) -> List[Dict]:
         """
@@ -174,8 +147,7 @@ class AdvancedEnergyAuditor:
         try:
             # Note: PVGIS ERA5 database usually has a delay. 2024 might not be available yet.
             # We add a check for the response status.
-            response = requests.get(f"{self.pvgis_base_url}/seriescalc", 
-                                  params=params, timeout=60)
+            response = get_http_client().get(f"{self.pvgis_base_url}/seriescalc", params=params)
             
             if response.status_code != 200:
                 print(f"PVGIS API Error {response.status_code}: {response.text}")
@@ -213,24 +185,13 @@ class AdvancedEnergyAuditor:
         """Logarithmic wind extrapolation."""
         return v_10 * (math.log(hub_height / z0) / math.log(10 / z0))
     
-    def calculate_wind_power(self, wind_speed: float, turbine_model: str) -> float:
-        """Calculate power output from wind speed."""
-        specs = self.turbine_models.get(turbine_model)
-        if not specs:
-            raise ValueError(f"Unknown turbine: {turbine_model}")
-        
-        v = wind_speed
-        
-        if v < specs["cut_in"]:
-            return 0.0
-        elif v >= specs["rated_speed"] and v < specs["cut_out"]:
-            return specs["rated_power"]
-        elif v >= specs["cut_out"]:
-            return 0.0
-        else:
-            # Cubic approximation
-            ratio = (v - specs["cut_in"]) / (specs["rated_speed"] - specs["cut_in"])
-            return specs["rated_power"] * (ratio ** 3)
+    def calculate_wind_power(self, wind_speed, turbine_model: str):
+        """
+        Calculate power output (kW) from wind speed (catalog power curve).
+        A scalar returns a float; a list/array returns an array (one call for the whole series).
+        """
+        power = get_catalog().get(turbine_model).power(wind_speed)
+        return float(power) if power.ndim == 0 else power
     
     def audit_wind_historical(self, lat: float, lon: float, turbine_model: str,
                              num_turbines: int, start_date: str, end_date: str,
@@ -239,57 +200,54 @@ class AdvancedEnergyAuditor:
         Complete historical wind audit with hourly price integration.
         Uses Open-Meteo for real historical wind data at 100m height.
         """
-        # 1. Get hourly electricity prices (ESIOS or Mock)
-        prices = self.get_esios_hourly_prices(start_date, end_date)
-        
-        # 2. Get real historical wind data from Open-Meteo
-        specs = self.turbine_models[turbine_model]
-        wind_data = self.get_open_meteo_wind(lat, lon, start_date, end_date, specs["hub_height"])
+        turbine = get_catalog().get(turbine_model)
+
+        # 1-2. Hourly electricity prices (ESIOS archive or Mock) and real historical
+        # wind from Open-Meteo, fetched at the same time
+        (price_hours, prices, price_imputed), wind_data = run_parallel(
+            lambda: self.get_price_hours(*hour_index.local_range_utc(start_date, end_date)),
+            lambda: self.get_open_meteo_wind(lat, lon, start_date, end_date, turbine.hub_height)
+        )
         
         if not wind_data:
             return {"error": "Could not fetch Open-Meteo wind data"}
 
-        # 3. Calculate hourly production and revenue
-        hourly_revenue = []
-        total_production_kwh = 0
-        total_revenue = 0
+        # 3. Calculate hourly production and revenue (whole series at once)
+        # Open-Meteo hours are local "YYYY-MM-DDTHH:MM:SS": matched to prices by UTC hour
+        datetimes = [entry["datetime"] for entry in wind_data]
+        # None (gaps in Open-Meteo) becomes NaN -> 0 kW
+        wind_speeds = np.array([entry["wind_speed_ms"] for entry in wind_data], dtype=float)
         
-        # Create a map of prices for fast lookup
-        # ESIOS/Mock keys are ISO strings. Open-Meteo is "YYYY-MM-DDTHH:MM:SS"
-        # We'll match by hour.
+        power_kw = self.calculate_wind_power(wind_speeds, turbine_model)
+        production_kwh_total = power_kw * 1 * num_turbines  # 1 hour
+        joined = hour_index.align(hour_index.from_local(datetimes), production_kwh_total,
+                                  price_hours, prices, imputed=price_imputed)
+        price_eur_mwh = joined.price
+        # Hours without any price don't count towards revenue (see coverage)
+        revenue_eur = np.nan_to_num((production_kwh_total / 1000.0) * price_eur_mwh)
         
-        for entry in wind_data:
-            dt_str = entry["datetime"]
-            wind_speed = entry["wind_speed_ms"]
-            
-            # Find price (simplified matching)
-            price_eur_mwh = prices.get(dt_str, 50.0) # Default to 50 if mismatch
-            
-            # Calculate production for this hour
-            power_kw = self.calculate_wind_power(wind_speed, turbine_model)
-            production_kwh_per_turbine = power_kw * 1  # 1 hour
-            production_kwh_total = production_kwh_per_turbine * num_turbines
-            
-            # Calculate revenue for this hour
-            revenue_eur = (production_kwh_total / 1000.0) * price_eur_mwh
-            
-            hourly_revenue.append({
-                "datetime": dt_str,
-                "wind_speed_100m": wind_speed,
-                "production_mwh": round(production_kwh_total / 1000, 3),
-                "price_eur_mwh": price_eur_mwh,
-                "revenue_eur": round(revenue_eur, 2)
-            })
-            
-            total_production_kwh += production_kwh_total
-            total_revenue += revenue_eur
+        total_production_kwh = float(production_kwh_total.sum())
+        total_revenue = float(revenue_eur.sum())
+        
+        # Only the first day is reported hour by hour
+        hourly_revenue = [
+            {
+                "datetime": datetimes[i],
+                "wind_speed_100m": wind_data[i]["wind_speed_ms"],
+                "production_mwh": round(float(production_kwh_total[i]) / 1000, 3),
+                "price_eur_mwh": None if np.isnan(price_eur_mwh[i]) else float(price_eur_mwh[i]),
+                "revenue_eur": round(float(revenue_eur[i]), 2)
+            }
+            for i in range(min(24, len(wind_data)))
+        ]
         
-        # 4. Calculate average capture price
-        avg_capture_price = (total_revenue / (total_production_kwh / 1000)) if total_production_kwh > 0 else 0
+        # 4. Calculate average capture price (over the priced hours)
+        priced_mwh = float(production_kwh_total[joined.priced].sum()) / 1000
+        avg_capture_price = (total_revenue / priced_mwh) if priced_mwh > 0 else 0
+        coverage = joined.coverage
         
         # 5. Calculate discrepancy
-        discrepancy = total_revenue - company_payment
-        discrepancy_pct = (discrepancy / total_revenue * 100) if total_revenue > 0 else 0
+        discrepancy, discrepancy_pct = payment_discrepancy(total_revenue, company_payment)
         
         return {
             "period": {"start": start_date, "end": end_date},
@@ -301,12 +259,14 @@ class AdvancedEnergyAuditor:
             "production_summary": {
                 "total_mwh": round(total_production_kwh / 1000, 2),
                 "hours_analyzed": len(wind_data),
-                "data_source": "Open-Meteo Archive (Real 100m Wind)"
+                "data_source": "Open-Meteo Archive (Real 100m Wind)",
+                "data_gaps": find_gaps(datetimes, ~np.isnan(wind_speeds))
             },
             "price_analysis": {
-                "avg_market_price_eur_mwh": round(sum(prices.values()) / len(prices), 2) if prices else 0,
+                "avg_market_price_eur_mwh": round(float(prices.mean()), 2) if len(prices) else 0,
                 "avg_capture_price_eur_mwh": round(avg_capture_price, 2),
-                "note": "Prices are MOCK until ESIOS token is provided" if not self.esios_token else "Real ESIOS Prices"
+                "note": self._price_note(coverage["real_share"]),
+                "hour_coverage": coverage
             },
             "financial_analysis": {
                 "estimated_revenue_eur": round(total_revenue, 2),
@@ -324,54 +284,48 @@ class AdvancedEnergyAuditor:
         Complete solar audit with PVGIS hourly data + ESIOS prices.
         Shows the "solar cannibalization effect" (price drops when sun is high).
         """
-        # 1. Get PVGIS hourly solar production
-        solar_data = self.get_pvgis_hourly_solar(lat, lon, peak_power_kwp, year)
+        # 1-2. PVGIS hourly solar production and hourly prices for the (UTC) year,
+        # fetched at the same time
+        solar_data, (price_hours, prices, price_imputed) = run_parallel(
+            lambda: self.get_pvgis_hourly_solar(lat, lon, peak_power_kwp, year),
+            lambda: self.get_price_hours(f"{year}-01-01T00", f"{year}-12-31T23")
+        )
         
         if not solar_data:
             return {"error": "Could not fetch PVGIS data. Check logs."}
         
-        # 2. Get hourly prices for the year
-        start_date = f"{year}-01-01"
-        end_date = f"{year}-12-31"
-        prices = self.get_esios_hourly_prices(start_date, end_date)
-        
         # 3. Match production with prices and calculate revenue
-        total_production_kwh = 0
-        total_revenue = 0
-        hourly_detail = []
+        # PVGIS hours are UTC at minute :10 ("2023-01-01T00:10:00"): floored to the hour
+        production_kwh = np.array([entry["production_kwh"] for entry in solar_data], dtype=float)
+        joined = hour_index.align(hour_index.from_utc([entry["datetime"] for entry in solar_data]),
+                                  production_kwh, price_hours, prices, imputed=price_imputed)
+        # Hours without any price don't count towards revenue (see coverage)
+        revenue_eur = np.nan_to_num((production_kwh / 1000.0) * joined.price)
+        total_production_kwh = float(production_kwh.sum())
+        total_revenue = float(revenue_eur.sum())
         
-        # PVGIS might return slightly different number of hours (leap years etc)
-        # We iterate through available solar data
-        
-        for entry in solar_data:
-            dt_str = entry["datetime"] # ISO format now
-            production_kwh = entry["production_kwh"]
-            
-            # Find price for this timestamp (or closest approximation for mock)
-            # In real ESIOS, we would match exact datetime.
-            # Here we use the mock dictionary keys or fallback
-            
-            price = prices.get(dt_str, 50.0) # Default to 50 if key mismatch
-            
-            revenue = (production_kwh / 1000.0) * price
-            
-            hourly_detail.append({
-                "datetime": dt_str,
-                "production_kwh": round(production_kwh, 2),
-                "price_eur_mwh": price,
-                "revenue_eur": round(revenue, 2)
-            })
-            
-            total_production_kwh += production_kwh
-            total_revenue += revenue
+        # Only the first day is reported hour by hour (local time, like the wind audit)
+        sample = slice(0, min(24, len(solar_data)))
+        hourly_detail = [
+            {
+                "datetime": label,
+                "production_kwh": round(float(kwh), 2),
+                "price_eur_mwh": None if np.isnan(price) else float(price),
+                "revenue_eur": round(float(revenue), 2)
+            }
+            for label, kwh, price, revenue in zip(hour_index.to_local(joined.hours[sample]),
+                                                  production_kwh[sample], joined.price[sample],
+                                                  revenue_eur[sample])
+        ]
         
         # 4. Calculate capture price (will be LOWER than average due to cannibalization)
-        avg_market_price = sum(prices.values()) / len(prices) if prices else 0
-        capture_price = (total_revenue / (total_production_kwh / 1000)) if total_production_kwh > 0 else 0
+        avg_market_price = float(prices.mean()) if len(prices) else 0
+        priced_mwh = float(production_kwh[joined.priced].sum()) / 1000
+        capture_price = (total_revenue / priced_mwh) if priced_mwh > 0 else 0
+        coverage = joined.coverage
         cannibalization_factor = capture_price - avg_market_price
         
-        discrepancy = total_revenue - company_payment
-        discrepancy_pct = (discrepancy / total_revenue * 100) if total_revenue > 0 else 0
+        discrepancy, discrepancy_pct = payment_discrepancy(total_revenue, company_payment)
         
         return {
             "period": {"year": year},
@@ -386,7 +340,9 @@ class AdvancedEnergyAuditor:
                 "avg_market_price_eur_mwh": round(avg_market_price, 2),
                 "solar_capture_price_eur_mwh": round(capture_price, 2),
                 "cannibalization_effect_eur_mwh": round(cannibalization_factor, 2),
-                "cannibalization_note": "☀️ Solar produces when prices drop (midday oversupply)"
+                "cannibalization_note": "☀️ Solar produces when prices drop (midday oversupply)",
+                "note": self._price_note(coverage["real_share"]),
+                "hour_coverage": coverage
             },
             "financial_analysis": {
                 "estimated_revenue_eur": round(total_revenue, 2),
@@ -398,16 +354,16 @@ class AdvancedEnergyAuditor:
             "hourly_detail_sample": hourly_detail[:24]
         }
     
+    def _price_note(self, real_price_share: float) -> str:
+        if real_price_share >= 1.0:
+            return "Real ESIOS Prices"
+        if real_price_share <= 0.0:
+            return "Prices are MOCK until ESIOS token is provided" if not self.esios_token else "Prices are MOCK (ESIOS unavailable)"
+        return f"Real ESIOS Prices for {real_price_share:.0%} of hours, MOCK for the rest"
+
     def _generate_assessment(self, discrepancy_pct: float) -> str:
         """Generate alert based on payment discrepancy."""
-        if abs(discrepancy_pct) < 5:
-            return "✓ PAGO CORRECTO: Diferencia < 5%"
-        elif discrepancy_pct > 0 and discrepancy_pct < 15:
-            return f"⚠ ALERTA MEDIA: La empresa paga un {discrepancy_pct:.1f}% menos"
-        elif discrepancy_pct >= 15:
-            return f"🚨 ALERTA ALTA: La empresa paga un {discrepancy_pct:.1f}% menos. RECLAMAR."
-        else:
-            return "⚪ La empresa está pagando más del estimado"
+        return generate_assessment(discrepancy_pct)
 
 
 if __name__ == "__main__":
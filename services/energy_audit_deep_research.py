@@ -1,14 +1,116 @@
-import pandas as pd
-import numpy as np
-import requests
-import pvlib
-from pvlib import location, irradiance, temperature, pvsystem, modelchain
-from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
-import math
-from datetime import datetime
-import os
+from lazy_imports import lazy_module
+from meteo_cache import get_meteo_cache
+from price_archive import get_price_archive
+from range_planner import run_parallel
+from sun_cache import get_sun_cache
+from turbine_catalog import get_catalog
+
+# Heavy dependencies (~1s to import pvlib + pandas) are loaded on first use,
+# so importing this module stays cheap for callers that never run an audit.
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+irradiance = lazy_module("pvlib.irradiance")
+temperature = lazy_module("pvlib.temperature")
+
+# Wake decay constant k by terrain roughness (turbulence intensity)
+WAKE_DECAY = {
+    "offshore": 0.04,  # Low turbulence, wakes persist long
+    "plains": 0.075,  # Standard onshore
+    "forest": 0.1  # Forest/Complex (High turbulence, wakes recover fast)
+}
+
+# Physics on plain arrays (any shape, e.g. hours or cells x hours), shared by
+# the single-park audit and the regional screening (screening.py)
+
+def pv_ac_power_kw(poa_global, temp_air, wind_speed, kwp):
+    """AC power (kW) of `kwp` of PV from plane-of-array irradiance (SAPM cell temperature)."""
+    # 3. Cell Temperature (Faiman Model)
+    # Uses wind speed to calculate cooling
+    # u0, u1 are parameters for "insulated back" (roof) or "open rack" (ground)
+    # Using standard open rack values: u0=25.0, u1=6.84
+    params = temperature.TEMPERATURE_MODEL_PARAMETERS['sapm']['open_rack_glass_glass']
+    cell_temp = temperature.sapm_cell(
+        poa_global=poa_global,
+        temp_air=temp_air,
+        wind_speed=wind_speed,
+        a=params['a'],
+        b=params['b'],
+        deltaT=params['deltaT']
+    )
+
+    # 4. DC Power Calculation (PVWatts simplified physics but with accurate inputs)
+    # P_dc = P_nom * (POA / 1000) * (1 + gamma * (T_cell - 25))
+    gamma_pmp = -0.004 # -0.4%/C typical for silicon
+    dc_power = kwp * 1000 * (poa_global / 1000) * (1 + gamma_pmp * (cell_temp - 25))
+
+    # 5. System Losses (Soiling, Inverter, Wiring) -> ~14% total
+    ac_power = dc_power * 0.86
+    ac_power = np.maximum(ac_power, 0) # No negative power
+    return ac_power / 1000
+
+def shear_exponent(wind_speed_100m, wind_speed_10m):
+    """Hellman exponent from the ERA5 winds at 100 m and 10 m."""
+    # 1. Dynamic Hellman Exponent (Shear)
+    # Calculate alpha based on 100m vs 10m wind speed from ERA5
+    # alpha = ln(v_100 / v_10) / ln(100 / 10)
+    # Clip alpha to realistic bounds (0.1 to 0.6) to avoid numerical instability
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = np.log(wind_speed_100m / wind_speed_10m) / np.log(100/10)
+    return np.clip(alpha, 0.1, 0.6)
+
+def air_density(temp_air, pressure):
+    """Air density (kg/m3) from temperature (C) and surface pressure (hPa)."""
+    # rho = P / (R * T)
+    R_specific = 287.05
+    T_kelvin = temp_air + 273.15
+    return (pressure * 100) / (R_specific * T_kelvin) # Pressure in hPa -> Pa
+
+def park_wake_loss(num_turbines, roughness_class="forest"):
+    """Share of the park production lost to wakes, without a layout (heuristic)."""
+    # If N > 1, apply efficiency loss.
+    # k depends on terrain roughness (turbulence intensity)
+    k = WAKE_DECAY.get(roughness_class, WAKE_DECAY["forest"])
+    
+    # Simplified "Park Efficiency" formula derived from Jensen for infinite array
+    # This is a heuristic for the "Deep Research" requirement without full CFD
+    # Eff = 1 - (Loss_Factor * (N-1)/N)
+    # Loss factor depends on spacing (assume 5D) and k
+    # In a forest (high k), wakes recover faster!
+    wake_loss_pct = 0.0
+    if num_turbines > 1:
+        # Typical losses: 10-15%
+        # Forest (k=0.1) -> Lower losses (~8%)
+        # Plains (k=0.075) -> Higher losses (~12%)
+        # Offshore (k=0.04) -> Highest losses (~15-20%) if tight spacing
+        base_loss = 0.12 # Reference for plains
+        if k == 0.1: base_loss = 0.08
+        if k == 0.04: base_loss = 0.15
+        
+        wake_loss_pct = base_loss * (1 - 1/num_turbines) # Increases with N
+    return wake_loss_pct
+
+def hub_power_kw(turb, wind_speed_100m, wind_speed_10m, temp_air, pressure):
+    """Power (kW) of one turbine from ERA5 winds at 10/100 m, temperature (C) and pressure (hPa)."""
+    alpha = shear_exponent(wind_speed_100m, wind_speed_10m)
+
+    # 2. Extrapolate to Hub Height
+    # v_hub = v_100 * (H / 100)^alpha
+    v_hub = wind_speed_100m * (turb.hub_height / 100) ** alpha
+
+    # 3. Air Density Correction
+    rho = air_density(temp_air, pressure)
+
+    # 4. Power Curve Lookup & Density Adjustment
+    # Compiled catalog curve, whole series in one call; the density
+    # correction (power scaling or equivalent speed) comes from the catalog
+    return turb.power(v_hub, air_density=rho)
 
 class DeepResearchAuditor:
+    METEO_VARIABLES = ["temperature_2m", "surface_pressure", "wind_speed_100m", "wind_speed_10m",
+                       "shortwave_radiation", "direct_radiation", "diffuse_radiation"]
+    # Only the directional wake model (parks with a turbine layout) needs these
+    WAKE_VARIABLES = ["wind_direction_100m"]
+
     def __init__(self, esios_token=None):
         self.esios_token = esios_token
         self.esios_base_url = "https://api.esios.ree.es"
@@ -16,26 +118,21 @@ class DeepResearchAuditor:
         self.pvgis_url = "https://re.jrc.ec.europa.eu/api/v5_3/seriescalc"
 
     # --- METEOROLOGY (Open-Meteo ERA5) ---
-    def get_meteo_data(self, lat, lon, start_date, end_date):
+    def meteo_variables(self, config):
+        """Open-Meteo variables one park config needs (+ wind direction for a turbine layout)."""
+        if config.get('turbines'):
+            return self.METEO_VARIABLES + self.WAKE_VARIABLES
+        return self.METEO_VARIABLES
+
+    def get_meteo_data(self, lat, lon, start_date, end_date, variables=None):
         """
-        Fetches hourly data: Wind Speed (100m & 10m), Temp, Pressure, GHI, DNI, DHI.
+        Fetches hourly data: Wind Speed (100m & 10m), Temp, Pressure, GHI, DNI, DHI
+        (METEO_VARIABLES, or the `variables` given).
+        Served from the local meteo cache; only missing dates hit Open-Meteo.
         """
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "start_date": start_date,
-            "end_date": end_date,
-            "hourly": "temperature_2m,surface_pressure,wind_speed_100m,wind_speed_10m,shortwave_radiation,direct_radiation,diffuse_radiation",
-            "timezone": "Europe/Madrid"
-        }
         try:
-            r = requests.get(self.open_meteo_url, params=params)
-            r.raise_for_status()
-            data = r.json()
-            
-            df = pd.DataFrame(data["hourly"])
-            df["time"] = pd.to_datetime(df["time"])
-            df.set_index("time", inplace=True)
+            # Indexed by Europe/Madrid local time, as with timezone=Europe/Madrid
+            df = get_meteo_cache().get_frame(lat, lon, start_date, end_date, variables or self.METEO_VARIABLES)
             
             # Rename for clarity
             df.rename(columns={
@@ -58,172 +155,146 @@ class DeepResearchAuditor:
         """
         Rigorous solar simulation using pvlib.
         """
-        # 1. Location & Sun Position
-        site = location.Location(lat, lon, tz="Europe/Madrid")
-        solar_pos = site.get_solarposition(meteo_df.index)
+        # 1. Sun Position (cached per site and year, see sun_cache.py)
+        # The meteo index is naive Europe/Madrid local time
+        sun = get_sun_cache().for_index(lat, lon, meteo_df.index)
         
         # 2. Transposition (Perez Model)
         # Calculate Plane of Array (POA) Irradiance
         # Perez model accounts for circumsolar and horizon brightening
+        # (and needs extraterrestrial DNI + airmass)
         poa_irrad = irradiance.get_total_irradiance(
             surface_tilt=tilt,
             surface_azimuth=azimut,
-            dni=meteo_df['dni'],
-            ghi=meteo_df['ghi'],
-            dhi=meteo_df['dhi'],
-            solar_zenith=solar_pos['apparent_zenith'],
-            solar_azimuth=solar_pos['azimuth'],
+            dni=meteo_df['dni'].to_numpy(),
+            ghi=meteo_df['ghi'].to_numpy(),
+            dhi=meteo_df['dhi'].to_numpy(),
+            solar_zenith=sun['apparent_zenith'],
+            solar_azimuth=sun['azimuth'],
+            dni_extra=sun['dni_extra'],
+            airmass=sun['airmass'],
             model='perez'
         )
         
-        # 3. Cell Temperature (Faiman Model)
-        # Uses wind speed to calculate cooling
-        # u0, u1 are parameters for "insulated back" (roof) or "open rack" (ground)
-        # Using standard open rack values: u0=25.0, u1=6.84
-        params = TEMPERATURE_MODEL_PARAMETERS['sapm']['open_rack_glass_glass']
-        cell_temp = temperature.sapm_cell(
-            poa_global=poa_irrad['poa_global'],
-            temp_air=meteo_df['temp_air'],
-            wind_speed=meteo_df['wind_speed_10m'],
-            a=params['a'],
-            b=params['b'],
-            deltaT=params['deltaT']
-        )
-        
-        # 4. DC Power Calculation (PVWatts simplified physics but with accurate inputs)
-        # P_dc = P_nom * (POA / 1000) * (1 + gamma * (T_cell - 25))
-        gamma_pmp = -0.004 # -0.4%/C typical for silicon
-        dc_power = kwp * 1000 * (poa_irrad['poa_global'] / 1000) * (1 + gamma_pmp * (cell_temp - 25))
-        
-        # 5. System Losses (Soiling, Inverter, Wiring) -> ~14% total
-        ac_power = dc_power * 0.86
-        ac_power = ac_power.clip(lower=0) # No negative power
-        
-        return ac_power / 1000 # Return kWh (since index is hourly)
+        # 3-5. Cell temperature, DC power and system losses
+        return pd.Series(pv_ac_power_kw(poa_irrad['poa_global'], meteo_df['temp_air'].to_numpy(),
+                                        meteo_df['wind_speed_10m'].to_numpy(), kwp),
+                         index=meteo_df.index) # Return kWh (since index is hourly)
 
     # --- WIND PHYSICS (Hellman + Density + Jensen) ---
     def simulate_wind(self, meteo_df, num_turbines, turbine_model, roughness_class="forest"):
         """
         Rigorous wind simulation.
         """
-        # Turbine Specs (Simplified Library)
-        specs = {
-            "Vestas V90 3MW": {"P_rated": 3000, "H": 105, "D": 90, "curve": {3:0, 4:150, 7:1000, 10:2500, 15:3000, 25:3000}},
-            "Vestas V162 6MW": {"P_rated": 6000, "H": 149, "D": 162, "curve": {3:0, 5:500, 9:4000, 12:6000, 25:6000}}
-        }
-        turb = specs.get(turbine_model, specs["Vestas V90 3MW"])
-        
-        # 1. Dynamic Hellman Exponent (Shear)
-        # Calculate alpha based on 100m vs 10m wind speed from ERA5
-        # alpha = ln(v_100 / v_10) / ln(100 / 10)
-        # Clip alpha to realistic bounds (0.1 to 0.6) to avoid numerical instability
-        alpha = np.log(meteo_df['wind_speed_100m'] / meteo_df['wind_speed_10m']) / np.log(100/10)
-        alpha = alpha.clip(0.1, 0.6)
-        
-        # 2. Extrapolate to Hub Height
-        # v_hub = v_100 * (H / 100)^alpha
-        v_hub = meteo_df['wind_speed_100m'] * (turb['H'] / 100) ** alpha
+        # Turbine Specs (shared catalog, raises ValueError for unknown models)
+        turb = get_catalog().get(turbine_model)
         
-        # 3. Air Density Correction
-        # rho = P / (R * T)
-        R_specific = 287.05
-        T_kelvin = meteo_df['temp_air'] + 273.15
-        rho = (meteo_df['pressure'] * 100) / (R_specific * T_kelvin) # Pressure in hPa -> Pa
-        rho_0 = 1.225
-        density_factor = rho / rho_0
-        
-        # 4. Power Curve Lookup & Density Adjustment
-        # Simple linear interpolation of the curve
-        def get_power_from_curve(v):
-            curve = turb['curve']
-            keys = sorted(curve.keys())
-            if v < keys[0] or v > keys[-1]: return 0
-            for i in range(len(keys)-1):
-                if keys[i] <= v <= keys[i+1]:
-                    v1, v2 = keys[i], keys[i+1]
-                    p1, p2 = curve[v1], curve[v2]
-                    return p1 + (p2 - p1) * (v - v1) / (v2 - v1)
-            return 0
-
-        raw_power_kw = v_hub.apply(get_power_from_curve)
-        corrected_power_kw = raw_power_kw * density_factor
+        # 1-4. Shear, hub height, air density and power curve
+        corrected_power_kw = pd.Series(hub_power_kw(
+            turb,
+            meteo_df['wind_speed_100m'].to_numpy(),
+            meteo_df['wind_speed_10m'].to_numpy(),
+            meteo_df['temp_air'].to_numpy(),
+            meteo_df['pressure'].to_numpy()
+        ), index=meteo_df.index)
         
         # 5. Wake Effect (Jensen Model - Simplified for N turbines)
-        # If N > 1, apply efficiency loss.
-        # k depends on terrain roughness (turbulence intensity)
-        if roughness_class == "offshore":
-            k = 0.04 # Low turbulence, wakes persist long
-        elif roughness_class == "plains":
-            k = 0.075 # Standard onshore
-        else:
-            k = 0.1 # Forest/Complex (High turbulence, wakes recover fast)
-        
-        # Simplified "Park Efficiency" formula derived from Jensen for infinite array
-        # This is a heuristic for the "Deep Research" requirement without full CFD
-        # Eff = 1 - (Loss_Factor * (N-1)/N)
-        # Loss factor depends on spacing (assume 5D) and k
-        # In a forest (high k), wakes recover faster!
-        wake_loss_pct = 0.0
-        if num_turbines > 1:
-            # Typical losses: 10-15%
-            # Forest (k=0.1) -> Lower losses (~8%)
-            # Plains (k=0.075) -> Higher losses (~12%)
-            # Offshore (k=0.04) -> Highest losses (~15-20%) if tight spacing
-            base_loss = 0.12 # Reference for plains
-            if k == 0.1: base_loss = 0.08
-            if k == 0.04: base_loss = 0.15
-            
-            wake_loss_pct = base_loss * (1 - 1/num_turbines) # Increases with N
+        wake_loss_pct = park_wake_loss(num_turbines, roughness_class)
             
         final_power_kw = corrected_power_kw * num_turbines * (1 - wake_loss_pct)
         
         return final_power_kw # Hourly kWh
 
+    def simulate_wind_layout(self, meteo_df, turbines, roughness_class="forest", default_model=None):
+        """
+        Hourly power (kW) per turbine, one column per turbine id, with
+        directional Jensen wakes from the actual layout (wake_model.py).
+        `turbines`: wind_turbines rows or [{"id", "lat", "lon", "model"}].
+        """
+        from wake_model import WakeModel, parse_layout
+
+        layout = parse_layout(turbines, default_model=default_model)
+        model = WakeModel(layout, k=WAKE_DECAY.get(roughness_class, WAKE_DECAY["forest"]))
+        out = model.run(
+            meteo_df['wind_speed_100m'].to_numpy(),
+            meteo_df['wind_speed_10m'].to_numpy(),
+            meteo_df['wind_direction_100m'].to_numpy(),
+            meteo_df['temp_air'].to_numpy(),
+            meteo_df['pressure'].to_numpy()
+        )
+        power = pd.DataFrame(out["power_kw"], index=meteo_df.index, columns=layout.ids)
+        free = out["free_power_kw"].sum(axis=0)
+        power.attrs["turbines"] = [
+            {"id": turbine_id, "model": turb.name, "production_mwh": round(produced / 1000, 2),
+             "wake_loss_pct": round((1 - produced / ideal) * 100, 2) if ideal > 0 else 0}
+            for turbine_id, turb, produced, ideal in zip(layout.ids, layout.models, power.sum().to_numpy(), free)
+        ]
+        return power
+
     # --- ECONOMICS (ESIOS) ---
     def get_prices(self, start_date, end_date):
-        # Mock for now if no token, or fetch real
-        # For Deep Research, we need hourly matching
-        dates = pd.date_range(start_date, end_date, freq='h')
-        # TODO: When ESIOS token is available, uncomment this block:
-        # if self.esios_token:
-        #     headers = {'Content-Type': 'application/json', 'x-api-key': self.esios_token}
-        #     # Fetch indicators 805 (Spot) and 1001 (PVPC)
-        #     # url = f"{self.esios_base_url}/indicators/805?start_date={start_date}&end_date={end_date}"
-        #     # ... implementation ...
-        #     pass
-
-        # Mock "Duck Curve" prices: Low at noon, High at night
-        hours = dates.hour
-        base_price = 50.0 # Float to avoid casting errors
-        # Solar dip: 10am-4pm -> -20 eur
-        # Peak: 8pm-10pm -> +30 eur
-        prices = base_price + np.where((hours > 10) & (hours < 16), -20, 0) + np.where((hours > 19) & (hours < 23), 30, 0)
-        # Add random volatility
-        prices += np.random.normal(0, 5, len(prices))
-        return pd.Series(prices, index=dates)
+        """
+        Hourly prices for [start_date, end_date] indexed by local time, from the
+        shared price archive (synced from ESIOS when a token is set). Hours not
+        archived get the deterministic mock "Duck Curve" (low at noon, high at night).
+        """
+        prices, _ = get_price_archive().local_series(start_date, end_date, token=self.esios_token)
+        return prices
 
     # --- MAIN AUDIT ---
-    def run_audit(self, config):
+    def run_audit(self, config, progress=None):
+        """
+        Runs the full audit for one park.
+        `progress(stage, fraction)` is optional and is called after each step
+        (meteo_fetched, simulation_done, pricing_done) for job tracking.
+        """
+        if progress is None:
+            progress = lambda stage, fraction: None
+
         start = config['start_date']
         end = config['end_date']
         lat = float(config['lat'])
         lon = float(config['lon'])
         
-        # 1. Meteo
-        meteo = self.get_meteo_data(lat, lon, start, end)
+        # 1. Meteo and prices (independent providers: fetched at the same time)
+        meteo, prices = run_parallel(
+            lambda: self.get_meteo_data(lat, lon, start, end, self.meteo_variables(config)),
+            lambda: self.get_prices(start, end)
+        )
         if meteo is None: return {"error": "Meteo data failed"}
+        progress("meteo_fetched", 0.4)
         
         # 2. Production
-        if config['type'] == 'solar':
-            production = self.simulate_solar(meteo, lat, lon, float(config['peak_power_kwp']))
-        else:
-            # Pass roughness class from config (default to forest if missing)
-            roughness = config.get('roughness', 'forest')
-            production = self.simulate_wind(meteo, int(config['num_turbines']), config['turbine_model'], roughness_class=roughness)
+        production = self.simulate_park(config, meteo)
+        progress("simulation_done", 0.8)
             
         # 3. Economics
-        prices = self.get_prices(start, end)
-        
+        result = self.price_production(production, prices)
+        progress("pricing_done", 0.95)
+        if "turbines" in production.attrs:
+            result["turbines"] = production.attrs["turbines"]
+        result["data_gaps"] = meteo.attrs.get("gaps")
+        return result
+
+    def simulate_park(self, config, meteo):
+        """Hourly production (kWh) of one park config ('solar' or 'wind') from its meteo."""
+        if config['type'] == 'solar':
+            return self.simulate_solar(meteo, float(config['lat']), float(config['lon']),
+                                       float(config['peak_power_kwp']), tilt=float(config.get('tilt', 30)),
+                                       azimut=float(config.get('azimuth', 180)))
+        # Pass roughness class from config (default to forest if missing)
+        roughness = config.get('roughness', 'forest')
+        if config.get('turbines'):
+            # Actual layout: directional wakes, per-turbine results kept in attrs
+            per_turbine = self.simulate_wind_layout(meteo, config['turbines'], roughness_class=roughness,
+                                                    default_model=config.get('turbine_model'))
+            production = per_turbine.sum(axis=1)
+            production.attrs["turbines"] = per_turbine.attrs["turbines"]
+            return production
+        return self.simulate_wind(meteo, int(config['num_turbines']), config['turbine_model'], roughness_class=roughness)
+
+    def price_production(self, production, prices):
+        """Hourly production × hourly prices -> revenue summary and a 24h sample."""
         # Align indexes (intersection)
         common_idx = production.index.intersection(prices.index)
         prod_aligned = production.loc[common_idx]
@@ -1,9 +1,10 @@
 import os
-import requests
 import json
 from typing import List, Optional
 import time
 
+from http_client import get_http_client
+
 class GroqClient:
     """
     Groq API Client with automatic key rotation to handle rate limits.
@@ -119,7 +120,7 @@ Devuelve un JSON con:
             }
             
             try:
-                response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+                response = get_http_client().post(self.base_url, headers=headers, json=payload)
                 
                 if response.status_code == 200:
                     data = response.json()
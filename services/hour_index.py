@@ -0,0 +1,112 @@
+"""
+Hour Index: align hourly series from different sources on UTC integer hours.
+
+Every source labels its hours differently: Open-Meteo and the price archive
+in naive Europe/Madrid local time, PVGIS in UTC at minute :10, ESIOS in UTC.
+Matching them by string silently fails on any format or DST difference, so
+each one is converted once to an int64 index (hours since 1970-01-01T00 UTC)
+and joined with array indexing:
+
+    hours = from_local(wind_datetimes)          # "2023-03-26T03:00:00" -> int
+    solar_hours = from_utc(pvgis_datetimes)     # "2023-01-01T00:10:00" -> floored to 00:00
+    joined = align(hours, production_kwh, price_hours, prices, imputed=~real)
+    joined.price                                # price of each production hour (NaN if none)
+    joined.coverage                             # {"hours", "matched", "imputed", "missing", ...}
+
+- local times are converted with the real DST rules; the repeated hour when
+  DST ends is read as the first (summer time) one, like the meteo cache and
+  price archive do when they drop it
+- hours without a price are NaN, never a made-up default, and are counted as
+  "missing"; hours priced with mock values are counted as "imputed"
+"""
+from typing import Optional, Tuple
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+LOCAL_TIMEZONE = "Europe/Madrid"
+LOCAL_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def from_utc(times) -> "np.ndarray":
+    """UTC datetimes (datetime64 or ISO strings) -> int64 hours, floored to the hour."""
+    minutes = np.asarray(times, dtype="datetime64[m]")
+    return minutes.astype("datetime64[h]").astype(np.int64)
+
+
+def from_local(times, timezone: str = LOCAL_TIMEZONE) -> "np.ndarray":
+    """Naive local datetimes (ISO strings, datetime64 or DatetimeIndex) -> int64 UTC hours."""
+    local = pd.DatetimeIndex(np.asarray(times, dtype="datetime64[m]")).floor("h")
+    utc = local.tz_localize(timezone, ambiguous=np.ones(len(local), dtype=bool),
+                            nonexistent="shift_forward")
+    return from_utc(utc.tz_convert("UTC").tz_localize(None).to_numpy())
+
+
+def to_datetime64(hours) -> "np.ndarray":
+    return np.asarray(hours, dtype=np.int64).astype("datetime64[h]")
+
+
+def to_local(hours, timezone: str = LOCAL_TIMEZONE, fmt: str = LOCAL_FORMAT) -> list:
+    """int64 UTC hours -> naive local time labels."""
+    index = pd.DatetimeIndex(to_datetime64(hours)).tz_localize("UTC").tz_convert(timezone)
+    return list(index.strftime(fmt))
+
+
+def local_range_utc(start_date: str, end_date: str, timezone: str = LOCAL_TIMEZONE) -> Tuple:
+    """First and last UTC hour (datetime64[h]) of the local dates [start_date, end_date]."""
+    start_local = pd.Timestamp(start_date).tz_localize(timezone)
+    end_local = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize(timezone)
+    start_utc = start_local.tz_convert("UTC").tz_localize(None).to_datetime64()
+    end_utc = (end_local.tz_convert("UTC") - pd.Timedelta(hours=1)).tz_localize(None).to_datetime64()
+    return np.datetime64(start_utc, "h"), np.datetime64(end_utc, "h")
+
+
+class Alignment:
+    """A series joined to prices hour by hour (see align)."""
+
+    def __init__(self, hours, values, price, priced, imputed):
+        self.hours = hours
+        self.values = values
+        self.price = price
+        self.priced = priced
+        self.imputed = imputed
+
+    @property
+    def coverage(self) -> dict:
+        hours = len(self.hours)
+        imputed = int(self.imputed.sum())
+        matched = int(self.priced.sum()) - imputed
+        return {
+            "hours": hours,
+            "matched": matched,
+            "imputed": imputed,
+            "missing": hours - matched - imputed,
+            "real_share": round(matched / hours, 4) if hours else 0.0
+        }
+
+
+def align(hours, values, price_hours, prices, imputed: Optional["np.ndarray"] = None) -> Alignment:
+    """
+    Looks up the price of every hour in `hours` (int64 UTC) among `price_hours`.
+    `imputed` flags prices that are estimates (e.g. mock) rather than real.
+    """
+    hours = np.asarray(hours, dtype=np.int64)
+    price_hours = np.asarray(price_hours, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    imputed = np.zeros(len(prices), dtype=bool) if imputed is None else np.asarray(imputed, dtype=bool)
+
+    values = np.asarray(values, dtype=np.float64)
+    if len(price_hours) == 0:
+        none = np.zeros(len(hours), dtype=bool)
+        return Alignment(hours, values, np.full(len(hours), np.nan), none, none.copy())
+
+    if (np.diff(price_hours) < 0).any():
+        order = np.argsort(price_hours, kind="stable")
+        price_hours, prices, imputed = price_hours[order], prices[order], imputed[order]
+
+    position = np.minimum(np.searchsorted(price_hours, hours), len(price_hours) - 1)
+    priced = (price_hours[position] == hours) & ~np.isnan(prices[position])
+    price = np.where(priced, prices[position], np.nan)
+    return Alignment(hours, values, price, priced, priced & imputed[position])
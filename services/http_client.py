@@ -0,0 +1,138 @@
+"""
+Shared HTTP Client for all outbound data services.
+
+One pooled requests.Session for the whole services package instead of a
+bare requests.get/post per call (a new TCP+TLS handshake every time):
+
+- connection pools per host with keep-alive
+- default timeouts per host (no call can hang forever)
+- retries with exponential backoff + jitter on 429/5xx (idempotent methods)
+- a concurrency limit per host, so parallel audits don't hammer one API
+- every call is timed into metrics.py
+- optional record/replay of responses for offline runs (http_replay.py)
+
+Usage:
+    from http_client import get_http_client
+    response = get_http_client().get(url, params=params)
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import metrics
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (5.0, 30.0)
+HOST_TIMEOUTS = {
+    "archive-api.open-meteo.com": (5.0, 60.0),  # Multi-year archive responses are large
+    "re.jrc.ec.europa.eu": (5.0, 60.0),          # PVGIS seriescalc is slow
+    "servicios.ine.es": (5.0, 5.0),              # INE tends to hang; fail fast to the fallback
+    "ovc.catastro.meh.es": (5.0, 10.0),
+    "api.groq.com": (5.0, 30.0),
+}
+
+# Simultaneous requests allowed per host
+DEFAULT_MAX_PER_HOST = int(os.environ.get("HTTP_MAX_PER_HOST", 8))
+HOST_CONCURRENCY = {
+    "re.jrc.ec.europa.eu": 2,
+    "servicios.ine.es": 2,
+    "ovc.catastro.meh.es": 2,
+}
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class HTTPClient:
+    def __init__(self, retries: int = 3, backoff_factor: float = 0.5, backoff_jitter: float = 0.5,
+                 pool_maxsize: int = DEFAULT_MAX_PER_HOST,
+                 host_timeouts: Optional[Dict] = None, host_concurrency: Optional[Dict] = None):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry_options = dict(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS,
+            # POST (Groq) is not retried here: GroqClient rotates keys on 429 itself
+            allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        try:
+            retry = Retry(backoff_jitter=backoff_jitter, **retry_options)
+        except TypeError:
+            # urllib3 < 2.0 has no jitter option
+            retry = Retry(**retry_options)
+
+        # pool_connections = how many hosts keep a pool; pool_maxsize = keep-alive
+        # connections per host (matches the concurrency limit)
+        self.live_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self._mount(self.live_adapter)
+
+        # HTTP_REPLAY_MODE=record|replay swaps the transport for fixtures
+        from http_replay import adapter_from_env
+        replay_adapter = adapter_from_env(live_adapter=self.live_adapter)
+        if replay_adapter is not None:
+            self._mount(replay_adapter)
+
+        self.host_timeouts = dict(HOST_TIMEOUTS, **(host_timeouts or {}))
+        self.host_concurrency = dict(HOST_CONCURRENCY, **(host_concurrency or {}))
+        self.default_max_per_host = pool_maxsize
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._semaphores_lock = threading.Lock()
+
+    def _mount(self, adapter):
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def use_replay(self, mode: str, **options):
+        """Records to / replays from fixtures from now on (see http_replay.py)."""
+        from http_replay import make_replay_adapter
+        self._mount(make_replay_adapter(mode, live_adapter=self.live_adapter, **options))
+
+    def use_live(self):
+        self._mount(self.live_adapter)
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                limit = self.host_concurrency.get(host, self.default_max_per_host)
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(limit)
+            return semaphore
+
+    def request(self, method: str, url: str, timeout=None, **kwargs):
+        """Same arguments as requests.request; returns a requests.Response."""
+        host = urlparse(url).hostname or ""
+        if timeout is None:
+            timeout = self.host_timeouts.get(host, DEFAULT_TIMEOUT)
+
+        with self._semaphore(host):
+            started = time.perf_counter()
+            try:
+                return self.session.request(method, url, timeout=timeout, **kwargs)
+            finally:
+                metrics.record_http(url, time.perf_counter() - started)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Process-wide client; created (and requests imported) on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
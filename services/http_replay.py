@@ -0,0 +1,189 @@
+"""
+Record/Replay for outbound HTTP (Open-Meteo, ESIOS, PVGIS, INE, Catastro, Groq).
+
+A requests transport adapter mounted on the shared client (http_client.py):
+
+- record: real calls go out as usual and each response is saved as a fixture
+  (except 429 and 5xx, which are transient: replaying them would turn one
+  outage into a permanent failure)
+- replay: responses are served from the fixtures, no network needed, with
+  optional artificial latency and error injection
+
+Enable with environment variables (read when the shared client is created):
+
+    HTTP_REPLAY_MODE=record|replay
+    HTTP_REPLAY_DIR=services/fixtures/http     (default)
+    HTTP_REPLAY_LATENCY_MS=120                 (replay: added per call)
+    HTTP_REPLAY_JITTER_MS=40                   (replay: +/- uniform jitter)
+    HTTP_REPLAY_ERROR_RATE=0.05                (replay: share of calls failing)
+    HTTP_REPLAY_SEED=42                        (replay: makes the above repeatable)
+
+Fixtures are keyed by method + URL + query + body. Headers are not part of
+the key, so credentials (ESIOS token, Groq keys) never end up in the files
+and any dummy token works when replaying.
+"""
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import metrics
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "http")
+
+# Headers worth keeping in a fixture (everything else is transport noise)
+KEPT_HEADERS = ("Content-Type", "Retry-After")
+
+
+def _canonical_url(url: str) -> str:
+    parts = urlparse(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunparse((parts.scheme, parts.netloc, parts.path, "", query, ""))
+
+
+def fixture_key(method: str, url: str, body) -> str:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256()
+    digest.update(method.upper().encode("ascii"))
+    digest.update(b"\n" + _canonical_url(url).encode("utf-8") + b"\n")
+    digest.update(body or b"")
+    return digest.hexdigest()[:32]
+
+
+def is_transient(status: int) -> bool:
+    """Rate limits and server errors: worth retrying later, never worth recording."""
+    return status == 429 or status >= 500
+
+
+def _make_adapter_class():
+    # Defined lazily so importing this module doesn't import requests
+    from requests.adapters import HTTPAdapter
+    from requests.exceptions import ConnectionError as RequestsConnectionError
+    from requests.models import Response
+    from requests.structures import CaseInsensitiveDict
+
+    class ReplayAdapter(HTTPAdapter):
+        def __init__(self, mode: str, fixtures_dir: str = DEFAULT_FIXTURES_DIR,
+                     latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                     seed: Optional[int] = None, live_adapter: Optional[HTTPAdapter] = None):
+            super().__init__()
+            if mode not in ("record", "replay"):
+                raise ValueError(f"Unknown replay mode: {mode}")
+            self.mode = mode
+            self.fixtures_dir = fixtures_dir
+            self.latency_ms = latency_ms
+            self.jitter_ms = jitter_ms
+            self.error_rate = error_rate
+            self.live_adapter = live_adapter or HTTPAdapter()
+            self._rng = random.Random(seed)
+            self._rng_lock = threading.Lock()
+
+        def _fixture_path(self, request) -> str:
+            upstream = metrics.upstream_for_url(request.url)
+            key = fixture_key(request.method, request.url, request.body)
+            return os.path.join(self.fixtures_dir, upstream, key + ".json")
+
+        def send(self, request, **kwargs):
+            if self.mode == "record":
+                response = self.live_adapter.send(request, **kwargs)
+                if not is_transient(response.status_code):
+                    self._save(request, response)
+                return response
+            return self._replay(request)
+
+        def _save(self, request, response):
+            path = self._fixture_path(request)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fixture = {
+                "request": {"method": request.method, "url": _canonical_url(request.url)},
+                "response": {
+                    "status": response.status_code,
+                    "reason": response.reason,
+                    "headers": {k: v for k, v in response.headers.items() if k in KEPT_HEADERS},
+                    # .content is already decoded from gzip/deflate
+                    "body_b64": base64.b64encode(response.content).decode("ascii")
+                },
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            }
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(fixture, f, indent=1)
+
+        def _replay(self, request):
+            with self._rng_lock:
+                delay_ms = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+                inject_error = self._rng.random() < self.error_rate
+                error_kind = self._rng.choice(("status_503", "connection"))
+            if delay_ms > 0:
+                time.sleep(delay_ms / 1000.0)
+
+            if inject_error and error_kind == "connection":
+                raise RequestsConnectionError(f"Injected connection error for {request.url}", request=request)
+            if inject_error:
+                return self._build_response(request, 503, "Service Unavailable (injected)", {}, b"")
+
+            path = self._fixture_path(request)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    fixture = json.load(f)
+            except OSError:
+                raise RequestsConnectionError(
+                    f"No recorded fixture for {request.method} {request.url} ({path})", request=request
+                )
+            recorded = fixture["response"]
+            return self._build_response(request, recorded["status"], recorded.get("reason", ""),
+                                        recorded.get("headers", {}), base64.b64decode(recorded["body_b64"]))
+
+        def _build_response(self, request, status, reason, headers, body):
+            response = Response()
+            response.status_code = status
+            response.reason = reason
+            response.headers = CaseInsensitiveDict(headers)
+            response._content = body
+            response.encoding = "utf-8"
+            response.url = request.url
+            response.request = request
+            response.connection = self
+            return response
+
+        def close(self):
+            self.live_adapter.close()
+            super().close()
+
+    return ReplayAdapter
+
+
+_adapter_class = None
+
+
+def make_replay_adapter(mode: str, **options):
+    global _adapter_class
+    if _adapter_class is None:
+        _adapter_class = _make_adapter_class()
+    return _adapter_class(mode, **options)
+
+
+def adapter_from_env(live_adapter=None):
+    """ReplayAdapter configured from HTTP_REPLAY_* variables, or None when disabled."""
+    mode = os.environ.get("HTTP_REPLAY_MODE", "").strip().lower()
+    if not mode or mode == "off":
+        return None
+    seed = os.environ.get("HTTP_REPLAY_SEED")
+    return make_replay_adapter(
+        mode,
+        fixtures_dir=os.environ.get("HTTP_REPLAY_DIR", DEFAULT_FIXTURES_DIR),
+        latency_ms=float(os.environ.get("HTTP_REPLAY_LATENCY_MS", 0)),
+        jitter_ms=float(os.environ.get("HTTP_REPLAY_JITTER_MS", 0)),
+        error_rate=float(os.environ.get("HTTP_REPLAY_ERROR_RATE", 0)),
+        seed=int(seed) if seed is not None else None,
+        live_adapter=live_adapter
+    )
+
+
+def replay_enabled() -> bool:
+    return os.environ.get("HTTP_REPLAY_MODE", "").strip().lower() in ("record", "replay")
@@ -1,43 +1,71 @@
-import pandas as pd
-from spanish_dni import validate
-from supabase import create_client, Client
 import os
 import json
+import threading
+
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")
 
 # Placeholder for Supabase Credentials (to be loaded from .env)
 url: str = os.environ.get("SUPABASE_URL", "https://your-project.supabase.co")
 key: str = os.environ.get("SUPABASE_KEY", "your-anon-key")
-supabase: Client = create_client(url, key)
+
+# The client is created on first use, not at import time: building it at
+# module scope made every import slow and failed without network/credentials.
+_supabase = None
+_supabase_lock = threading.Lock()
+
+def get_supabase():
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            from supabase import create_client
+            _supabase = create_client(url, key)
+        return _supabase
+
+# libpostal is optional; probe it once instead of retrying a failing import per row
+_parse_address = None
+_postal_checked = False
 
 def normalize_address(raw_address):
     """
     Uses libpostal (or simple heuristic if libpostal not installed) to normalize address.
     """
-    try:
-        from postal.parser import parse_address
-        parsed = parse_address(raw_address)
-        # Convert list of tuples to dict
-        return {k: v for v, k in parsed}
-    except ImportError:
-        # Fallback if libpostal is not available in this environment
+    global _parse_address, _postal_checked
+    if not _postal_checked:
+        try:
+            from postal.parser import parse_address
+            _parse_address = parse_address
+        except ImportError:
+            # Fallback if libpostal is not available in this environment
+            _parse_address = None
+        _postal_checked = True
+
+    if _parse_address is None:
         return {"raw": raw_address}
+    parsed = _parse_address(raw_address)
+    # Convert list of tuples to dict
+    return {k: v for v, k in parsed}
 
 def validate_dni(dni):
     """
     Validates DNI using spanish-dni library.
     """
     try:
-        return validate(dni)
+        from spanish_dni.validator import validate_dni as validate
+    except ImportError:
+        # Older spanish-dni releases
+        from spanish_dni import validate
+    try:
+        return bool(validate(dni))
     except Exception:
         return False
 
-def import_census(file_path):
-    print(f"Reading file: {file_path}")
-    try:
-        df = pd.read_excel(file_path)
-    except Exception as e:
-        return {"error": f"Failed to read Excel: {str(e)}"}
-
+def validate_census(df):
+    """
+    Validation step of the import (no I/O): splits the rows of a census
+    DataFrame into (valid_records, invalid_records).
+    """
     valid_records = []
     invalid_records = []
 
@@ -45,7 +73,7 @@ def import_census(file_path):
     # Normalize columns to lowercase
     df.columns = [c.lower().strip() for c in df.columns]
 
-    for index, row in df.iterrows():
+    for index, row in enumerate(df.to_dict('records')):
         dni = str(row.get('dni', '')).strip().upper()
         name = str(row.get('name', '')).strip()
         address = str(row.get('address', '')).strip()
@@ -74,6 +102,17 @@ def import_census(file_path):
             record['error'] = ", ".join(reason)
             invalid_records.append(record)
 
+    return valid_records, invalid_records
+
+def import_census(file_path):
+    print(f"Reading file: {file_path}")
+    try:
+        df = pd.read_excel(file_path)
+    except Exception as e:
+        return {"error": f"Failed to read Excel: {str(e)}"}
+
+    valid_records, invalid_records = validate_census(df)
+
     # Bulk Insert Valid Records to Supabase
     if valid_records:
         print(f"Inserting {len(valid_records)} valid records...")
@@ -89,7 +128,7 @@ def import_census(file_path):
             })
         
         try:
-            data, count = supabase.table('people').upsert(db_rows, on_conflict='dni').execute()
+            data, count = get_supabase().table('people').upsert(db_rows, on_conflict='dni').execute()
             print("Insert successful.")
         except Exception as e:
             print(f"Supabase Error: {str(e)}")
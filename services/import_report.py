@@ -0,0 +1,129 @@
+"""
+Import-Time Report for the services (cold start of api_wrapper.py).
+
+Runs `python -X importtime` in a fresh interpreter for the modules an action
+needs and reports per-module self/cumulative import time.
+
+Usage:
+    python import_report.py                      # all actions
+    python import_report.py canon_update --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules imported on the cold path of each action
+ACTION_MODULES = {
+    "canon_update": ["api_wrapper", "canon_indexer"],
+    "generate_document": ["api_wrapper", "document_generator"],
+    "energy_audit": ["api_wrapper", "energy_audit_advanced"],
+    "deep_audit": ["api_wrapper", "energy_audit_deep_research"],
+    "portfolio_audit": ["api_wrapper", "portfolio_audit"],
+    "screening": ["api_wrapper", "screening"],
+    "uncertainty_audit": ["api_wrapper", "uncertainty"],
+    "solar_orientation": ["api_wrapper", "solar_orientation"],
+    "repowering": ["api_wrapper", "repowering"],
+    "streaming_audit": ["api_wrapper", "streaming_audit"],
+}
+
+# Cold-start budgets (milliseconds of import time). The defaults leave room
+# for slow CI machines; tighten with IMPORT_BUDGET_<ACTION>_MS.
+DEFAULT_BUDGETS_MS = {
+    "canon_update": 100,
+    "generate_document": 250,
+}
+
+# Heavy packages that must not be imported just by loading an action's modules
+HEAVY_MODULES = ("pandas", "numpy", "pvlib", "requests", "supabase", "scipy")
+
+
+def budget_ms(action: str) -> float:
+    env_name = f"IMPORT_BUDGET_{action.upper()}_MS"
+    return float(os.environ.get(env_name, DEFAULT_BUDGETS_MS[action]))
+
+
+def measure_imports(modules: List[str], python: str = sys.executable) -> Dict:
+    """
+    Imports `modules` in a fresh interpreter under -X importtime.
+
+    Returns {"total_us", "modules": [{name, self_us, cumulative_us, depth}],
+    "loaded": set of top-level package names}.
+    """
+    statement = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", statement],
+        cwd=SERVICES_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import failed: {proc.stderr.strip().splitlines()[-1]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "name": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": depth
+        })
+
+    # Interpreter startup (site and whatever .pth files pull in) is reported
+    # first and ends with "site"; it is the same for every action, so skip it.
+    site_rows = [i for i, r in enumerate(rows) if r["name"] == "site" and r["depth"] == 0]
+    if site_rows:
+        rows = rows[site_rows[0] + 1:]
+
+    # Top-level entries (smallest depth) add up to the whole import cost
+    min_depth = min((r["depth"] for r in rows), default=0)
+    total_us = sum(r["cumulative_us"] for r in rows if r["depth"] == min_depth)
+
+    return {
+        "total_us": total_us,
+        "modules": rows,
+        "loaded": {r["name"].split(".")[0] for r in rows}
+    }
+
+
+def action_report(action: str) -> Dict:
+    measured = measure_imports(ACTION_MODULES[action])
+    return {
+        "action": action,
+        "total_ms": round(measured["total_us"] / 1000, 1),
+        "budget_ms": budget_ms(action) if action in DEFAULT_BUDGETS_MS else None,
+        "heavy_loaded": sorted(m for m in HEAVY_MODULES if m in measured["loaded"]),
+        "modules": measured["modules"]
+    }
+
+
+def print_report(report: Dict, top: int = 10):
+    budget = f" (budget {report['budget_ms']:.0f} ms)" if report["budget_ms"] else ""
+    print(f"\n{report['action']}: {report['total_ms']:.1f} ms{budget}")
+    print(f"  heavy modules loaded: {', '.join(report['heavy_loaded']) or 'none'}")
+    print(f"  {'cumulative ms':>14} {'self ms':>9}  module")
+    slowest = sorted(report["modules"], key=lambda r: r["cumulative_us"], reverse=True)[:top]
+    for row in slowest:
+        print(f"  {row['cumulative_us'] / 1000:>14.1f} {row['self_us'] / 1000:>9.1f}  {row['name']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import time of api_wrapper actions")
+    parser.add_argument("actions", nargs="*", default=list(ACTION_MODULES))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("IMPORT TIME REPORT (-X importtime, fresh interpreter)")
+    print("=" * 60)
+    for action in args.actions:
+        try:
+            print_report(action_report(action), args.top)
+        except RuntimeError as e:
+            print(f"\n{action}: {e}")
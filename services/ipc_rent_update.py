@@ -1,8 +1,9 @@
-import requests
 import json
 from datetime import datetime, date
 import math
 
+from http_client import get_http_client
+
 class IPCRentUpdater:
     def __init__(self):
         self.ine_base_url = "https://servicios.ine.es/wstempus/js/es/DATOS_SERIE"
@@ -20,7 +21,7 @@ class IPCRentUpdater:
         url = f"{self.ine_base_url}/{self.series_code}?tip=AM"
         
         try:
-            r = requests.get(url, timeout=5)
+            r = get_http_client().get(url)
             r.raise_for_status()
             data = r.json()
             
@@ -0,0 +1,278 @@
+"""
+Asynchronous Job Queue for long-running actions (e.g. multi-year deep_audit).
+
+Jobs are persisted in a local SQLite file, so status and results survive the
+process that ran them and can be polled from any other process:
+
+    job_submit  -> {"job_id": "...", "status": "queued"}
+    job_status  -> {"status": "running", "progress": {"stage": "meteo_fetched", ...}}
+                -> {"status": "done", "result": {...}}
+
+Work runs on a background thread pool inside the persistent server
+(api_server.py). In one-shot mode the job is handed to a detached
+`python job_queue.py run <job_id>` process instead, so the caller returns
+immediately either way.
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+DEFAULT_DB_PATH = os.environ.get(
+    "JOBS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3")
+)
+
+# A running job older than this is assumed dead when the queue restarts,
+# even if its worker PID looks alive (the PID may have been reused)
+STALE_JOB_SECONDS = float(os.environ.get("JOBS_STALE_SECONDS", 6 * 3600))
+
+# Identifies this process among workers that got the same PID (containers
+# restart the server as PID 1 every time)
+WORKER_TOKEN = uuid.uuid4().hex
+
+SCHEMA = """
+create table if not exists jobs (
+    id text primary key,
+    action text not null,
+    data text not null,
+    status text not null,           -- queued | running | done | failed
+    stage text,
+    progress real default 0,
+    stages text default '[]',       -- JSON list of {stage, at}
+    result text,
+    error text,
+    created_at real not null,
+    started_at real,
+    finished_at real,
+    worker_pid integer,             -- process running the job
+    worker_token text               -- WORKER_TOKEN of that process
+)
+"""
+WORKER_COLUMNS = {"worker_pid": "integer", "worker_token": "text"}
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows; rely on STALE_JOB_SECONDS
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    return True
+
+
+class JobStore:
+    """SQLite-backed persistence for jobs. Safe to use from several threads."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(SCHEMA)
+            # Databases created before the worker columns existed
+            columns = {row["name"] for row in conn.execute("pragma table_info(jobs)")}
+            for name, kind in WORKER_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"alter table jobs add column {name} {kind}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation: sqlite3 connections
+        # cannot be shared across threads by default.
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, action: str, data: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "insert into jobs (id, action, data, status, created_at) values (?, ?, ?, 'queued', ?)",
+                (job_id, action, json.dumps(data), time.time())
+            )
+        return job_id
+
+    def claim(self, job_id: str) -> bool:
+        """Marks a queued job as running by this process. False if another worker got it first."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "update jobs set status = 'running', started_at = ?, worker_pid = ?, worker_token = ? "
+                "where id = ? and status = 'queued'",
+                (time.time(), os.getpid(), WORKER_TOKEN, job_id)
+            )
+            return cursor.rowcount == 1
+
+    def update_progress(self, job_id: str, stage: str, fraction: float):
+        with self._connect() as conn:
+            row = conn.execute("select stages from jobs where id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["stages"]) if row else []
+            stages.append({"stage": stage, "at": time.time()})
+            conn.execute(
+                "update jobs set stage = ?, progress = ?, stages = ? where id = ?",
+                (stage, round(fraction, 3), json.dumps(stages), job_id)
+            )
+
+    def finish(self, job_id: str, result: dict):
+        # Handlers report their own failures as {"error": ...} results
+        if isinstance(result, dict) and "error" in result:
+            with self._connect() as conn:
+                conn.execute(
+                    "update jobs set status = 'failed', result = ?, error = ?, finished_at = ? where id = ?",
+                    (json.dumps(result), str(result["error"]), time.time(), job_id)
+                )
+            return
+
+        with self._connect() as conn:
+            conn.execute(
+                "update jobs set status = 'done', progress = 1, result = ?, finished_at = ? where id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._connect() as conn:
+            conn.execute(
+                "update jobs set status = 'failed', error = ?, finished_at = ? where id = ?",
+                (error, time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(row)
+
+    def interrupted_jobs(self, stale_after: float = STALE_JOB_SECONDS):
+        """
+        Jobs still queued, plus running jobs whose worker is gone: its PID
+        no longer exists, the PID is now this process (a restart), or the
+        job started too long ago to still be alive.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "select id, status, started_at, worker_pid, worker_token from jobs "
+                "where status in ('queued', 'running')"
+            ).fetchall()
+        interrupted = []
+        for row in rows:
+            if row["status"] == "running" and not self._orphaned(row, stale_after):
+                continue
+            interrupted.append((row["id"], row["status"]))
+        return interrupted
+
+    @staticmethod
+    def _orphaned(row, stale_after: float) -> bool:
+        if (row["started_at"] or 0) < time.time() - stale_after:
+            return True
+        pid = row["worker_pid"]
+        if pid is None:
+            return False  # Claimed before worker PIDs were recorded: only the age tells
+        if pid == os.getpid():
+            return row["worker_token"] != WORKER_TOKEN
+        return not _pid_alive(pid)
+
+
+def format_job(job: Dict) -> Dict:
+    """Public view of a job row (what job_status returns)."""
+    response = {
+        "job_id": job["id"],
+        "action": job["action"],
+        "status": job["status"],
+        "progress": {
+            "stage": job["stage"],
+            "fraction": job["progress"],
+            "stages": json.loads(job["stages"] or "[]")
+        },
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
+    if job["status"] in ("done", "failed"):
+        response["result"] = json.loads(job["result"]) if job["result"] else None
+        response["error"] = job["error"]
+    return response
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on a background worker pool and records their state.
+
+    `runner(action, data, progress)` does the actual work; `progress(stage,
+    fraction)` is called by it at each milestone.
+    """
+
+    def __init__(self, runner: Callable, store: Optional[JobStore] = None, workers: int = 2):
+        self.runner = runner
+        self.store = store or JobStore()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+        self._recover()
+
+    def _recover(self):
+        # A restart loses the in-memory pool: requeue what never started and
+        # fail what was cut off halfway.
+        for job_id, status in self.store.interrupted_jobs():
+            if status == "queued":
+                self.executor.submit(self._run, job_id)
+            else:
+                self.store.fail(job_id, "Interrupted: worker stopped before finishing")
+
+    def submit(self, action: str, data: dict) -> str:
+        job_id = self.store.create(action, data)
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id: str):
+        run_job(self.store, job_id, self.runner)
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+def run_job(store: JobStore, job_id: str, runner: Callable):
+    """Executes one stored job and writes its result back to the store."""
+    job = store.get(job_id)
+    if job is None or not store.claim(job_id):
+        return
+
+    try:
+        result = runner(
+            job["action"],
+            json.loads(job["data"]),
+            lambda stage, fraction: store.update_progress(job_id, stage, fraction)
+        )
+        store.finish(job_id, result)
+    except Exception as e:
+        store.fail(job_id, str(e))
+
+
+def spawn_detached_runner(job_id: str, db_path: str = DEFAULT_DB_PATH):
+    """
+    Starts `python job_queue.py run <job_id>` in its own session so the job
+    outlives the one-shot api_wrapper process that submitted it.
+    """
+    script = os.path.abspath(__file__)
+    env = dict(os.environ, JOBS_DB_PATH=db_path)
+    subprocess.Popen(
+        [sys.executable, script, "run", job_id],
+        cwd=os.path.dirname(script),
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "run":
+        import api_wrapper
+        run_job(JobStore(DEFAULT_DB_PATH), sys.argv[2], api_wrapper.run_job_action)
+    else:
+        print("Usage: python job_queue.py run <job_id>")
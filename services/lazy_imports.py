@@ -0,0 +1,42 @@
+"""
+Deferred imports for heavy dependencies.
+
+    pd = lazy_module("pandas")      # nothing imported yet
+    ...
+    df = pd.DataFrame(...)          # pandas is imported here, on first use
+
+Keeps the cold start of api_wrapper.py cheap for actions that never touch
+pandas/pvlib/requests (canon_update, generate_document...). Measure with
+import_report.py; test_import_budget.py guards the budget.
+"""
+import importlib
+import sys
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            # import_module holds the import lock, so concurrent first uses are safe
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name: str):
+    """Returns the module if already imported, otherwise a LazyModule proxy."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -0,0 +1,269 @@
+"""
+Meteo Cache: persistent local store for Open-Meteo archive series.
+
+Archive (ERA5) data for past dates never changes, so every hourly value is
+downloaded once and kept on disk:
+
+    services/.cache/meteo/<lat>_<lon>/<variable>/<year>.npy        float32, one value per UTC hour
+    services/.cache/meteo/<lat>_<lon>/<variable>/<year>.mask.npy   uint8, 1 = hour already fetched
+
+- key: (lat, lon) snapped to the provider grid of each variable (meteo_grid.py:
+  ERA5-Land 0.1°, override with METEO_CACHE_SNAP_DEG; ERA5 0.25° for the
+  100 m wind) + variable name, so nearby parks share one entry and requests
+  with different variable sets share the columns they have in common
+- a request only fetches the UTC dates with missing hours (merged into
+  contiguous spans, split by year and fetched concurrently, see
+  range_planner.py) and serves the rest from disk; re-auditing an already
+  covered period costs zero network calls
+- prefetch fills many locations with one multi-location request per batch
+  of grid cells (e.g. every park of a portfolio before auditing them)
+- hours newer than ARCHIVE_FINAL_DAYS are never marked as fetched while
+  they are still null (the archive publishes with a delay)
+
+Usage:
+    from meteo_cache import get_meteo_cache
+    df = get_meteo_cache().get_frame(lat, lon, "2023-01-01", "2023-12-31", ["wind_speed_100m"])
+    # DataFrame indexed by naive Europe/Madrid local time, like Open-Meteo with timezone=Europe/Madrid
+"""
+import io
+import os
+import threading
+from contextlib import ExitStack
+from datetime import date, timedelta
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import metrics
+from hour_index import local_range_utc
+from lazy_imports import lazy_module
+from meteo_grid import GRID_DEG, MULTI_MAX_LOCATIONS, fetch_archive, fetch_archive_multi, grid_cells
+from range_planner import date_spans, fetch_chunks, find_gaps, plan_spans
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "METEO_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "meteo")
+)
+# Provider grid cell (ERA5-Land variables): every request inside one cell gets the same series
+SNAP_DEG = float(os.environ.get("METEO_CACHE_SNAP_DEG", GRID_DEG))
+ARCHIVE_FINAL_DAYS = 7
+LOCAL_TIMEZONE = "Europe/Madrid"
+
+
+def _year_start(year: int):
+    return np.datetime64(f"{year}-01-01T00", "h")
+
+
+def _hours_between(start, end) -> int:
+    return int((end - start) // np.timedelta64(1, "h"))
+
+
+def _hours_in_year(year: int) -> int:
+    return _hours_between(_year_start(year), _year_start(year + 1))
+
+
+class MeteoCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, snap_deg: float = SNAP_DEG,
+                 fetcher: Optional[Callable] = None, multi_fetcher: Optional[Callable] = None):
+        self.cache_dir = cache_dir
+        self.snap_deg = snap_deg
+        # fetcher(lat, lon, start_date, end_date, variables) -> (hours, {variable: values})
+        self.fetcher = fetcher or fetch_archive
+        # multi_fetcher(locations, start_date, end_date, variables) -> [(hours, {variable: values})]
+        self.multi_fetcher = multi_fetcher or fetch_archive_multi
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    # --- storage ---
+
+    def _location_dir(self, lat: float, lon: float) -> str:
+        return os.path.join(self.cache_dir, f"{lat:+.4f}_{lon:+.4f}")
+
+    def _lock(self, location_dir: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(location_dir, threading.Lock())
+
+    def _load_year(self, location_dir: str, variable: str, year: int):
+        base = os.path.join(location_dir, variable, str(year))
+        n = _hours_in_year(year)
+        try:
+            return np.load(base + ".npy"), np.load(base + ".mask.npy")
+        except (OSError, ValueError):
+            return np.full(n, np.nan, dtype=np.float32), np.zeros(n, dtype=np.uint8)
+
+    @staticmethod
+    def _save_array(path: str, array):
+        # Atomic replace: readers never see a half-written file
+        buffer = io.BytesIO()
+        np.save(buffer, array)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    def _save_year(self, location_dir: str, variable: str, year: int, values, mask):
+        directory = os.path.join(location_dir, variable)
+        os.makedirs(directory, exist_ok=True)
+        self._save_array(os.path.join(directory, f"{year}.npy"), values)
+        self._save_array(os.path.join(directory, f"{year}.mask.npy"), mask)
+
+    def _read(self, location_dir: str, variables: Sequence[str], start, end):
+        """Values and fetched-mask for hours [start, end] (datetime64[h], inclusive)."""
+        n = _hours_between(start, end) + 1
+        values = {v: np.full(n, np.nan, dtype=np.float32) for v in variables}
+        fetched = np.ones(n, dtype=bool)
+        for year in range(start.astype(object).year, end.astype(object).year + 1):
+            first = max(start, _year_start(year))
+            last = min(end, _year_start(year + 1) - np.timedelta64(1, "h"))
+            src = slice(_hours_between(_year_start(year), first), _hours_between(_year_start(year), last) + 1)
+            dst = slice(_hours_between(start, first), _hours_between(start, last) + 1)
+            for variable in variables:
+                year_values, year_mask = self._load_year(location_dir, variable, year)
+                values[variable][dst] = year_values[src]
+                fetched[dst] &= year_mask[src].astype(bool)
+        return values, fetched
+
+    def _store(self, location_dir: str, hours, fetched_values: Dict):
+        final_before = np.datetime64(date.today() - timedelta(days=ARCHIVE_FINAL_DAYS), "h")
+        years = hours.astype("datetime64[Y]").astype(int) + 1970
+        for year in np.unique(years):
+            in_year = years == year
+            index = (hours[in_year] - _year_start(int(year))).astype(np.int64)
+            for variable, series in fetched_values.items():
+                year_values, year_mask = self._load_year(location_dir, variable, int(year))
+                new_values = series[in_year]
+                year_values[index] = new_values
+                # Null recent hours may still be published: don't mark them as done
+                done = ~np.isnan(new_values) | (hours[in_year] < final_before)
+                year_mask[index] = np.maximum(year_mask[index], done.astype(np.uint8))
+                self._save_year(location_dir, variable, int(year), year_values, year_mask)
+
+    def _missing_spans(self, location_dir: str, variables: Sequence[str], start, end):
+        """Year chunks (start, end) of the UTC dates with hours not fetched yet."""
+        _, fetched = self._read(location_dir, variables, start, end)
+        hours = np.arange(start, end + np.timedelta64(1, "h"), dtype="datetime64[h]")
+        return plan_spans(date_spans(np.unique(hours[~fetched].astype("datetime64[D]"))), "year")
+
+    # --- public API ---
+
+    def get_series(self, lat: float, lon: float, start_utc, end_utc, variables: Sequence[str]):
+        """
+        Hourly values for UTC hours [start_utc, end_utc] (inclusive, datetime64[h]).
+        Each variable comes from its own grid cell (meteo_grid.grid_cells).
+        Fetches only the dates with missing hours. Returns (hours, {variable: float32 values}).
+        """
+        start_utc = np.datetime64(start_utc, "h")
+        end_utc = np.datetime64(end_utc, "h")
+        variables = list(dict.fromkeys(variables))
+        hours = np.arange(start_utc, end_utc + np.timedelta64(1, "h"), dtype="datetime64[h]")
+
+        values = {}
+        for (cell_lat, cell_lon), cell_variables in grid_cells(lat, lon, variables, self.snap_deg).items():
+            values.update(self._cell_series(cell_lat, cell_lon, hours, cell_variables))
+        return hours, {v: values[v] for v in variables}
+
+    def _cell_series(self, lat: float, lon: float, hours, variables: Sequence[str]) -> Dict:
+        start_utc, end_utc = hours[0], hours[-1]
+        location_dir = self._location_dir(lat, lon)
+
+        with self._lock(location_dir):
+            values, fetched = self._read(location_dir, variables, start_utc, end_utc)
+            cached_hours = int(fetched.sum())
+            # One request per year of missing dates, all at once
+            spans = plan_spans(date_spans(np.unique(hours[~fetched].astype("datetime64[D]"))), "year")
+            results = fetch_chunks(lambda s, e: self.fetcher(lat, lon, s, e, variables), spans)
+            for result in results:
+                if result.ok:
+                    self._store(location_dir, *result.value)
+            failed = [r for r in results if not r.ok]
+            if failed and len(failed) == len(results):
+                raise failed[0].error
+            for result in failed:
+                print(f"Meteo chunk {result.start}..{result.end} failed: {result.error}")
+            if spans:
+                values, fetched = self._read(location_dir, variables, start_utc, end_utc)
+
+        metrics.REGISTRY.inc("socm_meteo_cache_hours_total", cached_hours,
+                             "Meteo hours requested, by served from cache (hit) or not (miss)", result="hit")
+        metrics.REGISTRY.inc("socm_meteo_cache_hours_total", len(hours) - cached_hours,
+                             result="miss")
+        if spans:
+            metrics.REGISTRY.inc("socm_meteo_cache_fetches_total", len(spans),
+                                 "Open-Meteo archive requests made by the meteo cache")
+        return values
+
+    def prefetch(self, locations: Sequence[Tuple[float, float]], start_date: str, end_date: str,
+                 variables: Sequence[str], timezone: str = LOCAL_TIMEZONE) -> Dict:
+        """
+        Fills the cache for many (lat, lon) over local dates [start_date, end_date].
+        Locations are reduced to distinct grid cells (one per variable grid);
+        cells missing the same dates and variables are fetched together,
+        MULTI_MAX_LOCATIONS per request.
+        Failed requests are only reported: get_frame retries them one by one.
+        """
+        start_utc, end_utc = local_range_utc(start_date, end_date, timezone)
+        cells: Dict[Tuple, list] = {}
+        for lat, lon in locations:
+            for cell, cell_variables in grid_cells(lat, lon, variables, self.snap_deg).items():
+                cells[cell] = list(dict.fromkeys(cells.get(cell, []) + cell_variables))
+        directories = {cell: self._location_dir(*cell) for cell in cells}
+        requests = 0
+
+        with ExitStack() as stack:
+            # Sorted, so two overlapping prefetches can't deadlock
+            for directory in sorted(directories.values()):
+                stack.enter_context(self._lock(directory))
+
+            groups: Dict[Tuple, list] = {}
+            for cell, cell_variables in cells.items():
+                spans = self._missing_spans(directories[cell], cell_variables, start_utc, end_utc)
+                if spans:
+                    groups.setdefault((tuple(spans), tuple(cell_variables)), []).append(cell)
+
+            for (spans, group_variables), group in groups.items():
+                for first in range(0, len(group), MULTI_MAX_LOCATIONS):
+                    batch = group[first:first + MULTI_MAX_LOCATIONS]
+                    results = fetch_chunks(lambda s, e: self.multi_fetcher(batch, s, e, list(group_variables)),
+                                           list(spans))
+                    for result in results:
+                        if not result.ok:
+                            print(f"Meteo prefetch {result.start}..{result.end} failed: {result.error}")
+                            continue
+                        for cell, (hours, values) in zip(batch, result.value):
+                            self._store(directories[cell], hours, values)
+                    requests += len(results)
+
+        if requests:
+            metrics.REGISTRY.inc("socm_meteo_cache_fetches_total", requests,
+                                 "Open-Meteo archive requests made by the meteo cache")
+        return {"locations": len(locations), "cells": len(cells), "requests": requests}
+
+    def get_frame(self, lat: float, lon: float, start_date: str, end_date: str,
+                  variables: Sequence[str], timezone: str = LOCAL_TIMEZONE):
+        """
+        DataFrame for local dates [start_date, end_date] indexed by naive local time.
+        The repeated hour when DST ends is dropped (first one kept), so the
+        index is unique; the skipped hour when DST starts does not exist.
+        Hours still without data are NaN and listed in df.attrs["gaps"].
+        """
+        start_utc, end_utc = local_range_utc(start_date, end_date, timezone)
+        hours, values = self.get_series(lat, lon, start_utc, end_utc, variables)
+        index = pd.DatetimeIndex(hours).tz_localize("UTC").tz_convert(timezone).tz_localize(None)
+        df = pd.DataFrame({v: values[v].astype(np.float64).round(3) for v in values}, index=index)
+        df.index.name = "time"
+        df = df[~df.index.duplicated(keep="first")].copy()
+        df.attrs["gaps"] = find_gaps(df.index.strftime("%Y-%m-%dT%H:%M"), df.notna().all(axis=1).to_numpy())
+        return df
+
+
+_cache: Optional[MeteoCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_meteo_cache() -> MeteoCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MeteoCache()
+        return _cache
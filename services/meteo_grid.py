@@ -0,0 +1,117 @@
+"""
+Meteo Grid: Open-Meteo archive requests on the provider's grid.
+
+The archive's best_match serves each variable from the nearest point of its
+reanalysis grid: ERA5-Land (0.1°, ~9 km here) for 2 m temperature, pressure,
+10 m wind and radiation, and ERA5 (0.25°) for the 100 m wind, which
+ERA5-Land doesn't have. Two parks a few hundred meters apart get the very
+same series, so coordinates are snapped to the grid of each variable before
+anything is fetched or cached (METEO_GRID_DEG, default 0.1, and
+METEO_ERA5_GRID_DEG, default 0.25). Snapping the 100 m wind to the 0.1° grid
+first could move a site into the neighbouring ERA5 cell, so every variable
+is snapped from the original coordinate:
+
+    cell = grid_cell(42.512, -7.834)          # (42.5, -7.8)
+    grid_cells(42.64, -7.834, ["temperature_2m", "wind_speed_100m"])
+    # {(42.6, -7.8): ["temperature_2m"], (42.75, -7.75): ["wind_speed_100m"]}
+    cells = group_by_cell([(42.512, -7.834), (42.49, -7.81), (43.1, -8.0)], ["temperature_2m"])
+    # {((42.5, -7.8),): [0, 1], ((43.1, -8.0),): [2]}
+
+- fetch_archive: one location, one request
+- fetch_archive_multi: up to MULTI_MAX_LOCATIONS cells in one request,
+  using Open-Meteo's comma-separated latitude/longitude form
+- meteo_cache.MeteoCache.prefetch uses the latter to fill many parks (or
+  houses) with one call per batch of cells; concurrent requests for the same
+  cell wait on its cache lock and are then served from disk
+"""
+import os
+from typing import Dict, List, Sequence, Tuple
+
+from http_client import get_http_client
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+# ERA5-Land resolution (best_match in the archive API)
+GRID_DEG = float(os.environ.get("METEO_GRID_DEG", 0.1))
+# ERA5 resolution, for the variables ERA5-Land doesn't have
+ERA5_GRID_DEG = float(os.environ.get("METEO_ERA5_GRID_DEG", 0.25))
+ERA5_VARIABLES = frozenset({"wind_speed_100m", "wind_direction_100m"})
+# Keeps the URL and the response size reasonable
+MULTI_MAX_LOCATIONS = int(os.environ.get("METEO_MULTI_MAX_LOCATIONS", 50))
+
+
+def snap(value: float, step: float = GRID_DEG) -> float:
+    return round(round(value / step) * step, 6)
+
+
+def grid_cell(lat: float, lon: float, step: float = GRID_DEG) -> Tuple[float, float]:
+    return snap(float(lat), step), snap(float(lon), step)
+
+
+def variable_grid(variable: str, step: float = GRID_DEG) -> float:
+    """Grid step of one archive variable: ERA5's for ERA5_VARIABLES, `step` for the rest."""
+    return ERA5_GRID_DEG if variable in ERA5_VARIABLES else step
+
+
+def grid_cells(lat: float, lon: float, variables: Sequence[str], step: float = GRID_DEG) -> Dict[Tuple, List[str]]:
+    """{grid cell: [variables served from it]} for one location, each variable snapped on its own grid."""
+    cells: Dict[Tuple, List[str]] = {}
+    for variable in dict.fromkeys(variables):
+        cells.setdefault(grid_cell(lat, lon, variable_grid(variable, step)), []).append(variable)
+    return cells
+
+
+def location_key(lat: float, lon: float, variables: Sequence[str], step: float = GRID_DEG) -> Tuple:
+    """The grid cells behind a location's variables: locations with equal keys get equal series."""
+    return tuple(grid_cells(lat, lon, variables, step))
+
+
+def group_by_cell(locations: Sequence[Tuple[float, float]], variables: Sequence[str],
+                  step: float = GRID_DEG) -> Dict[Tuple, List[int]]:
+    """(lat, lon) pairs -> {location_key: [indices of the locations sharing it]}, in first-seen order."""
+    cells: Dict[Tuple, List[int]] = {}
+    for i, (lat, lon) in enumerate(locations):
+        cells.setdefault(location_key(lat, lon, variables, step), []).append(i)
+    return cells
+
+
+def _parse_hourly(payload: Dict, variables: Sequence[str]):
+    hourly = payload["hourly"]
+    hours = np.array(hourly["time"], dtype="datetime64[h]")
+    # null -> NaN
+    return hours, {v: np.array(hourly[v], dtype=np.float32) for v in variables}
+
+
+def fetch_archive(lat: float, lon: float, start_date: str, end_date: str,
+                  variables: Sequence[str]) -> Tuple["np.ndarray", Dict[str, "np.ndarray"]]:
+    """
+    One Open-Meteo archive request in UTC.
+    Returns (hours as datetime64[h], {variable: float32 values}).
+    """
+    return fetch_archive_multi([(lat, lon)], start_date, end_date, variables)[0]
+
+
+def fetch_archive_multi(locations: Sequence[Tuple[float, float]], start_date: str, end_date: str,
+                        variables: Sequence[str]) -> List[Tuple]:
+    """
+    One Open-Meteo archive request for several locations (same dates and variables).
+    Returns [(hours, {variable: values})] in the order of `locations`.
+    """
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in locations),
+        "longitude": ",".join(str(lon) for _, lon in locations),
+        "start_date": start_date,
+        "end_date": end_date,
+        "hourly": ",".join(variables),
+        "timezone": "GMT"
+    }
+    r = get_http_client().get(ARCHIVE_URL, params=params)
+    r.raise_for_status()
+    payload = r.json()
+    # A single location comes back as an object, several as a list
+    payloads = payload if isinstance(payload, list) else [payload]
+    if len(payloads) != len(locations):
+        raise ValueError(f"Open-Meteo returned {len(payloads)} series for {len(locations)} locations")
+    return [_parse_hourly(p, variables) for p in payloads]
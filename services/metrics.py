@@ -0,0 +1,198 @@
+"""
+Latency & Throughput Metrics for api_wrapper actions.
+
+Every dispatched action records:
+- wall time, time spent in outbound HTTP (per upstream API) and compute time
+  (wall minus HTTP) as Prometheus-style histograms
+- request counts by status, and result cache hits/misses
+
+The `metrics` action (or GET /metrics on api_server.py) returns everything in
+Prometheus text format. Adding "timings": true to a request attaches the
+breakdown of that single call as a `_timings` block in its response.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# Seconds. Covers cheap actions (canon_update) up to multi-year audits.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Host fragment -> upstream label
+UPSTREAMS = {
+    "open-meteo.com": "open_meteo",
+    "esios.ree.es": "esios",
+    "re.jrc.ec.europa.eu": "pvgis",
+    "ine.es": "ine",
+    "catastro.meh.es": "catastro",
+    "groq.com": "groq",
+}
+
+
+def upstream_for_url(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    for fragment, name in UPSTREAMS.items():
+        if host.endswith(fragment):
+            return name
+    return host or "unknown"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, same semantics as a Prometheus histogram."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+
+    def _describe(self, name: str, kind: str, help_text: str):
+        self._help.setdefault(name, (kind, help_text))
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, "histogram", help_text)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, "counter", help_text)
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    for (metric, labels), h in sorted(self._histograms.items()):
+                        if metric != name:
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(h.buckets, h.counts):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{fmt_labels(labels, [('le', repr(bound))])} {cumulative}")
+                        lines.append(f"{name}_bucket{fmt_labels(labels, [('le', '+Inf')])} {h.count}")
+                        lines.append(f"{name}_sum{fmt_labels(labels)} {h.sum:.6f}")
+                        lines.append(f"{name}_count{fmt_labels(labels)} {h.count}")
+                else:
+                    for (metric, labels), value in sorted(self._counters.items()):
+                        if metric == name:
+                            lines.append(f"{name}{fmt_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class RequestTimings:
+    """Per-request breakdown, collected while an action runs."""
+
+    def __init__(self, action: str):
+        self.action = action
+        self.started = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.http_seconds: Dict[str, float] = {}
+        self.http_calls = 0
+        self.cache_status: Optional[str] = None
+        self.failed = False  # Set when the handler returns an {"error": ...} result
+        self._lock = threading.Lock()
+
+    def add_http(self, upstream: str, seconds: float):
+        # Handlers may fetch from several threads at once
+        with self._lock:
+            self.http_seconds[upstream] = self.http_seconds.get(upstream, 0.0) + seconds
+            self.http_calls += 1
+
+    @property
+    def total_http_seconds(self) -> float:
+        return sum(self.http_seconds.values())
+
+    @property
+    def compute_seconds(self) -> float:
+        # Concurrent fetches can add up to more than the wall time
+        return max(self.wall_seconds - self.total_http_seconds, 0.0)
+
+    def as_dict(self) -> Dict:
+        return {
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+            "compute_ms": round(self.compute_seconds * 1000, 2),
+            "http_ms": {k: round(v * 1000, 2) for k, v in sorted(self.http_seconds.items())},
+            "http_calls": self.http_calls,
+            "cache": self.cache_status
+        }
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record_http(url: str, seconds: float):
+    """Records one outbound HTTP call against the global and per-request metrics."""
+    upstream = upstream_for_url(url)
+    REGISTRY.observe("socm_http_request_duration_seconds", seconds,
+                     "Outbound HTTP call duration by upstream API", upstream=upstream)
+    timings = _current.get()
+    if timings is not None:
+        timings.add_http(upstream, seconds)
+
+
+@contextmanager
+def track_action(action: str):
+    """Times one action and publishes its histograms when it finishes."""
+    timings = RequestTimings(action)
+    token = _current.set(timings)
+    status = "error"
+    try:
+        yield timings
+        status = "error" if timings.failed else "ok"
+    finally:
+        _current.reset(token)
+        timings.wall_seconds = time.perf_counter() - timings.started
+
+        REGISTRY.inc("socm_action_requests_total", 1, "Dispatched actions by status",
+                     action=action, status=status)
+        REGISTRY.observe("socm_action_duration_seconds", timings.wall_seconds,
+                         "Wall time per action", action=action)
+        REGISTRY.observe("socm_action_http_seconds", timings.total_http_seconds,
+                         "Time spent in outbound HTTP per action", action=action)
+        REGISTRY.observe("socm_action_compute_seconds", timings.compute_seconds,
+                         "Wall time minus outbound HTTP per action", action=action)
+        if timings.cache_status is not None:
+            REGISTRY.inc("socm_cache_requests_total", 1, "Result cache lookups",
+                         action=action, result=timings.cache_status)
+
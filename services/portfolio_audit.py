@@ -0,0 +1,196 @@
+"""
+Portfolio Audit: audit every park paying the community in one call.
+
+Auditing parks one by one refetches the same prices and, for parks sharing a
+site, the same meteo. For a portfolio:
+
+    1. prices for the period are read once and shared by every park
+    2. meteo is fetched once per distinct grid cell (meteo_grid.py), many
+       cells per Open-Meteo request, at the same time as the prices
+    3. parks are simulated and priced on a worker pool (PORTFOLIO_WORKERS)
+    4. results per park + totals (overall and by type) with the discrepancy
+       against what the companies paid
+
+Usage:
+    from portfolio_audit import PortfolioAuditor
+    result = PortfolioAuditor(esios_token).run({
+        "start_date": "2024-01-01", "end_date": "2024-03-31",
+        "parks": [
+            {"id": "Eólico Norte", "type": "wind", "lat": 42.5, "lon": -7.8,
+             "turbine_model": "Vestas V90 3MW", "num_turbines": 10, "company_payment": 250000},
+            {"id": "Solar Sur", "type": "solar", "lat": 42.4, "lon": -7.9,
+             "peak_power_kwp": 5000, "company_payment": 60000}
+        ]
+    })
+
+A park with bad parameters or failed meteo only marks that park as an error.
+"""
+import math
+import os
+from typing import Callable, Dict, List, Optional
+
+from energy_audit_advanced import discrepancy_summary
+from energy_audit_deep_research import DeepResearchAuditor
+from meteo_cache import get_meteo_cache
+from meteo_grid import location_key
+from range_planner import map_parallel, run_parallel
+
+PORTFOLIO_WORKERS = int(os.environ.get("PORTFOLIO_WORKERS", 4))
+PARK_TYPES = ("wind", "solar")
+
+
+def _number(value) -> Optional[float]:
+    """value as a finite float, None if it isn't one (bools and lists included)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _invalid_fields(park: Dict) -> List[str]:
+    checks = {"lat": lambda x: -90 <= x <= 90, "lon": lambda x: -180 <= x <= 180,
+              "company_payment": lambda x: x >= 0, "peak_power_kwp": lambda x: x > 0,
+              "num_turbines": lambda x: x >= 1 and x.is_integer()}
+    invalid = []
+    for field, check in checks.items():
+        if park.get(field) in (None, ""):
+            continue
+        number = _number(park[field])
+        if number is None or not check(number):
+            invalid.append(field)
+    turbines = park.get("turbines")
+    if turbines and not (isinstance(turbines, list) and all(isinstance(t, dict) for t in turbines)):
+        invalid.append("turbines")
+    return invalid
+
+
+def _validate_park(park) -> Optional[str]:
+    if not isinstance(park, dict):
+        return "Invalid park"
+    if park.get("type") not in PARK_TYPES:
+        return f"Unknown park type: {park.get('type')}"
+    required = ["lat", "lon", "company_payment"]
+    if park["type"] == "solar":
+        required += ["peak_power_kwp"]
+    elif not park.get("turbines"):
+        required += ["turbine_model", "num_turbines"]
+    missing = [field for field in required if park.get(field) in (None, "")]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    invalid = _invalid_fields(park)
+    if invalid:
+        return f"Invalid fields: {', '.join(invalid)}"
+    return None
+
+
+def _totals(parks: List[Dict]) -> Dict:
+    production = sum(p["production_mwh"] for p in parks)
+    revenue = sum(p["revenue_eur"] for p in parks)
+    payment = sum(p["company_payment_eur"] for p in parks)
+    return {
+        "parks": len(parks),
+        "production_mwh": round(production, 2),
+        "capture_price": round(revenue / production, 2) if production > 0 else 0,
+        **discrepancy_summary(revenue, payment)
+    }
+
+
+class PortfolioAuditor:
+    def __init__(self, esios_token: Optional[str] = None, workers: int = PORTFOLIO_WORKERS):
+        self.auditor = DeepResearchAuditor(esios_token=esios_token)
+        self.workers = workers
+
+    def run(self, config: Dict, progress: Optional[Callable] = None) -> Dict:
+        """
+        Audits config["parks"] over [start_date, end_date].
+        `progress(stage, fraction)` is called after data_fetched and parks_done.
+        """
+        if progress is None:
+            progress = lambda stage, fraction: None
+
+        parks = config.get("parks")
+        if not isinstance(parks, list) or not parks:
+            return {"error": "parks must be a non-empty list of parks"}
+        start, end = config["start_date"], config["end_date"]
+
+        # 1. Validation: bad parks are reported, the rest still run
+        errors = {i: _validate_park(park) for i, park in enumerate(parks)}
+        valid = [i for i in range(len(parks)) if errors[i] is None]
+
+        # 2. Prices once + meteo once per distinct grid cell, all at the same time
+        #    (fetched at the first park of each cell: every park in it gets the same series)
+        keys = {i: self._location(parks[i]) for i in valid}
+        locations, variables = {}, {}
+        for i in valid:
+            locations.setdefault(keys[i], (float(parks[i]["lat"]), float(parks[i]["lon"])))
+            variables[keys[i]] = list(dict.fromkeys(variables.get(keys[i], [])
+                                                    + self.auditor.meteo_variables(parks[i])))
+        prices, frames = run_parallel(
+            lambda: self.auditor.get_prices(start, end),
+            lambda: self._fetch_meteo([(*locations[key], variables[key]) for key in locations], start, end)
+        )
+        meteo = dict(zip(locations, frames))
+        progress("data_fetched", 0.4)
+
+        # 3. Simulation + pricing per park on the worker pool
+        audited = map_parallel(lambda i: self._audit_park(parks[i], meteo[keys[i]], prices),
+                               valid, max_workers=self.workers)
+        results = [{"error": errors[i]} for i in range(len(parks))]
+        for i, result in zip(valid, audited):
+            results[i] = result
+        progress("parks_done", 0.9)
+
+        # 4. Per park + aggregated results
+        per_park = []
+        for i, (park, result) in enumerate(zip(parks, results)):
+            park_id = park.get("id", i) if isinstance(park, dict) else i
+            entry = {"id": park_id, "type": park.get("type") if isinstance(park, dict) else None}
+            per_park.append(dict(entry, status="error" if "error" in result else "ok", **result))
+
+        ok = [p for p in per_park if p["status"] == "ok"]
+        return {
+            "period": {"start": start, "end": end},
+            "parks": per_park,
+            "summary": {
+                "total": _totals(ok),
+                "by_type": {t: _totals([p for p in ok if p["type"] == t]) for t in PARK_TYPES
+                            if any(p["type"] == t for p in ok)},
+                "failed": len(per_park) - len(ok),
+                "meteo_locations": len(locations)
+            }
+        }
+
+    def _fetch_meteo(self, locations: List, start: str, end: str) -> List:
+        """Frames for [(lat, lon, variables)], in order."""
+        # Multi-location requests fill the cache (one prefetch per variable set);
+        # the frames are then read from disk
+        by_variables: Dict[tuple, List] = {}
+        for lat, lon, variables in locations:
+            by_variables.setdefault(tuple(variables), []).append((lat, lon))
+        for variables, points in by_variables.items():
+            get_meteo_cache().prefetch(points, start, end, list(variables))
+        return map_parallel(lambda loc: self.auditor.get_meteo_data(loc[0], loc[1], start, end, loc[2]),
+                            locations, max_workers=self.workers)
+
+    def _location(self, park: Dict):
+        return location_key(float(park["lat"]), float(park["lon"]), self.auditor.METEO_VARIABLES,
+                            get_meteo_cache().snap_deg)
+
+    def _audit_park(self, park: Dict, meteo, prices) -> Dict:
+        if meteo is None:
+            return {"error": "Meteo data failed"}
+        try:
+            production = self.auditor.simulate_park(park, meteo)
+            payment = float(park["company_payment"])
+        except (KeyError, TypeError, ValueError) as e:
+            return {"error": f"Simulation failed: {e}"}
+        priced = self.auditor.price_production(production, prices)
+        priced.pop("hourly_sample")
+        if "turbines" in production.attrs:
+            priced["turbines"] = production.attrs["turbines"]
+        result = dict(priced, **discrepancy_summary(priced["revenue_eur"], payment))
+        result["data_gaps"] = meteo.attrs.get("gaps")
+        return result
@@ -0,0 +1,345 @@
+"""
+Price Archive: local hourly (and quarter-hourly) electricity prices.
+
+Prices from ESIOS (Red Eléctrica) are stored once and read by every audit:
+
+    services/.cache/prices/<indicator>_<geo_id>_hourly.f32     float32, one value per UTC hour
+    services/.cache/prices/<indicator>_<geo_id>_quarter.f32    float32, one value per UTC quarter hour
+
+Both files are preallocated (NaN = no price yet) from ARCHIVE_EPOCH to
+ARCHIVE_END and indexed by UTC offset, so they are read with np.memmap:
+every worker process shares the same pages and nothing is copied or parsed.
+
+- sync: fetches from ESIOS only the days with missing prices, one request
+  per month, all months concurrently (range_planner.py)
+- audits with an ESIOS token sync their range first; without a token they
+  read whatever the archive has
+- hours still missing are filled with a deterministic mock (seeded duck
+  curve), and callers get the share of real prices to report it
+
+Sync from the command line (ESIOS_TOKEN in the environment):
+    python price_archive.py sync --start 2023-01-01            # up to tomorrow
+    python price_archive.py sync                               # continue where the archive ends
+    python price_archive.py status --start 2023-01-01
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hour_index import local_range_utc
+from http_client import get_http_client
+from lazy_imports import lazy_module
+from range_planner import date_spans, fetch_chunks, plan_spans
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+DEFAULT_ARCHIVE_DIR = os.environ.get(
+    "PRICE_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "prices")
+)
+ESIOS_BASE_URL = "https://api.esios.ree.es"
+# ESIOS indicator 1001 = "Precio mercado SPOT Diario" (€/MWh), as used by the auditors
+DEFAULT_INDICATOR = 1001
+DEFAULT_GEO_ID = 8741  # Península
+LOCAL_TIMEZONE = "Europe/Madrid"
+
+ARCHIVE_EPOCH = "2014-01-01T00"  # ESIOS history starts in 2014
+ARCHIVE_END = "2041-01-01T00"    # ~0.9 MB hourly / 3.8 MB quarter-hourly per indicator
+MOCK_SEED = 1001
+
+
+def _hour(value):
+    return np.datetime64(value, "h")
+
+
+def _offset(start, unit: str) -> int:
+    return int((np.datetime64(start, unit) - np.datetime64(ARCHIVE_EPOCH, unit)) // np.timedelta64(1, unit))
+
+
+def _hour_uniforms(hours, seed: int, stream: int):
+    """Uniforms in (0, 1] that depend only on (seed, stream, UTC hour): a splitmix64 hash."""
+    with np.errstate(over="ignore"):
+        x = hours.astype(np.int64).astype(np.uint64) * np.uint64(4) + np.uint64(stream)
+        x = x + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return ((x >> np.uint64(11)).astype(np.float64) + 1.0) / 2.0 ** 53
+
+
+def mock_prices(hours_utc, seed: int = MOCK_SEED, timezone: str = LOCAL_TIMEZONE):
+    """
+    Deterministic mock "duck curve" (€/MWh) for UTC hours: low at noon, high at
+    night, plus noise hashed from each hour, so a given hour always gets the same
+    price and a chunk of hours only costs arrays of its own length.
+    """
+    hours_utc = np.asarray(hours_utc, dtype="datetime64[h]")
+    local_hours = pd.DatetimeIndex(hours_utc).tz_localize("UTC").tz_convert(timezone).hour.to_numpy()
+    # Solar dip: 11h-15h -> -20 eur. Peak: 20h-22h -> +30 eur
+    prices = 50.0 + np.where((local_hours > 10) & (local_hours < 16), -20.0, 0.0) \
+        + np.where((local_hours > 19) & (local_hours < 23), 30.0, 0.0)
+
+    # N(0, 5) noise (Box-Muller)
+    radius = np.sqrt(-2.0 * np.log(_hour_uniforms(hours_utc, seed, 0)))
+    prices += 5.0 * radius * np.cos(2.0 * np.pi * _hour_uniforms(hours_utc, seed, 1))
+    return prices.astype(np.float32)
+
+
+def fetch_esios(token: str, indicator: int, geo_id: Optional[int], start_date: str,
+                end_date: str) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Prices of one indicator between two dates (inclusive).
+    Returns (UTC datetime64[m] of each value, float32 values), hourly or quarter-hourly.
+    """
+    headers = {
+        "Accept": "application/json; application/vnd.esios-api-v1+json",
+        "Content-Type": "application/json",
+        # Older tokens use Authorization, newer ones x-api-key
+        "Authorization": f"Token token={token}",
+        "x-api-key": token
+    }
+    params = {"start_date": start_date + "T00:00:00", "end_date": end_date + "T23:59:59"}
+    if geo_id is not None:
+        params["geo_ids[]"] = geo_id
+    response = get_http_client().get(f"{ESIOS_BASE_URL}/indicators/{indicator}", headers=headers, params=params)
+    response.raise_for_status()
+
+    values = response.json()["indicator"]["values"]
+    if geo_id is not None:
+        # Some indicators ignore geo_ids[] and return every zone
+        values = [v for v in values if v.get("geo_id", geo_id) == geo_id]
+    times = np.array([v["datetime_utc"].rstrip("Z")[:16] for v in values], dtype="datetime64[m]")
+    prices = np.array([v["value"] for v in values], dtype=np.float32)
+    return times, prices
+
+
+class PriceArchive:
+    def __init__(self, archive_dir: str = DEFAULT_ARCHIVE_DIR, indicator: int = DEFAULT_INDICATOR,
+                 geo_id: Optional[int] = DEFAULT_GEO_ID, fetcher: Optional[Callable] = None):
+        self.archive_dir = archive_dir
+        self.indicator = indicator
+        self.geo_id = geo_id
+        # fetcher(token, indicator, geo_id, start_date, end_date) -> (times, values)
+        self.fetcher = fetcher or fetch_esios
+        name = f"{indicator}_{geo_id if geo_id is not None else 'all'}"
+        self.paths = {
+            "h": os.path.join(archive_dir, f"{name}_hourly.f32"),
+            "m": os.path.join(archive_dir, f"{name}_quarter.f32"),
+        }
+        self._readers = {}
+        self._lock = threading.Lock()
+
+    # --- storage ---
+
+    @staticmethod
+    def _slots(unit: str) -> int:
+        hours = _offset(ARCHIVE_END, "h")
+        return hours * 4 if unit == "m" else hours
+
+    def _create(self, unit: str):
+        path = self.paths[unit]
+        if os.path.exists(path):
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        np.full(self._slots(unit), np.nan, dtype=np.float32).tofile(tmp_path)
+        try:
+            # link fails if another process created it meanwhile (keep theirs, it may have prices)
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    def _reader(self, unit: str):
+        """Read-only memmap (shared pages), or None if nothing was archived yet."""
+        reader = self._readers.get(unit)
+        if reader is None and os.path.exists(self.paths[unit]):
+            reader = self._readers[unit] = np.memmap(self.paths[unit], dtype=np.float32, mode="r")
+        return reader
+
+    def _read(self, unit: str, first: int, count: int):
+        out = np.full(count, np.nan, dtype=np.float32)
+        reader = self._reader(unit)
+        if reader is None:
+            return out
+        lo, hi = max(first, 0), min(first + count, len(reader))
+        if hi > lo:
+            out[lo - first:hi - first] = reader[lo:hi]
+        return out
+
+    def write(self, times_utc, values):
+        """Stores prices at UTC times (hourly, or quarter-hourly + their hourly mean)."""
+        times_utc = np.asarray(times_utc, dtype="datetime64[m]")
+        values = np.asarray(values, dtype=np.float32)
+        if len(times_utc) == 0:
+            return
+        quarter = bool((times_utc.astype(np.int64) % 60 != 0).any())
+
+        with self._lock:
+            if quarter:
+                self._write("m", self._quarter_index(times_utc), values)
+                hours = times_utc.astype("datetime64[h]")
+                unique_hours, inverse = np.unique(hours, return_inverse=True)
+                hourly = np.bincount(inverse, weights=values) / np.bincount(inverse)
+                self._write("h", self._hour_index(unique_hours), hourly.astype(np.float32))
+            else:
+                self._write("h", self._hour_index(times_utc.astype("datetime64[h]")), values)
+
+    def _hour_index(self, hours):
+        return ((hours - _hour(ARCHIVE_EPOCH)) // np.timedelta64(1, "h")).astype(np.int64)
+
+    def _quarter_index(self, minutes):
+        return ((minutes - np.datetime64(ARCHIVE_EPOCH, "m")) // np.timedelta64(15, "m")).astype(np.int64)
+
+    def _write(self, unit: str, index, values):
+        keep = (index >= 0) & (index < self._slots(unit))
+        self._create(unit)
+        writer = np.memmap(self.paths[unit], dtype=np.float32, mode="r+")
+        writer[index[keep]] = values[keep]
+        writer.flush()
+        del writer
+
+    # --- reading ---
+
+    def hourly(self, start_utc, end_utc):
+        """Prices for UTC hours [start_utc, end_utc] (inclusive); NaN where missing."""
+        start, end = _hour(start_utc), _hour(end_utc)
+        return self._read("h", _offset(start, "h"), int((end - start) // np.timedelta64(1, "h")) + 1)
+
+    def quarter_hourly(self, start_utc, end_utc):
+        """
+        Prices for every UTC quarter hour in hours [start_utc, end_utc].
+        Periods that only have an hourly price repeat it four times.
+        """
+        start, end = _hour(start_utc), _hour(end_utc)
+        hours = int((end - start) // np.timedelta64(1, "h")) + 1
+        quarters = self._read("m", _offset(start, "h") * 4, hours * 4)
+        fallback = np.repeat(self.hourly(start, end), 4)
+        return np.where(np.isnan(quarters), fallback, quarters)
+
+    def missing_days(self, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """Date spans in [start_date, end_date] with at least one hour without price."""
+        start = _hour(np.datetime64(start_date, "D"))
+        end = _hour(np.datetime64(end_date, "D") + np.timedelta64(1, "D")) - np.timedelta64(1, "h")
+        prices = self.hourly(start, end)
+        hours = np.arange(start, end + np.timedelta64(1, "h"), dtype="datetime64[h]")
+        return date_spans(np.unique(hours[np.isnan(prices)].astype("datetime64[D]")))
+
+    def local_series(self, start_date: str, end_date: str, token: Optional[str] = None,
+                     timezone: str = LOCAL_TIMEZONE) -> Tuple["pd.Series", float]:
+        """
+        Hourly prices for local dates [start_date, end_date], indexed by naive
+        local time (repeated DST hour dropped). Syncs missing days first when a
+        token is given; still-missing hours get mock prices.
+        Returns (prices, share of real prices 0..1).
+        """
+        hours, prices, real = self.utc_series(*local_range_utc(start_date, end_date, timezone),
+                                              token=token, timezone=timezone)
+        index = pd.DatetimeIndex(hours).tz_localize("UTC").tz_convert(timezone).tz_localize(None)
+        series = pd.Series(prices.astype(np.float64).round(2), index=index)
+        series = series[~series.index.duplicated(keep="first")]
+        return series, float(real.mean()) if len(real) else 0.0
+
+    def utc_series(self, start_utc, end_utc, token: Optional[str] = None,
+                   timezone: str = LOCAL_TIMEZONE):
+        """
+        Hourly prices for UTC hours [start_utc, end_utc] (inclusive). Syncs missing
+        days first when a token is given; still-missing hours get mock prices.
+        Returns (hours as datetime64[h], float32 prices, real: bool mask of ESIOS prices).
+        """
+        start, end = _hour(start_utc), _hour(end_utc)
+        if token:
+            try:
+                self.sync(token, str(start.astype("datetime64[D]")), str(end.astype("datetime64[D]")))
+            except Exception as e:
+                print(f"ESIOS API Error: {e}. Using archived/mock prices.")
+
+        prices = self.hourly(start, end)
+        hours = np.arange(start, end + np.timedelta64(1, "h"), dtype="datetime64[h]")
+        real = ~np.isnan(prices)
+        if not real.all():
+            prices = np.where(real, prices, mock_prices(hours, timezone=timezone))
+        return hours, prices, real
+
+    # --- sync ---
+
+    def sync(self, token: str, start_date: str, end_date: Optional[str] = None) -> Dict:
+        """
+        Fetches the days without prices in [start_date, end_date] from ESIOS,
+        one request per month, concurrently. Raises if every request failed.
+        """
+        # Day-ahead prices for tomorrow are published in the afternoon
+        end_date = end_date or (date.today() + timedelta(days=1)).isoformat()
+        chunks = plan_spans(self.missing_days(start_date, end_date), "month")
+        results = fetch_chunks(lambda s, e: self.fetcher(token, self.indicator, self.geo_id, s, e), chunks)
+
+        fetched_values = 0
+        for result in results:
+            if result.ok:
+                self.write(*result.value)
+                fetched_values += len(result.value[1])
+        failed = [r for r in results if not r.ok]
+        if failed and len(failed) == len(results):
+            raise failed[0].error
+        return {
+            "requests": len(results),
+            "values": fetched_values,
+            "failed": [{"start": r.start, "end": r.end, "error": str(r.error)} for r in failed]
+        }
+
+    def last_archived_hour(self) -> Optional[str]:
+        reader = self._reader("h")
+        if reader is None:
+            return None
+        filled = np.flatnonzero(~np.isnan(reader))
+        if len(filled) == 0:
+            return None
+        return str(_hour(ARCHIVE_EPOCH) + np.timedelta64(int(filled[-1]), "h"))
+
+
+_archives: Dict[Tuple, PriceArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_price_archive(indicator: int = DEFAULT_INDICATOR, geo_id: Optional[int] = DEFAULT_GEO_ID) -> PriceArchive:
+    """Process-wide archive per (indicator, geo_id)."""
+    with _archives_lock:
+        key = (indicator, geo_id)
+        if key not in _archives:
+            _archives[key] = PriceArchive(indicator=indicator, geo_id=geo_id)
+        return _archives[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local ESIOS price archive")
+    parser.add_argument("command", choices=["sync", "status"])
+    parser.add_argument("--start", help="first date (YYYY-MM-DD); sync defaults to the end of the archive")
+    parser.add_argument("--end", help="last date (YYYY-MM-DD), default tomorrow")
+    parser.add_argument("--indicator", type=int, default=DEFAULT_INDICATOR)
+    parser.add_argument("--geo-id", type=int, default=DEFAULT_GEO_ID, help="ESIOS geo_id, -1 for all zones")
+    args = parser.parse_args()
+
+    archive = get_price_archive(args.indicator, None if args.geo_id == -1 else args.geo_id)
+    last = archive.last_archived_hour()
+    end = args.end or (date.today() + timedelta(days=1)).isoformat()
+
+    if args.command == "sync":
+        token = os.environ.get("ESIOS_TOKEN")
+        if not token:
+            parser.error("ESIOS_TOKEN is not set")
+        start = args.start or (last[:10] if last else None)
+        if not start:
+            parser.error("empty archive: pass --start")
+        result = archive.sync(token, start, end)
+        print(json.dumps({"indicator": args.indicator, "geo_id": archive.geo_id, "start": start, "end": end,
+                          **result, "last_archived_hour": archive.last_archived_hour()}, indent=2))
+    else:
+        start = args.start or (last[:10] if last else end)
+        print(json.dumps({"indicator": args.indicator, "geo_id": archive.geo_id,
+                          "last_archived_hour": last,
+                          "missing_days": archive.missing_days(start, end)}, indent=2))
@@ -0,0 +1,171 @@
+"""
+On-demand Profiling for api_wrapper requests.
+
+Add "profile" to a request envelope to run its handler under a profiler:
+
+    {"action": "deep_audit", "data": {...}, "profile": true}
+    {"action": "deep_audit", "data": {...},
+     "profile": {"mode": "sample", "interval_ms": 2, "output": "audit.collapsed"}}
+
+Modes:
+- "cprofile" (default): deterministic; returns the top-N functions by
+  cumulative time in a `_profile` block.
+- "sample": a background thread samples the handler's stack every
+  `interval_ms`; writes a collapsed-stack file ("a;b;c 42" per line) that
+  flamegraph.pl / speedscope / inferno can read, and returns the hottest
+  functions by self samples. The file always goes to DEFAULT_PROFILE_DIR;
+  "output" can only pick its name (no directories, no "..").
+
+Both profilers only see the thread that runs the handler. Work the handler
+hands to the range_planner pools (run_parallel, map_parallel, fetch_chunks)
+runs on other threads and shows up as time spent waiting on their futures.
+
+Nothing here runs unless the flag is present.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Tuple
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "profiles")
+DEFAULT_TOP_N = 25
+
+# cProfile cannot run in two threads at once (Python 3.12+ rejects it),
+# so profiled requests are serialized.
+_cprofile_lock = threading.Lock()
+
+
+def _output_name(output) -> str:
+    """A client-chosen file name for the collapsed stacks; never a path."""
+    name = str(output)
+    if not name or "/" in name or "\\" in name or ".." in name or os.path.basename(name) != name:
+        raise ValueError(f"Invalid profile output name: {output!r} (file name only, no path)")
+    return name
+
+
+def _parse_options(options) -> Dict:
+    if not isinstance(options, dict):
+        options = {}
+    return {
+        "mode": options.get("mode", "cprofile"),
+        "top": int(options.get("top", DEFAULT_TOP_N)),
+        "interval_ms": float(options.get("interval_ms", 5)),
+        "output": _output_name(options["output"]) if options.get("output") else None
+    }
+
+
+def _short_path(filename: str) -> str:
+    # Keep the last two path components: enough to tell site-packages apart
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def _profile_deterministic(func: Callable, top_n: int) -> Tuple[object, Dict]:
+    profiler = cProfile.Profile()
+    with _cprofile_lock:
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            result = func()
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{_short_path(filename)}:{line}({name})",
+            "ncalls": ncalls,
+            "tottime_s": round(tottime, 6),
+            "cumtime_s": round(cumtime, 6)
+        })
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+
+    return result, {
+        "mode": "cprofile",
+        "wall_s": round(elapsed, 6),
+        "total_calls": stats.total_calls,
+        "top_functions": rows[:top_n]
+    }
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{_short_path(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            # Collapsed format lists frames root first
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def _profile_sampling(func: Callable, options: Dict, label: str) -> Tuple[object, Dict]:
+    sampler = StackSampler(threading.get_ident(), options["interval_ms"] / 1000.0)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        result = func()
+    finally:
+        sampler.stop()
+    elapsed = time.perf_counter() - started
+
+    os.makedirs(DEFAULT_PROFILE_DIR, exist_ok=True)
+    file_name = options["output"] or f"{label}_{time.strftime('%Y%m%d_%H%M%S')}.collapsed"
+    output = os.path.join(DEFAULT_PROFILE_DIR, file_name)
+    with open(output, "w", encoding="utf-8") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    # Self time: samples where the function is the innermost frame
+    self_samples = Counter()
+    for stack, count in sampler.stacks.items():
+        self_samples[stack.rsplit(";", 1)[-1]] += count
+
+    return result, {
+        "mode": "sample",
+        "wall_s": round(elapsed, 6),
+        "samples": sampler.samples,
+        "interval_ms": options["interval_ms"],
+        "collapsed_stack_file": output,
+        "top_functions": [
+            {"function": name, "self_samples": count,
+             "self_pct": round(100.0 * count / sampler.samples, 1) if sampler.samples else 0}
+            for name, count in self_samples.most_common(options["top"])
+        ]
+    }
+
+
+def run_profiled(func: Callable, options, label: str = "request") -> Tuple[object, Dict]:
+    """Calls func() under the profiler selected by `options`; returns (result, report)."""
+    options = _parse_options(options)
+    if options["mode"] == "sample":
+        return _profile_sampling(func, options, label)
+    return _profile_deterministic(func, options["top"])
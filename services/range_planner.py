@@ -0,0 +1,184 @@
+"""
+Range Planner: split long date ranges into chunks and fetch them concurrently.
+
+One request for a multi-year range hits response-size limits and timeouts,
+and fetching providers one after the other adds their latencies up. Instead:
+
+    chunks = plan_chunks("2014-01-01", "2023-12-31", "year")     # 10 chunks
+    results = fetch_chunks(lambda start, end: fetch(start, end), chunks)
+    # -> [ChunkResult(start, end, value, error)], in chunk order
+
+    prices, wind = run_parallel(lambda: get_prices(...), lambda: get_wind(...))
+    frames = map_parallel(get_meteo, locations, max_workers=4)
+
+- chunk fetches share one bounded pool (FETCH_WORKERS, default 8); the
+  per-host limits of http_client.py still apply on top
+- run_parallel / map_parallel run provider-level tasks on their own threads,
+  so they can wait on chunk fetches without starving the pool
+- every task runs in a copy of the caller's context, so outbound HTTP time
+  is still attributed to the action (metrics.py)
+- iter_chunks / count_chunks walk a plan without building it, for periods
+  of hundreds of chunks (streaming_audit.py)
+- find_gaps reports the missing stretches of a stitched hourly series,
+  date_spans turns missing days into contiguous (start, end) spans
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", 8))
+
+
+class ChunkResult:
+    def __init__(self, start: str, end: str, value=None, error: Optional[Exception] = None):
+        self.start = start
+        self.end = end
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"error={self.error!r}"
+        return f"<ChunkResult {self.start}..{self.end} {state}>"
+
+
+def date_spans(days: "np.ndarray") -> List[Tuple[str, str]]:
+    """Sorted unique datetime64[D] days -> [(start, end)] of consecutive runs."""
+    if len(days) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(days).astype(int) > 1)
+    starts = np.concatenate([[0], breaks + 1])
+    ends = np.concatenate([breaks, [len(days) - 1]])
+    return [(str(days[s]), str(days[e])) for s, e in zip(starts, ends)]
+
+
+def iter_chunks(start_date: str, end_date: str, unit: str = "year") -> Iterator[Tuple[str, str]]:
+    """plan_chunks one chunk at a time, for periods too long to keep the whole plan."""
+    if unit not in ("year", "month"):
+        raise ValueError(f"Unknown chunk unit: {unit}")
+    current = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    while current <= end:
+        if unit == "year":
+            next_start = date(current.year + 1, 1, 1)
+        else:
+            next_start = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(end, next_start - timedelta(days=1))
+        yield current.isoformat(), chunk_end.isoformat()
+        current = next_start
+
+
+def count_chunks(start_date: str, end_date: str, unit: str = "year") -> int:
+    """len(plan_chunks(...)) without building the list."""
+    if unit not in ("year", "month"):
+        raise ValueError(f"Unknown chunk unit: {unit}")
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    if start > end:
+        return 0
+    if unit == "year":
+        return end.year - start.year + 1
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def plan_chunks(start_date: str, end_date: str, unit: str = "year") -> List[Tuple[str, str]]:
+    """Splits [start_date, end_date] (inclusive) at calendar year or month boundaries."""
+    return list(iter_chunks(start_date, end_date, unit))
+
+
+def plan_spans(spans: List[Tuple[str, str]], unit: str = "year") -> List[Tuple[str, str]]:
+    """plan_chunks for every (start, end) span, flattened."""
+    return [chunk for start, end in spans for chunk in plan_chunks(start, end, unit)]
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _fetch_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+        return _pool
+
+
+def _in_context(func: Callable, *args):
+    context = contextvars.copy_context()
+    return lambda: context.run(func, *args)
+
+
+def fetch_chunks(fetch: Callable[[str, str], object], chunks: List[Tuple[str, str]]) -> List[ChunkResult]:
+    """
+    Calls fetch(start, end) for every chunk on the shared fetch pool.
+    Failures don't stop the other chunks; they come back as ChunkResult.error.
+    """
+    if len(chunks) == 1:
+        # Nothing to overlap: stay on the calling thread
+        start, end = chunks[0]
+        try:
+            return [ChunkResult(start, end, fetch(start, end))]
+        except Exception as e:
+            return [ChunkResult(start, end, error=e)]
+
+    pool = _fetch_pool()
+    futures = [(start, end, pool.submit(_in_context(fetch, start, end))) for start, end in chunks]
+    results = []
+    for start, end, future in futures:
+        try:
+            results.append(ChunkResult(start, end, future.result()))
+        except Exception as e:
+            results.append(ChunkResult(start, end, error=e))
+    return results
+
+
+def run_parallel(*tasks: Callable[[], object]) -> list:
+    """
+    Runs independent provider-level tasks (e.g. prices and meteo) at the same
+    time and returns their results in order. Exceptions are re-raised.
+    """
+    if len(tasks) <= 1:
+        return [task() for task in tasks]
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="provider") as executor:
+        futures = [executor.submit(_in_context(task)) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def map_parallel(func: Callable, items: list, max_workers: int = FETCH_WORKERS) -> list:
+    """
+    func(item) for every item on up to `max_workers` threads (e.g. one meteo
+    fetch per park location). Results in input order; exceptions are re-raised.
+    """
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="provider") as executor:
+        futures = [executor.submit(_in_context(func, item)) for item in items]
+        return [future.result() for future in futures]
+
+
+def find_gaps(hours, valid, limit: int = 20) -> dict:
+    """
+    Missing stretches of an hourly series.
+    `hours` are datetime64[h] (or any labels), `valid` a boolean mask.
+    Returns {"missing_hours", "gaps": [{"start", "end", "hours"}] (first `limit`), "gap_count"}.
+    """
+    valid = np.asarray(valid, dtype=bool)
+    missing = np.flatnonzero(~valid)
+    if len(missing) == 0:
+        return {"missing_hours": 0, "gap_count": 0, "gaps": []}
+    breaks = np.flatnonzero(np.diff(missing) > 1)
+    starts = np.concatenate([[missing[0]], missing[breaks + 1]])
+    ends = np.concatenate([missing[breaks], [missing[-1]]])
+    gaps = [{"start": str(hours[s]), "end": str(hours[e]), "hours": int(e - s + 1)}
+            for s, e in zip(starts[:limit], ends[:limit])]
+    return {"missing_hours": int(len(missing)), "gap_count": int(len(starts)), "gaps": gaps}
@@ -0,0 +1,157 @@
+"""
+Repowering: side-by-side production, revenue and canon of turbine options.
+
+A repowering negotiation (V90 -> V162) compares the current park with a few
+proposals: other models, fewer turbines, taller towers. Auditing each one
+separately refetches meteo and prices every time; here they are loaded once
+and every option is evaluated on the same hours:
+
+    from repowering import RepoweringComparator
+    result = RepoweringComparator(esios_token).run({
+        "lat": 42.5, "lon": -7.8, "start_date": "2023-01-01", "end_date": "2023-12-31",
+        "options": [
+            {"turbine_model": "Vestas V90 3MW", "num_turbines": 12},                  # current park
+            {"turbine_model": "Vestas V162 6MW", "num_turbines": [4, 5, 6], "hub_height": [125, 149]},
+            {"turbine_model": "Nordex N149 5.7MW", "num_turbines": 5}
+        ]
+    })
+    result["options"]    # one row per model x count x hub height, the first one is the baseline
+
+- hub speeds for every distinct hub height: (heights x hours), one shear
+  extrapolation; power per turbine for every (model, height) pair: one power
+  curve call per model on its (heights x hours) block
+- counts only scale a pair's totals (n turbines and the park wake loss of
+  n, see park_wake_loss), so they cost nothing per hour
+- canon: WindTaxCalculator2025 for the option's tip height and count,
+  prorated to the days of the period
+"""
+import itertools
+import os
+from typing import Callable, Dict, List, Optional
+
+from energy_audit_deep_research import DeepResearchAuditor, air_density, park_wake_loss, shear_exponent
+from lazy_imports import lazy_module
+from range_planner import run_parallel
+from turbine_catalog import get_catalog
+from wind_tax import WindTaxCalculator2025
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+MAX_REPOWERING_OPTIONS = int(os.environ.get("MAX_REPOWERING_OPTIONS", 500))
+
+
+def _as_list(value) -> List:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def expand_options(options: List[Dict]) -> List[Dict]:
+    """Each {"turbine_model", "num_turbines", "hub_height"} with lists -> one dict per combination."""
+    catalog = get_catalog()
+    expanded = []
+    for option in options:
+        model = catalog.get(option.get("turbine_model"))
+        counts = _as_list(option.get("num_turbines"))
+        heights = _as_list(option.get("hub_height") or model.hub_height)
+        for count, height in itertools.product(counts, heights):
+            if int(count) < 1 or float(height) <= model.rotor_radius:
+                raise ValueError(f"Invalid option: {model.name}, {count} turbines at {height} m")
+            expanded.append({"model": model, "num_turbines": int(count), "hub_height": float(height)})
+    return expanded
+
+
+class RepoweringComparator:
+    def __init__(self, esios_token: Optional[str] = None):
+        self.auditor = DeepResearchAuditor(esios_token=esios_token)
+        self.tax = WindTaxCalculator2025()
+
+    def run(self, config: Dict, progress: Optional[Callable] = None) -> Dict:
+        """
+        Compares config["options"] over [start_date, end_date] at (lat, lon).
+        `progress(stage, fraction)` is called after data_fetched and options_done.
+        """
+        if progress is None:
+            progress = lambda stage, fraction: None
+
+        if not isinstance(config.get("options"), list) or not config["options"]:
+            return {"error": "options must be a non-empty list of repowering options"}
+        try:
+            options = expand_options(config["options"])
+        except (TypeError, ValueError) as e:
+            return {"error": str(e)}
+        if len(options) > MAX_REPOWERING_OPTIONS:
+            return {"error": f"Too many options ({len(options)} > {MAX_REPOWERING_OPTIONS})"}
+        start, end = config["start_date"], config["end_date"]
+        lat, lon = float(config["lat"]), float(config["lon"])
+        roughness = config.get("roughness", "forest")
+
+        # 1. Meteo and prices once for every option
+        meteo, prices = run_parallel(
+            lambda: self.auditor.get_meteo_data(lat, lon, start, end),
+            lambda: self.auditor.get_prices(start, end)
+        )
+        if meteo is None:
+            return {"error": "Meteo data failed"}
+        common = meteo.index.intersection(prices.index)
+        meteo_hours = meteo.loc[common]
+        price = np.nan_to_num(prices.loc[common].to_numpy(dtype=np.float64))
+        progress("data_fetched", 0.4)
+
+        # 2. Hub speeds per distinct height, power per (model, height): hourly work
+        v100 = meteo_hours["wind_speed_100m"].to_numpy()
+        alpha = shear_exponent(v100, meteo_hours["wind_speed_10m"].to_numpy())
+        rho = air_density(meteo_hours["temp_air"].to_numpy(), meteo_hours["pressure"].to_numpy())
+        heights = np.unique([o["hub_height"] for o in options])
+        v_hub = v100[None, :] * (heights[:, None] / 100) ** alpha[None, :]
+
+        totals = {}  # (model name, height) -> (kWh, EUR) of one turbine without wakes
+        for name in dict.fromkeys(o["model"].name for o in options):
+            model = get_catalog().get(name)
+            rows = np.flatnonzero(np.isin(heights, [o["hub_height"] for o in options if o["model"].name == name]))
+            power = np.nan_to_num(model.power(v_hub[rows], air_density=rho[None, :]))
+            for row, energy, revenue in zip(rows, power.sum(axis=1), power @ price):
+                totals[(name, heights[row])] = (energy, revenue)
+        progress("options_done", 0.9)
+
+        # 3. Counts, wakes and canon per option
+        days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+        rows = [self._option_row(o, totals, roughness, len(common), days) for o in options]
+        baseline = rows[0]
+        for row in rows:
+            row["vs_baseline"] = {
+                key: round((row[key] / baseline[key] - 1) * 100, 2) if baseline[key] else 0
+                for key in ("production_mwh", "revenue_eur", "canon_eur")
+            }
+        return {
+            "period": {"start": start, "end": end, "days": days},
+            "options": rows,
+            "best_revenue": int(np.argmax([row["revenue_eur"] for row in rows])),
+            "best_canon": int(np.argmax([row["canon_eur"] for row in rows])),
+            "data_gaps": meteo.attrs.get("gaps")
+        }
+
+    def _option_row(self, option: Dict, totals: Dict, roughness: str, hours: int, days: int) -> Dict:
+        model, count, height = option["model"], option["num_turbines"], option["hub_height"]
+        energy, revenue = totals[(model.name, height)]
+        efficiency = count * (1 - park_wake_loss(count, roughness))
+        production_mwh = energy * efficiency / 1000
+        revenue_eur = revenue * efficiency / 1000
+        canon = self.tax.calculate_park_tax(count, height, model.rotor_radius, days_operation=days)
+        canon_eur = canon["tax_calculation"]["final_tax"]
+        capacity_mw = model.rated_power * count / 1000
+        return {
+            "turbine_model": model.name,
+            "num_turbines": count,
+            "hub_height": height,
+            "rotor_diameter": model.rotor_diameter,
+            "tip_height": canon["turbine_specs"]["total_height"],
+            "capacity_mw": round(capacity_mw, 2),
+            "production_mwh": round(production_mwh, 2),
+            "capacity_factor": round(production_mwh / (capacity_mw * hours), 4) if hours else 0,
+            "revenue_eur": round(revenue_eur, 2),
+            "capture_price": round(revenue_eur / production_mwh, 2) if production_mwh > 0 else 0,
+            "wake_loss_pct": round(park_wake_loss(count, roughness) * 100, 2),
+            "canon_eur": canon_eur,
+            "canon_per_unit_eur": canon["tax_calculation"]["tax_per_unit"],
+            "canon_share_of_revenue_pct": round(canon_eur / revenue_eur * 100, 2) if revenue_eur > 0 else 0
+        }
@@ -0,0 +1,249 @@
+"""
+Result Cache for api_wrapper actions.
+
+Results are content-addressed: the key is a SHA-256 of the action, the
+normalized request data and a version tag, so the same audit requested twice
+(even with "1000" vs 1000 or a different key order) hits the same entry.
+
+Two tiers:
+- Memory LRU (per process, fastest; useful with api_server.py)
+- Disk (JSON files under services/.cache/results, shared by all processes)
+
+Each action has its own TTL policy. Audits of closed historical periods are
+kept for a long time because their inputs no longer change, unless the
+result is degraded (mock prices, meteo gaps, failed chunks): a later run may
+get the real data, so those only get the live-period TTL. Audit keys include
+the price source (ESIOS or mock), so a run with ESIOS_TOKEN never gets a
+result priced without it.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+# Bump when a handler changes the shape or meaning of its output so old
+# entries stop matching. RESULT_CACHE_VERSION can add a data version on top.
+CACHE_VERSION = "6"
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "RESULT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "results")
+)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# TTLs per action (seconds)
+LIVE_PERIOD_TTL = 15 * MINUTE     # Period still open: prices/meteo keep arriving
+CLOSED_PERIOD_TTL = 365 * DAY     # Period closed: result no longer changes
+CANON_UPDATE_TTL = DAY            # INE publishes monthly
+
+
+def _period_is_closed(data: dict) -> bool:
+    """True when the audited period ended before the meteo archive became final."""
+    # The last ARCHIVE_FINAL_DAYS of Open-Meteo archive data are still provisional
+    from meteo_cache import ARCHIVE_FINAL_DAYS
+    final_before = date.today() - timedelta(days=ARCHIVE_FINAL_DAYS)
+    end_date = data.get("end_date")
+    if end_date:
+        try:
+            return date.fromisoformat(str(end_date)[:10]) < final_before
+        except ValueError:
+            return False
+    year = data.get("year")
+    if year:
+        try:
+            return date(int(year), 12, 31) < final_before
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _audit_ttl(data: dict) -> int:
+    return CLOSED_PERIOD_TTL if _period_is_closed(data) else LIVE_PERIOD_TTL
+
+
+# Actions not listed here are never cached (side effects, or already cheap).
+TTL_POLICIES = {
+    "energy_audit": _audit_ttl,
+    "deep_audit": _audit_ttl,
+    "portfolio_audit": _audit_ttl,
+    "uncertainty_audit": _audit_ttl,
+    "solar_orientation": _audit_ttl,
+    "repowering": _audit_ttl,
+    "streaming_audit": _audit_ttl,
+    "canon_update": lambda data: CANON_UPDATE_TTL,
+}
+
+
+def price_source() -> str:
+    """Where audits get their prices in this process: the ESIOS archive or the mock."""
+    return "esios" if os.environ.get("ESIOS_TOKEN") else "mock"
+
+
+def is_degraded(result) -> bool:
+    """
+    True when an audit result (or a park/option inside it) was computed on
+    incomplete inputs: meteo gaps, failed chunks or hours priced with mock
+    or missing prices.
+    """
+    if isinstance(result, list):
+        return any(is_degraded(item) for item in result)
+    if not isinstance(result, dict):
+        return False
+    gaps = result.get("data_gaps")
+    if isinstance(gaps, dict) and gaps.get("missing_hours"):
+        return True
+    if result.get("failed_chunks"):
+        return True
+    coverage = result.get("hour_coverage")
+    if isinstance(coverage, dict) and (coverage.get("imputed") or coverage.get("missing")):
+        return True
+    return any(is_degraded(value) for value in result.values() if isinstance(value, (dict, list)))
+
+
+def normalize(value):
+    """
+    Canonical form of request data for hashing:
+    sorted keys, no null fields, numbers and numeric strings as floats
+    (handlers call float()/int() on them, so "1000" and 1000 are the same).
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items()) if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+class ResultCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_memory_entries: int = 256,
+                 version: str = CACHE_VERSION):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.version = version + os.environ.get("RESULT_CACHE_VERSION", "")
+        self._memory = OrderedDict()  # key -> (expires_at, json_text)
+        self._lock = threading.Lock()
+
+    def ttl_for(self, action: str, data: dict, result=None) -> Optional[int]:
+        """TTL for caching `result` (or None if the action is not cacheable)."""
+        policy = TTL_POLICIES.get(action)
+        if policy is None or not isinstance(data, dict):
+            return None
+        ttl = policy(data)
+        if policy is _audit_ttl and (price_source() == "mock" or is_degraded(result)):
+            ttl = min(ttl, LIVE_PERIOD_TTL)
+        return ttl
+
+    def make_key(self, action: str, data: dict) -> str:
+        key = {"action": action, "data": normalize(data), "version": self.version}
+        if TTL_POLICIES.get(action) is _audit_ttl:
+            key["prices"] = price_source()
+        payload = json.dumps(key, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Memory tier ---
+    def _memory_get(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, text = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return text
+
+    def _memory_set(self, key: str, expires_at: float, text: str):
+        with self._lock:
+            self._memory[key] = (expires_at, text)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    # --- Disk tier ---
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _disk_get(self, key: str):
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            return None
+        return entry["expires_at"], entry["result"]
+
+    def _disk_set(self, key: str, expires_at: float, text: str):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see half a file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write('{"expires_at": %r, "result": %s}' % (expires_at, text))
+            os.replace(tmp_path, path)
+        except OSError:
+            # The cache is an optimization; a read-only disk must not fail requests
+            pass
+
+    # --- Public API ---
+    def get(self, key: str):
+        """Returns (result, tier) or (None, None) on a miss."""
+        text = self._memory_get(key)
+        if text is not None:
+            return json.loads(text), "memory"
+
+        entry = self._disk_get(key)
+        if entry is not None:
+            expires_at, result = entry
+            self._memory_set(key, expires_at, json.dumps(result))
+            return result, "disk"
+
+        return None, None
+
+    def set(self, key: str, result, ttl: int):
+        text = json.dumps(result)
+        expires_at = time.time() + ttl
+        self._memory_set(key, expires_at, text)
+        self._disk_set(key, expires_at, text)
+
+    def get_or_compute(self, action: str, data: dict, compute: Callable, bypass: bool = False):
+        """
+        Returns (result, status) where status is "hit", "miss", "bypass" or
+        None when the action is not cacheable. Error results are not stored;
+        degraded audit results are stored with the live-period TTL.
+        """
+        if self.ttl_for(action, data) is None:
+            return compute(), None
+
+        key = self.make_key(action, data)
+        if not bypass:
+            result, tier = self.get(key)
+            if tier is not None:
+                return result, "hit"
+
+        result = compute()
+        if not (isinstance(result, dict) and "error" in result):
+            self.set(key, result, self.ttl_for(action, data, result))
+        return result, "bypass" if bypass else "miss"
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
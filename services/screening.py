@@ -0,0 +1,282 @@
+"""
+Regional Screening: production potential over many sites of the montes.
+
+To decide which parcels are worth negotiating over, every site gets an
+annual yield and a capture price estimate for a reference installation
+(one turbine of `turbine_model` and/or `peak_power_kwp` of PV):
+
+    from screening import RegionalScreener
+    result = RegionalScreener(esios_token).run({
+        "polygon": {"type": "Polygon", "coordinates": [[[-7.9, 42.4], [-7.6, 42.4], [-7.7, 42.7], [-7.9, 42.4]]]},
+        "resolution_deg": 0.02,                 # grid spacing (default: the meteo grid, 0.1)
+        "year": 2023,
+        "technology": "both",                   # "wind", "solar" or "both"
+        "output": "geojson"                     # or "raster"
+    })
+    # or "parcels": [{"id": "Monte A", "lat": 42.5, "lon": -7.8}, {"id": "B", "rc": "<referencia catastral>"}]
+
+- sites are reduced to distinct meteo grid cells (meteo_grid.py): every site
+  in one cell shares its weather, so the physics runs once per cell
+- meteo for all cells is prefetched with multi-location requests, at the
+  same time as the year's prices (read once from the price archive)
+- yields are computed on (cells x hours) arrays, SCREENING_BLOCK cells at a
+  time to bound memory, with the same physics as the deep audit
+- the result is a GeoJSON FeatureCollection (grid squares or parcel points)
+  or, for polygons, raster-like layers over the bounding box
+"""
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cadastre_lookup import CadastreLookup
+from energy_audit_deep_research import hub_power_kw, pv_ac_power_kw
+from hour_index import local_range_utc
+from lazy_imports import lazy_module
+from meteo_cache import get_meteo_cache
+from meteo_grid import GRID_DEG, group_by_cell
+from price_archive import get_price_archive
+from range_planner import map_parallel, run_parallel
+from sun_cache import get_sun_cache
+from turbine_catalog import get_catalog
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+irradiance = lazy_module("pvlib.irradiance")
+
+SCREENING_BLOCK = int(os.environ.get("SCREENING_BLOCK", 64))
+MAX_SCREENING_SITES = int(os.environ.get("MAX_SCREENING_SITES", 20000))
+TECHNOLOGIES = ("wind", "solar")
+WIND_VARIABLES = ["wind_speed_100m", "wind_speed_10m", "temperature_2m", "surface_pressure"]
+SOLAR_VARIABLES = ["shortwave_radiation", "direct_radiation", "diffuse_radiation",
+                   "temperature_2m", "wind_speed_10m"]
+
+
+# --- GEOMETRY ---
+
+def polygon_ring(polygon) -> "np.ndarray":
+    """Outer ring as an (n, 2) [lon, lat] array from a GeoJSON Polygon/Feature or a list of pairs."""
+    if isinstance(polygon, dict):
+        geometry = polygon.get("geometry", polygon)
+        if geometry.get("type") != "Polygon":
+            raise ValueError(f"Unsupported geometry: {geometry.get('type')}")
+        polygon = geometry["coordinates"][0]
+    ring = np.asarray(polygon, dtype=float)
+    if ring.ndim != 2 or ring.shape[1] != 2 or len(ring) < 3:
+        raise ValueError("A polygon needs at least 3 [lon, lat] vertices")
+    return ring
+
+
+def points_in_polygon(lons, lats, ring) -> "np.ndarray":
+    """Even-odd rule for every point against every edge at once (points x edges)."""
+    x1, y1 = ring[:, 0], ring[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    px, py = np.asarray(lons)[:, None], np.asarray(lats)[:, None]
+    crosses = (y1 > py) != (y2 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+    return (crosses & (px < x_at)).sum(axis=1) % 2 == 1
+
+
+def grid_sites(ring, resolution: float) -> Dict:
+    """Cell centers of a regular grid over the ring's bounding box that fall inside it."""
+    lon_min, lat_min = ring.min(axis=0)
+    lon_max, lat_max = ring.max(axis=0)
+    lon_centers = np.arange(lon_min + resolution / 2, lon_max, resolution)
+    lat_centers = np.arange(lat_min + resolution / 2, lat_max, resolution)
+    lon_grid, lat_grid = np.meshgrid(lon_centers, lat_centers)
+    inside = points_in_polygon(lon_grid.ravel(), lat_grid.ravel(), ring)
+    rows, cols = np.divmod(np.flatnonzero(inside), len(lon_centers))
+    return {
+        "lats": lat_grid.ravel()[inside].round(6),
+        "lons": lon_grid.ravel()[inside].round(6),
+        "rows": rows,
+        "cols": cols,
+        "shape": (len(lat_centers), len(lon_centers)),
+        "bbox": [float(lon_min), float(lat_min), float(lon_max), float(lat_max)]
+    }
+
+
+# --- SCREENING ---
+
+class RegionalScreener:
+    def __init__(self, esios_token: Optional[str] = None, block: int = SCREENING_BLOCK):
+        self.esios_token = esios_token
+        self.block = block
+
+    def run(self, config: Dict, progress: Optional[Callable] = None) -> Dict:
+        """
+        Screens config["polygon"] (grid of `resolution_deg`) or config["parcels"].
+        `progress(stage, fraction)` is called after sites_ready, data_fetched and cells_done.
+        """
+        if progress is None:
+            progress = lambda stage, fraction: None
+
+        technologies = TECHNOLOGIES if config.get("technology", "both") == "both" else (config["technology"],)
+        if any(t not in TECHNOLOGIES for t in technologies):
+            return {"error": f"Unknown technology: {config.get('technology')}"}
+        turbine = get_catalog().get(config.get("turbine_model", "Vestas V90 3MW")) if "wind" in technologies else None
+        kwp = float(config.get("peak_power_kwp", 1000))
+        year = int(config.get("year", pd.Timestamp.now().year - 1))
+
+        # 1. Sites: grid cells inside the polygon, or parcels (coordinates or cadastral reference)
+        errors = []
+        if config.get("polygon") is not None:
+            try:
+                resolution = float(config.get("resolution_deg", GRID_DEG))
+            except (TypeError, ValueError):
+                resolution = float("nan")
+            if not resolution > 0 or not np.isfinite(resolution):
+                return {"error": "resolution_deg must be a positive number"}
+            grid = grid_sites(polygon_ring(config["polygon"]), resolution)
+            sites = [{"id": f"{r}_{c}", "lat": float(la), "lon": float(lo)}
+                     for r, c, la, lo in zip(grid["rows"], grid["cols"], grid["lats"], grid["lons"])]
+        elif config.get("parcels"):
+            grid, resolution = None, None
+            sites, errors = self._resolve_parcels(config["parcels"])
+            if errors and not sites:
+                return {"error": "No valid parcels", "parcels": errors}
+        else:
+            return {"error": "Provide a polygon or parcels"}
+        if not sites:
+            return {"error": "The polygon contains no grid cell; lower resolution_deg"}
+        if len(sites) > MAX_SCREENING_SITES:
+            return {"error": f"Too many sites ({len(sites)} > {MAX_SCREENING_SITES}); raise resolution_deg"}
+        progress("sites_ready", 0.1)
+
+        # 2. Meteo per distinct grid cell (batched) + prices for the year, at the same time
+        cache = get_meteo_cache()
+        variables = list(dict.fromkeys((WIND_VARIABLES if "wind" in technologies else [])
+                                       + (SOLAR_VARIABLES if "solar" in technologies else [])))
+        cells = group_by_cell([(s["lat"], s["lon"]) for s in sites], variables, cache.snap_deg)
+        # Each cell is read at its first site: every site in it gets the same series
+        cell_sites = [(sites[indices[0]]["lat"], sites[indices[0]]["lon"]) for indices in cells.values()]
+        start_utc, end_utc = local_range_utc(f"{year}-01-01", f"{year}-12-31")
+        (_, prices, real), _ = run_parallel(
+            lambda: get_price_archive().utc_series(start_utc, end_utc, token=self.esios_token),
+            lambda: cache.prefetch(cell_sites, f"{year}-01-01", f"{year}-12-31", variables)
+        )
+        progress("data_fetched", 0.4)
+
+        # 3. Physics on (cells x hours) blocks
+        hours = np.arange(start_utc, end_utc + np.timedelta64(1, "h"), dtype="datetime64[h]")
+        prices = prices.astype(np.float64)
+        stats = {}
+        for first in range(0, len(cell_sites), self.block):
+            block = cell_sites[first:first + self.block]
+            series = map_parallel(lambda cell: cache.get_series(cell[0], cell[1], start_utc, end_utc, variables)[1],
+                                  block)
+            meteo = {v: np.stack([s[v] for s in series]).astype(np.float64) for v in variables}
+            if turbine is not None:
+                power = hub_power_kw(turbine, meteo["wind_speed_100m"], meteo["wind_speed_10m"],
+                                     meteo["temperature_2m"], meteo["surface_pressure"])
+                self._collect(stats, "wind", block, power, prices, turbine.rated_power)
+            if "solar" in technologies:
+                power = self._solar_power(block, hours, meteo, kwp)
+                self._collect(stats, "solar", block, power, prices, kwp)
+        progress("cells_done", 0.9)
+
+        # 4. Output
+        site_cell = np.empty(len(sites), dtype=np.int64)
+        for index, indices in enumerate(cells.values()):
+            site_cell[indices] = index
+        layers = {name: np.asarray(values)[site_cell] for name, values in stats.items()}
+        summary = {
+            "year": year,
+            "sites": len(sites),
+            "meteo_cells": len(cell_sites),
+            "real_price_share": round(float(real.mean()), 4) if len(real) else 0.0,
+            "reference": {"turbine_model": turbine.name if turbine else None,
+                          "peak_power_kwp": kwp if "solar" in technologies else None}
+        }
+        if grid is not None and config.get("output") == "raster":
+            return {"type": "raster", "bbox": grid["bbox"], "resolution_deg": resolution,
+                    "shape": list(grid["shape"]), "layers": self._raster(grid, layers), "summary": summary}
+        result = {"type": "FeatureCollection",
+                  "features": self._features(sites, layers, resolution), "summary": summary}
+        if errors:
+            result["errors"] = errors
+        return result
+
+    # --- helpers ---
+
+    def _resolve_parcels(self, parcels: List) -> Tuple[List[Dict], List[Dict]]:
+        sites, errors = [], []
+        lookup = None
+        for index, parcel in enumerate(parcels):
+            parcel_id = parcel.get("id", index) if isinstance(parcel, dict) else index
+            if not isinstance(parcel, dict):
+                errors.append({"id": parcel_id, "error": "Invalid parcel"})
+            elif parcel.get("lat") is not None and parcel.get("lon") is not None:
+                sites.append({"id": parcel_id, "lat": float(parcel["lat"]), "lon": float(parcel["lon"])})
+            elif parcel.get("rc"):
+                lookup = lookup or CadastreLookup()
+                found = lookup.get_coordinates(parcel["rc"])
+                if "error" in found:
+                    errors.append({"id": parcel_id, "error": found["error"]})
+                else:
+                    sites.append({"id": parcel_id, "lat": found["lat"], "lon": found["lon"], "rc": parcel["rc"]})
+            else:
+                errors.append({"id": parcel_id, "error": "Missing lat/lon or rc"})
+        return sites, errors
+
+    @staticmethod
+    def _solar_power(block: List[Tuple], hours, meteo: Dict, kwp: float):
+        """PV AC power (kW), cells x hours: cached sun position per cell, Perez transposition at once."""
+        sun = get_sun_cache().block(block, hours)
+        poa = irradiance.get_total_irradiance(
+            surface_tilt=30,
+            surface_azimuth=180,
+            dni=meteo["direct_radiation"],
+            ghi=meteo["shortwave_radiation"],
+            dhi=meteo["diffuse_radiation"],
+            solar_zenith=sun["apparent_zenith"],
+            solar_azimuth=sun["azimuth"],
+            dni_extra=sun["dni_extra"],
+            airmass=sun["airmass"],
+            model="perez"
+        )
+        return pv_ac_power_kw(np.nan_to_num(poa["poa_global"]), meteo["temperature_2m"],
+                              meteo["wind_speed_10m"], kwp)
+
+    @staticmethod
+    def _collect(stats: Dict, technology: str, block: List, power_kw, prices, capacity_kw: float):
+        """Per-cell yearly totals from an hourly (cells x hours) kWh block."""
+        power_kw = np.nan_to_num(power_kw)
+        energy_mwh = power_kw.sum(axis=1) / 1000
+        revenue = power_kw @ prices / 1000
+        hours = power_kw.shape[1]
+        values = {
+            f"{technology}_mwh": energy_mwh,
+            f"{technology}_capacity_factor": energy_mwh * 1000 / (capacity_kw * hours),
+            f"{technology}_revenue_eur": revenue,
+            f"{technology}_capture_price": np.divide(revenue, energy_mwh, out=np.zeros_like(revenue),
+                                                     where=energy_mwh > 0)
+        }
+        for name, block_values in values.items():
+            stats.setdefault(name, []).extend(block_values.tolist())
+
+    @staticmethod
+    def _features(sites: List[Dict], layers: Dict, resolution: Optional[float]) -> List[Dict]:
+        features = []
+        half = resolution / 2 if resolution else None
+        for i, site in enumerate(sites):
+            lat, lon = site["lat"], site["lon"]
+            if half:
+                geometry = {"type": "Polygon", "coordinates": [[
+                    [lon - half, lat - half], [lon + half, lat - half], [lon + half, lat + half],
+                    [lon - half, lat + half], [lon - half, lat - half]]]}
+            else:
+                geometry = {"type": "Point", "coordinates": [lon, lat]}
+            properties = {"id": site["id"], "lat": lat, "lon": lon}
+            properties.update({name: round(float(values[i]), 3) for name, values in layers.items()})
+            features.append({"type": "Feature", "geometry": geometry, "properties": properties})
+        return features
+
+    @staticmethod
+    def _raster(grid: Dict, layers: Dict) -> Dict:
+        rasters = {}
+        for name, values in layers.items():
+            raster = np.full(grid["shape"], np.nan)
+            raster[grid["rows"], grid["cols"]] = values
+            # Row 0 = southernmost; null outside the polygon
+            rasters[name] = [[None if np.isnan(v) else round(float(v), 3) for v in row] for row in raster]
+        return rasters
@@ -0,0 +1,169 @@
+"""
+Solar Orientation: revenue-optimal tilt/azimuth (and tracker) for a site.
+
+When a developer proposes a PV plant on the monte, its yield and revenue
+should be benchmarked against the best orientation the site allows, not
+against the 30°/180° default of DeepResearchAuditor.simulate_solar:
+
+    from solar_orientation import OrientationOptimizer
+    result = OrientationOptimizer(esios_token).run({
+        "lat": 42.5, "lon": -7.8, "year": 2023,      # or "start_date"/"end_date"
+        "peak_power_kwp": 5000,
+        "tilts": [0, 5, ..., 60], "azimuths": [90, 100, ..., 270],   # defaults
+        "tracking": True                              # + single-axis N-S tracker
+    })
+    result["best"]          # highest revenue
+    result["best_yield"]    # highest production (often not the same one)
+    result["ranking"]       # top configurations by revenue
+
+Meteo, prices and the cached sun position (sun_cache.py) are shared by every
+configuration: tilts and azimuths are (configs x 1) columns broadcast against
+the (hours,) series, so Perez transposition, cell temperature and revenue
+come out as (configs x hours) arrays, ORIENTATION_BLOCK configurations at a
+time. Ranking is by revenue (production x hourly price), so orientations
+producing when prices are high (west in the evening) are rewarded.
+"""
+import os
+from typing import Callable, Dict, Optional
+
+from energy_audit_deep_research import DeepResearchAuditor, pv_ac_power_kw
+from lazy_imports import lazy_module
+from range_planner import run_parallel
+from sun_cache import get_sun_cache
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+irradiance = lazy_module("pvlib.irradiance")
+tracking = lazy_module("pvlib.tracking")
+
+ORIENTATION_BLOCK = int(os.environ.get("ORIENTATION_BLOCK", 64))
+MAX_ORIENTATIONS = int(os.environ.get("MAX_ORIENTATIONS", 2000))
+DEFAULT_TILTS = list(range(0, 65, 5))
+DEFAULT_AZIMUTHS = list(range(90, 275, 10))
+# simulate_solar defaults, reported as the reference
+REFERENCE_TILT, REFERENCE_AZIMUTH = 30.0, 180.0
+# Horizontal single-axis tracker, N-S axis, with backtracking
+TRACKER_MAX_ANGLE = 60.0
+TRACKER_GCR = 0.35
+
+
+def poa_global(surface_tilt, surface_azimuth, meteo: Dict, sun: Dict):
+    """Perez plane-of-array irradiance; tilt/azimuth (configs x 1) or (hours,) broadcast over the hours."""
+    poa = irradiance.get_total_irradiance(
+        surface_tilt=surface_tilt,
+        surface_azimuth=surface_azimuth,
+        dni=meteo["dni"],
+        ghi=meteo["ghi"],
+        dhi=meteo["dhi"],
+        solar_zenith=sun["apparent_zenith"],
+        solar_azimuth=sun["azimuth"],
+        dni_extra=sun["dni_extra"],
+        airmass=sun["airmass"],
+        model="perez"
+    )
+    return np.nan_to_num(poa["poa_global"])
+
+
+class OrientationOptimizer:
+    def __init__(self, esios_token: Optional[str] = None, block: int = ORIENTATION_BLOCK):
+        self.auditor = DeepResearchAuditor(esios_token=esios_token)
+        self.block = block
+
+    def run(self, config: Dict, progress: Optional[Callable] = None) -> Dict:
+        """
+        Evaluates every tilt x azimuth (+ tracker) for config's site and period.
+        `progress(stage, fraction)` is called after data_fetched and orientations_done.
+        """
+        if progress is None:
+            progress = lambda stage, fraction: None
+
+        tilts = np.asarray(config.get("tilts", DEFAULT_TILTS), dtype=float)
+        azimuths = np.asarray(config.get("azimuths", DEFAULT_AZIMUTHS), dtype=float)
+        if tilts.ndim != 1 or azimuths.ndim != 1 or not len(tilts) or not len(azimuths):
+            return {"error": "tilts and azimuths must be non-empty lists of angles"}
+        if ((tilts < 0) | (tilts > 90)).any() or ((azimuths < 0) | (azimuths > 360)).any():
+            return {"error": "Tilts must be within 0-90° and azimuths within 0-360°"}
+        if len(tilts) * len(azimuths) > MAX_ORIENTATIONS:
+            return {"error": f"Too many orientations ({len(tilts) * len(azimuths)} > {MAX_ORIENTATIONS})"}
+        kwp = float(config.get("peak_power_kwp", 1000))
+        lat, lon = float(config["lat"]), float(config["lon"])
+        year = int(config.get("year", pd.Timestamp.now().year - 1))
+        start = config.get("start_date", f"{year}-01-01")
+        end = config.get("end_date", f"{year}-12-31")
+
+        # 1. Meteo, prices and sun position, shared by every configuration
+        meteo_df, prices = run_parallel(
+            lambda: self.auditor.get_meteo_data(lat, lon, start, end),
+            lambda: self.auditor.get_prices(start, end)
+        )
+        if meteo_df is None:
+            return {"error": "Meteo data failed"}
+        common = meteo_df.index.intersection(prices.index)
+        meteo = {column: meteo_df.loc[common, column].to_numpy() for column in
+                 ("ghi", "dni", "dhi", "temp_air", "wind_speed_10m")}
+        price = np.nan_to_num(prices.loc[common].to_numpy(dtype=np.float64))
+        sun = get_sun_cache().for_index(lat, lon, common)
+        progress("data_fetched", 0.4)
+
+        # 2. Fixed mounts: each distinct (tilt, azimuth) once as a (configs x 1) column,
+        #    reference first (the default grid contains it too), block by block
+        grid_tilt, grid_azimuth = (a.ravel() for a in np.meshgrid(tilts, azimuths, indexing="ij"))
+        pairs = list(dict.fromkeys([(REFERENCE_TILT, REFERENCE_AZIMUTH)]
+                                   + list(zip(grid_tilt.tolist(), grid_azimuth.tolist()))))
+        position = {pair: i for i, pair in enumerate(pairs)}
+        grid = np.array([position[pair] for pair in zip(grid_tilt.tolist(), grid_azimuth.tolist())])
+        fixed_tilt, fixed_azimuth = (np.array(values) for values in zip(*pairs))
+        energy, revenue = [], []
+        for first in range(0, len(fixed_tilt), self.block):
+            rows = slice(first, first + self.block)
+            poa = poa_global(fixed_tilt[rows, None], fixed_azimuth[rows, None], meteo, sun)
+            e, r = self._totals(poa, meteo, price, kwp)
+            energy.append(e)
+            revenue.append(r)
+        energy, revenue = np.concatenate(energy), np.concatenate(revenue)
+        entries = [{"mount": "fixed", "tilt": float(t), "azimuth": float(a)}
+                   for t, a in zip(fixed_tilt, fixed_azimuth)]
+
+        # 3. Tracker: hourly surface angles from the sun position
+        if config.get("tracking", True):
+            angles = tracking.singleaxis(sun["apparent_zenith"], sun["azimuth"], axis_tilt=0, axis_azimuth=180,
+                                         max_angle=TRACKER_MAX_ANGLE, backtrack=True,
+                                         gcr=float(config.get("gcr", TRACKER_GCR)))
+            poa = poa_global(np.nan_to_num(angles["surface_tilt"]), np.nan_to_num(angles["surface_azimuth"], nan=180),
+                             meteo, sun)
+            e, r = self._totals(poa[None, :], meteo, price, kwp)
+            energy, revenue = np.concatenate([energy, e]), np.concatenate([revenue, r])
+            entries.append({"mount": "tracker", "tilt": None, "azimuth": None})
+        progress("orientations_done", 0.9)
+
+        # 4. Ranking by revenue; the reference is entry 0
+        for entry, e, r in zip(entries, energy, revenue):
+            entry.update({
+                "production_mwh": round(float(e), 2),
+                "specific_yield_kwh_kwp": round(float(e) * 1000 / kwp, 1) if kwp > 0 else 0,
+                "revenue_eur": round(float(r), 2),
+                "capture_price": round(float(r / e), 2) if e > 0 else 0,
+                "revenue_vs_reference_pct": round(float((r / revenue[0] - 1) * 100), 2) if revenue[0] > 0 else 0
+            })
+        order = np.argsort(-revenue, kind="stable")
+        return {
+            "period": {"start": start, "end": end},
+            "peak_power_kwp": kwp,
+            "best": entries[order[0]],
+            "best_yield": entries[int(np.argmax(energy))],
+            "reference": entries[0],
+            "ranking": [entries[i] for i in order[:int(config.get("top", 10))]],
+            "grid": {
+                "tilts": tilts.tolist(),
+                "azimuths": azimuths.tolist(),
+                "production_mwh": energy[grid].reshape(len(tilts), len(azimuths)).round(2).tolist(),
+                "revenue_eur": revenue[grid].reshape(len(tilts), len(azimuths)).round(2).tolist()
+            },
+            "data_gaps": meteo_df.attrs.get("gaps")
+        }
+
+    @staticmethod
+    def _totals(poa, meteo: Dict, price, kwp: float):
+        """(configs x hours) POA -> production (MWh) and revenue (EUR) per configuration."""
+        power_kw = np.nan_to_num(pv_ac_power_kw(poa, meteo["temp_air"], meteo["wind_speed_10m"], kwp))
+        return power_kw.sum(axis=1) / 1000, power_kw @ price / 1000
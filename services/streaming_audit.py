@@ -0,0 +1,233 @@
+"""
+Streaming Audit: the deep audit over decades with the memory of one chunk.
+
+run_audit holds the whole period at once (meteo frame, production, prices,
+revenue). Here the period is cut at calendar months or years
+(range_planner.iter_chunks) and every chunk goes through
+fetch -> simulate -> price -> aggregate before the next one is needed:
+
+    from streaming_audit import StreamingAuditor
+    auditor = StreamingAuditor(esios_token)
+    result = auditor.run({...deep audit config..., "start_date": "1994-01-01", "end_date": "2023-12-31",
+                          "chunk": "month", "rollup": "year", "company_payment": 5000000})
+    result["rollups"]       # one row per year (or month)
+
+    for row in auditor.iter_hours(config):   # optional: every hour, generated chunk by chunk
+        ...
+
+- only running totals, one row per rollup period and the first 24 hours
+  (hourly_sample, as in run_audit) are kept and only one chunk is alive, so
+  the peak memory of a 30-year audit is that of a one-month one plus its
+  rollup rows
+- "prefetch": true fetches meteo and prices together and the next chunk
+  while the current one is simulated: faster when fetching is slow, at the
+  cost of a second chunk
+- a chunk whose meteo fails is listed in failed_chunks; the rest still count
+- meteo gaps are reported per chunk (a gap across a chunk boundary shows twice)
+"""
+import gc
+import itertools
+import os
+from typing import Callable, Dict, Iterator, Optional
+
+from energy_audit_advanced import discrepancy_summary
+from energy_audit_deep_research import DeepResearchAuditor
+from lazy_imports import lazy_module
+from range_planner import count_chunks, iter_chunks, run_parallel
+
+np = lazy_module("numpy")
+
+ROLLUP_UNITS = {"month": "datetime64[M]", "year": "datetime64[Y]"}
+MAX_REPORTED_GAPS = 20
+GC_HOURS = int(os.environ.get("STREAMING_GC_HOURS", 8760))
+
+
+def hour_rows(chunk: Dict) -> Iterator[Dict]:
+    """The hours of a streamed chunk as run_audit's hourly_sample rows (unrounded)."""
+    revenue = np.nan_to_num(chunk["production_kwh"]) / 1000 * chunk["prices"]
+    for t, p, pr, r in zip(chunk["times"], chunk["production_kwh"], chunk["prices"], revenue):
+        yield {"time": str(t)[:19].replace("T", " "), "prod_kwh": float(p), "price": float(pr), "rev": float(r)}
+
+
+class RunningTotals:
+    """Sums over the hours seen so far, overall and per rollup period (month or year)."""
+
+    def __init__(self, rollup: str = "year"):
+        self.unit = ROLLUP_UNITS[rollup]
+        self.energy_kwh = 0.0
+        self.revenue_eur = 0.0
+        self.price_sum = 0.0
+        self.hours = 0
+        self.periods: Dict[str, Dict] = {}
+        self.turbines: Dict = {}
+
+    def add(self, times, production_kwh, prices):
+        """One chunk of aligned hours: naive local datetime64 times, kWh and EUR/MWh."""
+        production_kwh = np.nan_to_num(np.asarray(production_kwh, dtype=np.float64))
+        prices = np.asarray(prices, dtype=np.float64)
+        revenue = production_kwh / 1000 * prices
+        self.energy_kwh += float(production_kwh.sum())
+        self.revenue_eur += float(revenue.sum())
+        self.price_sum += float(prices.sum())
+        self.hours += len(prices)
+
+        labels, inverse = np.unique(np.asarray(times).astype(self.unit), return_inverse=True)
+        sums = {
+            "energy_kwh": np.bincount(inverse, weights=production_kwh, minlength=len(labels)),
+            "revenue_eur": np.bincount(inverse, weights=revenue, minlength=len(labels)),
+            "price_sum": np.bincount(inverse, weights=prices, minlength=len(labels)),
+            "hours": np.bincount(inverse, minlength=len(labels))
+        }
+        for i, label in enumerate(labels.astype(str)):
+            period = self.periods.setdefault(label, {"energy_kwh": 0.0, "revenue_eur": 0.0, "price_sum": 0.0, "hours": 0})
+            for key, values in sums.items():
+                period[key] += values[i].item()
+
+    def add_turbines(self, turbines):
+        """Per-turbine totals of a chunk (production.attrs["turbines"] of a layout park)."""
+        for turbine in turbines:
+            total = self.turbines.setdefault(turbine["id"], {"model": turbine["model"], "mwh": 0.0, "free_mwh": 0.0})
+            total["mwh"] += turbine["production_mwh"]
+            loss = turbine["wake_loss_pct"] / 100
+            total["free_mwh"] += turbine["production_mwh"] / (1 - loss) if loss < 1 else 0.0
+
+    @staticmethod
+    def summary(energy_kwh: float, revenue_eur: float, price_sum: float, hours: int) -> Dict:
+        """The price_production figures for totals (production, revenue, prices)."""
+        production_mwh = energy_kwh / 1000
+        avg_price = price_sum / hours if hours else 0
+        capture_price = revenue_eur / production_mwh if production_mwh > 0 else 0
+        return {
+            "production_mwh": round(production_mwh, 2),
+            "revenue_eur": round(revenue_eur, 2),
+            "avg_market_price": round(avg_price, 2),
+            "capture_price": round(capture_price, 2),
+            "cannibalization_factor": round(capture_price / avg_price, 3) if avg_price > 0 else 0
+        }
+
+    def result(self) -> Dict:
+        result = self.summary(self.energy_kwh, self.revenue_eur, self.price_sum, self.hours)
+        result["hours"] = self.hours
+        result["rollups"] = [dict(period=label, hours=p["hours"], **self.summary(**p))
+                             for label, p in sorted(self.periods.items())]
+        if self.turbines:
+            result["turbines"] = [
+                {"id": turbine_id, "model": t["model"], "production_mwh": round(t["mwh"], 2),
+                 "wake_loss_pct": round((1 - t["mwh"] / t["free_mwh"]) * 100, 2) if t["free_mwh"] > 0 else 0}
+                for turbine_id, t in self.turbines.items()
+            ]
+        return result
+
+
+class StreamingAuditor:
+    def __init__(self, esios_token: Optional[str] = None):
+        self.auditor = DeepResearchAuditor(esios_token=esios_token)
+
+    def stream(self, config: Dict) -> Iterator[Dict]:
+        """
+        Yields one dict per chunk, in order: {"start", "end", "times", "production_kwh",
+        "prices", "gaps", "turbines"} or {"start", "end", "error"} if its meteo failed.
+        With config["prefetch"] meteo and prices are fetched together and the next chunk
+        while the current one is simulated (faster, but two chunks are alive instead of one).
+        """
+        # The plan itself is generated lazily: 30 years of month chunks would be 360 tuples kept alive
+        chunks = iter_chunks(config["start_date"], config["end_date"], config.get("chunk", "year"))
+        lat, lon = float(config["lat"]), float(config["lon"])
+        variables = self.auditor.meteo_variables(config)
+        prefetch = bool(config.get("prefetch"))
+
+        def fetch(span):
+            meteo = lambda: self.auditor.get_meteo_data(lat, lon, *span, variables)
+            prices = lambda: self.auditor.get_prices(*span)
+            if prefetch:
+                return run_parallel(meteo, prices)
+            # One provider at a time: their frames would otherwise be alive together
+            return [meteo(), prices()]
+
+        span, data = next(chunks, None), None
+        pending_hours = 0
+        while span is not None:
+            following = next(chunks, None)
+            if data is None:
+                data = fetch(span)
+            if prefetch and following is not None:
+                data, current = run_parallel(lambda span=following: fetch(span),
+                                             lambda data=data, span=span: self._simulate(config, span, *data))
+            else:
+                # Drop this chunk's meteo and prices before the caller gets the result
+                current, data = self._simulate(config, span, *data), None
+            span = following
+            yield current
+            # pandas frames hold reference cycles: collect the finished chunks every GC_HOURS
+            # instead of letting them pile up until the interpreter's next full collection
+            pending_hours += len(current.get("times", ()))
+            del current
+            if pending_hours >= GC_HOURS:
+                gc.collect()
+                pending_hours = 0
+
+    def _simulate(self, config: Dict, span, meteo, prices) -> Dict:
+        chunk = {"start": span[0], "end": span[1]}
+        if meteo is None:
+            return dict(chunk, error="Meteo data failed")
+        production = self.auditor.simulate_park(config, meteo)
+        common = production.index.intersection(prices.index)
+        return dict(chunk, times=common.to_numpy(), production_kwh=production.loc[common].to_numpy(),
+                    prices=prices.loc[common].to_numpy(), gaps=meteo.attrs.get("gaps"),
+                    turbines=production.attrs.get("turbines"))
+
+    def iter_hours(self, config: Dict) -> Iterator[Dict]:
+        """Every hour of the period as {"time", "prod_kwh", "price", "rev"}, chunk by chunk."""
+        for chunk in self.stream(config):
+            if "error" not in chunk:
+                yield from hour_rows(chunk)
+
+    def run(self, config: Dict, progress: Optional[Callable] = None) -> Dict:
+        """
+        Deep audit totals + rollups for config's park over [start_date, end_date].
+        `progress(stage, fraction)` is called with chunk_done after every chunk.
+        """
+        if progress is None:
+            progress = lambda stage, fraction: None
+
+        chunk_unit = config.get("chunk", "year")
+        rollup = config.get("rollup", "year")
+        if chunk_unit not in ("month", "year") or rollup not in ROLLUP_UNITS:
+            return {"error": "chunk and rollup must be 'month' or 'year'"}
+        count = count_chunks(config["start_date"], config["end_date"], chunk_unit)
+        if count == 0:
+            return {"error": "The period is empty"}
+
+        totals = RunningTotals(rollup)
+        sample, failed = [], []
+        gaps = {"missing_hours": 0, "gap_count": 0, "gaps": []}
+        try:
+            done = 0
+            # Not enumerate(): its cached (index, chunk) tuple would keep each chunk alive
+            # while the next one is built
+            for chunk in self.stream(config):
+                done += 1
+                progress("chunk_done", round(0.95 * done / count, 3))
+                if "error" in chunk:
+                    failed.append({"start": chunk["start"], "end": chunk["end"], "error": chunk["error"]})
+                    continue
+                totals.add(chunk["times"], chunk["production_kwh"], chunk["prices"])
+                if chunk["turbines"]:
+                    totals.add_turbines(chunk["turbines"])
+                if chunk["gaps"]:
+                    gaps["missing_hours"] += chunk["gaps"]["missing_hours"]
+                    gaps["gap_count"] += chunk["gaps"]["gap_count"]
+                    gaps["gaps"] = (gaps["gaps"] + chunk["gaps"]["gaps"])[:MAX_REPORTED_GAPS]
+                sample += [{key: round(value, 2) if key != "time" else value for key, value in row.items()}
+                           for row in itertools.islice(hour_rows(chunk), 24 - len(sample))]
+                del chunk
+        except (KeyError, ValueError) as e:
+            return {"error": f"Simulation failed: {e}"}
+        if len(failed) == count:
+            return {"error": "Meteo data failed", "failed_chunks": failed}
+
+        result = totals.result()
+        result.update({"hourly_sample": sample, "chunks": count, "failed_chunks": failed, "data_gaps": gaps})
+        if config.get("company_payment") not in (None, ""):
+            result.update(discrepancy_summary(totals.revenue_eur, float(config["company_payment"])))
+        return result
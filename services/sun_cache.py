@@ -0,0 +1,148 @@
+"""
+Sun Cache: solar geometry per site and year, computed once.
+
+The sun position (NREL SPA through pvlib) is the most expensive step of a
+solar simulation, and it only depends on the site and the timestamps. It is
+computed for a whole UTC year at a time and kept on disk as float32 arrays:
+
+    .cache/sun/+42.5000_-7.8000/2023.npz
+        apparent_zenith, azimuth   degrees
+        dni_extra                  extraterrestrial DNI (W/m2)
+        airmass                    relative airmass (Kasten-Young, NaN at night)
+
+Coordinates are snapped to SUN_CACHE_SNAP_DEG (0.01°, ~1 km: the sun moves
+less than 0.01° across it). The arrays are indexed by UTC hour, so one entry
+serves any timezone; the timezone is only used to read naive local
+timestamps (like the meteo frames):
+
+    geometry = get_sun_cache().for_index(42.51, -7.83, meteo_df.index)   # naive Europe/Madrid
+    geometry["apparent_zenith"]                                           # one value per row
+    block = get_sun_cache().block([(42.5, -7.8), (42.6, -7.8)], utc_hours)  # sites x hours
+
+Every tilt/azimuth variant of the same site and period reuses the entry;
+a recent set of years is also kept in memory (SUN_CACHE_MEMORY_ENTRIES).
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+from hour_index import LOCAL_TIMEZONE, from_local, from_utc
+from lazy_imports import lazy_module
+from meteo_grid import snap
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+location = lazy_module("pvlib.location")
+irradiance = lazy_module("pvlib.irradiance")
+atmosphere = lazy_module("pvlib.atmosphere")
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SUN_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sun")
+)
+SNAP_DEG = float(os.environ.get("SUN_CACHE_SNAP_DEG", 0.01))
+MEMORY_ENTRIES = int(os.environ.get("SUN_CACHE_MEMORY_ENTRIES", 256))
+FIELDS = ("apparent_zenith", "azimuth", "dni_extra", "airmass")
+
+
+def compute_year(lat: float, lon: float, year: int) -> Dict[str, "np.ndarray"]:
+    """Solar geometry for every UTC hour of `year` (pvlib, site altitude looked up as in Location)."""
+    times = pd.date_range(f"{year}-01-01", f"{year}-12-31 23:00", freq="h", tz="UTC")
+    position = location.Location(lat, lon, tz="UTC").get_solarposition(times)
+    zenith = position["apparent_zenith"].to_numpy()
+    return {
+        "apparent_zenith": zenith.astype(np.float32),
+        "azimuth": position["azimuth"].to_numpy().astype(np.float32),
+        "dni_extra": irradiance.get_extra_radiation(times).to_numpy().astype(np.float32),
+        "airmass": np.asarray(atmosphere.get_relative_airmass(zenith), dtype=np.float32)
+    }
+
+
+class SunCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, snap_deg: float = SNAP_DEG,
+                 memory_entries: int = MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.snap_deg = snap_deg
+        self.memory_entries = memory_entries
+        self.computed = 0  # years computed (not read from disk or memory)
+        self._memory: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, lat: float, lon: float, year: int) -> str:
+        return os.path.join(self.cache_dir, f"{lat:+.4f}_{lon:+.4f}", f"{year}.npz")
+
+    def _remember(self, key: Tuple, arrays: Dict):
+        with self._lock:
+            self._memory[key] = arrays
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def year(self, lat: float, lon: float, year: int) -> Dict[str, "np.ndarray"]:
+        """Geometry arrays for every UTC hour of `year` at the snapped site."""
+        lat, lon = snap(float(lat), self.snap_deg), snap(float(lon), self.snap_deg)
+        key = (lat, lon, int(year))
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(lat, lon, year)
+        try:
+            with np.load(path) as stored:
+                arrays = {field: stored[field] for field in FIELDS}
+        except (OSError, KeyError, ValueError):
+            arrays = compute_year(lat, lon, year)
+            self.computed += 1
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomic replace: readers never see a half-written file
+            buffer = io.BytesIO()
+            np.savez(buffer, **arrays)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, path)
+        self._remember(key, arrays)
+        return arrays
+
+    def geometry(self, lat: float, lon: float, hours) -> Dict[str, "np.ndarray"]:
+        """Geometry at int64 UTC hours (any order, any span of years)."""
+        hours = np.asarray(hours, dtype=np.int64)
+        out = {field: np.empty(len(hours), dtype=np.float32) for field in FIELDS}
+        years = hours.astype("datetime64[h]").astype("datetime64[Y]").astype(np.int64) + 1970
+        for year in np.unique(years):
+            rows = years == year
+            arrays = self.year(lat, lon, int(year))
+            position = hours[rows] - np.datetime64(f"{year}-01-01T00", "h").astype(np.int64)
+            for field in FIELDS:
+                out[field][rows] = arrays[field][position]
+        return out
+
+    def for_index(self, lat: float, lon: float, index, timezone: str = LOCAL_TIMEZONE) -> Dict[str, "np.ndarray"]:
+        """Geometry for the hourly timestamps of a DatetimeIndex; naive ones are local to `timezone`."""
+        index = pd.DatetimeIndex(index)
+        if index.tz is None:
+            hours = from_local(index, timezone)
+        else:
+            hours = from_utc(index.tz_convert("UTC").tz_localize(None).to_numpy())
+        return self.geometry(lat, lon, hours)
+
+    def block(self, sites: Sequence[Tuple[float, float]], hours) -> Dict[str, "np.ndarray"]:
+        """Geometry for many sites at the same UTC hours: sites x hours arrays."""
+        hours = np.asarray(hours, dtype="datetime64[h]").astype(np.int64)
+        per_site = [self.geometry(lat, lon, hours) for lat, lon in sites]
+        return {field: np.stack([g[field] for g in per_site]) for field in FIELDS}
+
+
+_cache: Optional[SunCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_sun_cache() -> SunCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SunCache()
+        return _cache
@@ -0,0 +1,44 @@
+"""
+Test Persistent API Server (request validation on POST /)
+"""
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api_server import APIRequestHandler, PooledHTTPServer
+
+
+def _post(port: int, body: bytes):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/", data=body,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_post_rejects_non_object_bodies():
+    server = PooledHTTPServer(("127.0.0.1", 0), APIRequestHandler, workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        for body in (b'"batch"', b"[1, 2]", b"42"):
+            status, payload = _post(port, body)
+            assert status == 400 and "JSON object" in payload["error"]
+        assert _post(port, b"{not json")[0] == 400
+        assert _post(port, json.dumps({"action": "nope"}).encode()) == (200, {"error": "Unknown action: nope"})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,86 @@
+"""
+Test api_wrapper batch envelope (order, error isolation, worker limit), one-shot input and warm-up
+"""
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import api_wrapper
+import import_report
+
+
+def _probe(monkeypatch):
+    """A 'probe' action that records how many items run at the same time."""
+    state = {"running": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def handle_probe(data):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.05)
+        with lock:
+            state["running"] -= 1
+        if data.get("fail"):
+            raise ValueError(f"probe {data['n']} failed")
+        return {"n": data["n"]}
+    monkeypatch.setitem(api_wrapper.ACTIONS, "probe", handle_probe)
+    return state
+
+
+def test_batch_keeps_order_and_isolates_errors(monkeypatch):
+    _probe(monkeypatch)
+    items = [{"id": f"q{n}", "action": "probe", "data": {"n": n, "fail": n == 2}} for n in range(5)]
+    items.insert(3, {"id": "bad", "action": "nope", "data": {}})
+    items.append("not an item")
+    result = api_wrapper.dispatch({"batch": items, "max_workers": 4})
+
+    assert [r["id"] for r in result["batch"]] == ["q0", "q1", "q2", "bad", "q3", "q4", 6]
+    assert [r["status"] for r in result["batch"]] == ["ok", "ok", "error", "error", "ok", "ok", "error"]
+    assert result["batch"][4]["result"] == {"n": 3}
+    assert result["batch"][2]["result"] == {"error": "probe 2 failed"}
+    assert (result["succeeded"], result["failed"]) == (4, 3)
+
+
+def test_batch_respects_max_workers(monkeypatch):
+    state = _probe(monkeypatch)
+    items = [{"action": "probe", "data": {"n": n}} for n in range(8)]
+    result = api_wrapper.dispatch({"batch": items, "max_workers": 2})
+    assert result["succeeded"] == 8 and state["peak"] <= 2
+
+    # Never above BATCH_WORKERS, whatever the client asks for
+    monkeypatch.setattr(api_wrapper, "MAX_BATCH_WORKERS", 3)
+    state["peak"] = 0
+    api_wrapper.dispatch({"batch": items, "max_workers": 100})
+    assert state["peak"] <= 3
+
+
+def test_batch_rejects_invalid_max_workers(monkeypatch):
+    _probe(monkeypatch)
+    items = [{"action": "probe", "data": {"n": 0}}]
+    for value in ("many", -1, [2]):
+        result = api_wrapper.dispatch({"batch": items, "max_workers": value})
+        assert result == {"error": "max_workers must be a positive integer"}
+    assert "error" in api_wrapper.dispatch({"batch": "q1"})
+
+
+def test_one_shot_mode_rejects_non_object_bodies(monkeypatch, capsys):
+    for body in ("[1, 2]", '"deep_audit"', "42"):
+        monkeypatch.setattr(sys, "stdin", io.StringIO(body))
+        api_wrapper.main()
+        assert json.loads(capsys.readouterr().out) == {"error": "Request must be a JSON object"}
+
+
+def test_warm_up_preloads_every_action_module():
+    modules = {m for names in import_report.ACTION_MODULES.values() for m in names} - {"api_wrapper"}
+    assert modules <= set(api_wrapper.WARM_UP_MODULES)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
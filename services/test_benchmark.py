@@ -0,0 +1,42 @@
+"""
+Test Benchmark suite (every case runs at its smallest quick size, baseline comparison)
+Prices come from the mock and the sun cache lives under tmp_path; the cases bring their own synthetic meteo.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import benchmark
+
+
+@pytest.mark.parametrize("name", list(benchmark.CASES))
+def test_every_case_runs_at_its_smallest_quick_size(name, offline_prices, fresh_sun_cache):
+    size = min(benchmark.CASES[name][3])
+    result = benchmark.run_case(name, size, repeat=1)
+    assert result["case"] == name and result["size"] == size and result["repeat"] == 1
+    assert result["unit"] == benchmark.CASES[name][1]
+    assert result["units"] > 0 and result["median_s"] > 0 and result["throughput_per_s"] > 0
+
+
+def test_compare_flags_regressions_against_the_baseline():
+    def results(*rows):
+        return {"results": [{"case": case, "size": size, "median_s": median} for case, size, median in rows]}
+
+    baseline = results(("simulate_wind", 1, 0.10), ("simulate_wind", 2, 0.20), ("repowering", 50, 0.0))
+    current = results(("simulate_wind", 1, 0.12), ("simulate_wind", 2, 0.30), ("repowering", 50, 1.0),
+                      ("streaming_audit", 1, 0.5))
+    comparison = benchmark.compare(current, baseline, tolerance=0.25)
+
+    # No baseline (or a zero one) for a case/size: not compared
+    assert [(c["case"], c["size"]) for c in comparison] == [("simulate_wind", 1), ("simulate_wind", 2)]
+    assert [c["ratio"] for c in comparison] == [1.2, 1.5]
+    assert [c["regression"] for c in comparison] == [False, True]
+    assert comparison[1]["baseline_s"] == 0.20 and comparison[1]["current_s"] == 0.30
+    assert not any(c["regression"] for c in benchmark.compare(current, baseline, tolerance=0.6))
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
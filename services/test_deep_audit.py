@@ -0,0 +1,63 @@
+"""
+Test Deep Research Auditor (run_audit steps, meteo cache transparency, no network)
+SyntheticWeather (conftest.py) stands in for Open-Meteo; prices come from the mock.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from energy_audit_deep_research import DeepResearchAuditor
+from meteo_cache import MeteoCache
+
+PARK = {"type": "wind", "lat": 42.5, "lon": -7.8, "turbine_model": "Vestas V90 3MW", "num_turbines": 2,
+        "start_date": "2023-05-01", "end_date": "2023-05-01"}
+
+
+def test_progress_stages_follow_the_work(monkeypatch):
+    events = []
+    index = pd.date_range("2023-05-01", periods=24, freq="h")
+    meteo = pd.DataFrame({"wind_speed_100m": 8.0, "wind_speed_10m": 6.0, "temp_air": 15.0, "pressure": 1000.0},
+                         index=index)
+    monkeypatch.setattr(DeepResearchAuditor, "get_meteo_data", lambda self, lat, lon, start, end, variables=None: meteo)
+    monkeypatch.setattr(DeepResearchAuditor, "get_prices", lambda self, start, end: pd.Series(50.0, index=index))
+
+    def price_production(self, production, prices):
+        events.append("price_production")
+        return {"revenue_eur": 1.0}
+    monkeypatch.setattr(DeepResearchAuditor, "price_production", price_production)
+
+    result = DeepResearchAuditor().run_audit(PARK, progress=lambda stage, fraction: events.append(stage))
+    assert result["revenue_eur"] == 1.0
+    assert events == ["meteo_fetched", "simulation_done", "price_production", "pricing_done"]
+
+
+
+def test_audit_is_the_same_with_and_without_the_meteo_cache(monkeypatch, synthetic_weather, offline_prices):
+    # Same 0.1° cell (42.6, -7.8), but the 100 m wind comes from different 0.25° cells
+    near, park = dict(PARK, lat=42.6), dict(PARK, lat=42.64)
+    auditor = DeepResearchAuditor()
+    auditor.run_audit(near)
+    cached = auditor.run_audit(park)
+    assert (42.75, -7.75) in synthetic_weather.locations
+
+    # Without the cache: Open-Meteo asked for the park's own coordinates
+    def uncached_series(self, lat, lon, start_utc, end_utc, variables):
+        day = lambda hour: str(hour.astype("datetime64[D]"))
+        hours, values = synthetic_weather.series(lat, lon, day(start_utc), day(end_utc), variables)
+        keep = (hours >= start_utc) & (hours <= end_utc)
+        return hours[keep], {v: values[v][keep] for v in variables}
+    monkeypatch.setattr(MeteoCache, "get_series", uncached_series)
+    direct = auditor.run_audit(park)
+
+    assert np.isclose(cached["production_mwh"], direct["production_mwh"], rtol=1e-6)
+    assert np.isclose(cached["revenue_eur"], direct["revenue_eur"], rtol=1e-6)
+    assert cached["production_mwh"] != auditor.run_audit(near)["production_mwh"]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
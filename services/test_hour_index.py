@@ -0,0 +1,45 @@
+"""
+Test Hour Index (UTC hour alignment of production and prices)
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import hour_index
+
+
+def test_local_and_pvgis_times_map_to_utc_hours():
+    # Spring forward (02:00 -> 03:00) and fall back (the repeated 02:00 is the summer one)
+    local = hour_index.from_local(["2023-03-26T01:00:00", "2023-03-26T03:00:00",
+                                   "2023-10-29T02:00:00", "2023-10-29T03:00:00"])
+    assert hour_index.to_datetime64(local).astype(str).tolist() == [
+        "2023-03-26T00", "2023-03-26T01", "2023-10-29T00", "2023-10-29T02"]
+    # PVGIS :10 timestamps (UTC) fall on their hour
+    assert hour_index.from_utc(["2023-06-01T12:10:00"])[0] == hour_index.from_local(["2023-06-01T14:00:00"])[0]
+    assert hour_index.to_local(local[:1]) == ["2023-03-26T01:00:00"]
+
+
+def test_align_reports_matched_imputed_and_missing_hours():
+    price_hours = np.array([12, 10, 11])
+    joined = hour_index.align([10, 11, 12, 13], [1000.0] * 4, price_hours, [30.0, 10.0, np.nan],
+                              imputed=[True, False, False])
+    assert np.isnan(joined.price[[1, 3]]).all() and joined.price[[0, 2]].tolist() == [10.0, 30.0]
+    assert joined.coverage == {"hours": 4, "matched": 1, "imputed": 1, "missing": 2, "real_share": 0.25}
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TESTING HOUR INDEX")
+    print("=" * 60)
+
+    for test in (test_local_and_pvgis_times_map_to_utc_hours,
+                 test_align_reports_matched_imputed_and_missing_hours):
+        test()
+        print(f"✓ {test.__name__}")
+
+    print("\n" + "=" * 60)
+    print("TESTS COMPLETED SUCCESSFULLY")
+    print("=" * 60)
@@ -0,0 +1,47 @@
+"""
+Test Shared HTTP Client (retries with backoff on 429/5xx, POST not retried)
+Runs against a local scripted server, no network.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from http_client import HTTPClient
+
+
+def test_get_retries_transient_errors_with_backoff(http_server):
+    http_server.routes["/flaky"] = [(503, {}), (429, {}), (200, {"ok": True})]
+    client = HTTPClient(retries=3, backoff_factor=0.1, backoff_jitter=0)
+
+    started = time.perf_counter()
+    response = client.get(http_server.url + "/flaky")
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200 and response.json() == {"ok": True}
+    assert http_server.hits("/flaky") == 3
+    # urllib3 backoff: no sleep after the first failure, factor * 2 after the second
+    assert elapsed >= 0.2
+
+
+def test_retries_are_bounded_and_post_is_not_retried(http_server):
+    http_server.routes["/down"] = [(503, {"error": "down"})]
+    client = HTTPClient(retries=2, backoff_factor=0, backoff_jitter=0)
+
+    response = client.get(http_server.url + "/down")
+    assert response.status_code == 503 and http_server.hits("/down") == 3  # 1 call + 2 retries
+
+    response = client.post(http_server.url + "/down", json={})
+    assert response.status_code == 503 and http_server.hits("/down") == 4
+
+
+def test_client_errors_are_not_retried(http_server):
+    http_server.routes["/missing"] = [(404, {"error": "missing"})]
+    response = HTTPClient(retries=3, backoff_factor=0).get(http_server.url + "/missing")
+    assert response.status_code == 404 and http_server.hits("/missing") == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,67 @@
+"""
+Test HTTP Record/Replay (round trip, transient failures never recorded)
+Records from a local scripted server, then replays with the server gone.
+"""
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from http_client import HTTPClient
+
+
+def test_record_then_replay_without_network(http_server, tmp_path):
+    http_server.routes["/prices"] = [(200, {"prices": [41.5, 38.2]})]
+    http_server.routes["/missing"] = [(404, {"error": "no data"})]
+    http_server.routes["/down"] = [(503, {"error": "maintenance"})]
+    client = HTTPClient(retries=1, backoff_factor=0)
+    client.use_replay("record", fixtures_dir=str(tmp_path))
+
+    recorded = client.get(http_server.url + "/prices", params={"b": 2, "a": 1},
+                          headers={"Authorization": "Token secret"})
+    assert recorded.json() == {"prices": [41.5, 38.2]}
+    assert client.get(http_server.url + "/missing").status_code == 404
+    assert client.get(http_server.url + "/down").status_code == 503
+
+    # Only the stable answers were saved, and no credentials
+    fixtures = [os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names]
+    assert len(fixtures) == 2
+    assert all("secret" not in open(path).read() for path in fixtures)
+
+    http_server.close()
+    client.use_replay("replay", fixtures_dir=str(tmp_path))
+    replayed = client.get(http_server.url + "/prices", params={"a": 1, "b": 2})  # query order doesn't matter
+    assert replayed.status_code == 200 and replayed.json() == recorded.json()
+    assert client.get(http_server.url + "/missing").status_code == 404
+    with pytest.raises(RequestsConnectionError, match="No recorded fixture"):
+        client.get(http_server.url + "/down")
+
+
+def test_replay_injects_repeatable_failures(http_server, tmp_path):
+    http_server.routes["/ok"] = [(200, {"ok": True})]
+    client = HTTPClient(retries=0)
+    client.use_replay("record", fixtures_dir=str(tmp_path))
+    client.get(http_server.url + "/ok")
+
+    def outcomes(seed):
+        client.use_replay("replay", fixtures_dir=str(tmp_path), error_rate=0.5, seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                results.append(client.get(http_server.url + "/ok").status_code)
+            except RequestsConnectionError:
+                results.append("connection")
+        return results
+
+    first = outcomes(7)
+    assert first == outcomes(7) and {200, 503, "connection"} <= set(first)
+    fixture = next(os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names)
+    assert json.load(open(fixture))["response"]["status"] == 200
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
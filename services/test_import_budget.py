@@ -0,0 +1,64 @@
+"""
+Test Import-Time Budget (cold start of api_wrapper actions)
+Fails if canon_update or generate_document start importing heavy
+dependencies or exceed their import-time budget (see import_report.py).
+"""
+import json
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from import_report import HEAVY_MODULES, SERVICES_DIR, action_report
+
+
+def _modules_after_dispatch(request: dict, cache_dir) -> set:
+    """Runs one request in a fresh interpreter and returns the top-level modules loaded."""
+    script = (
+        "import json, sys, api_wrapper; "
+        f"api_wrapper.dispatch(json.loads({json.dumps(json.dumps(request))})); "
+        "print(json.dumps(sorted({m.split('.')[0] for m in sys.modules})))"
+    )
+    env = dict(os.environ, RESULT_CACHE_DIR=str(cache_dir))
+    proc = subprocess.run([sys.executable, "-c", script], cwd=SERVICES_DIR,
+                          capture_output=True, text=True, env=env)
+    assert proc.returncode == 0, proc.stderr
+    return set(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+
+def test_canon_update_import_budget():
+    report = action_report("canon_update")
+    assert not report["heavy_loaded"], f"Heavy modules on cold path: {report['heavy_loaded']}"
+    assert report["total_ms"] <= report["budget_ms"], \
+        f"canon_update imports take {report['total_ms']} ms (budget {report['budget_ms']} ms)"
+
+
+def test_generate_document_import_budget():
+    report = action_report("generate_document")
+    assert not report["heavy_loaded"], f"Heavy modules on cold path: {report['heavy_loaded']}"
+    assert report["total_ms"] <= report["budget_ms"], \
+        f"generate_document imports take {report['total_ms']} ms (budget {report['budget_ms']} ms)"
+
+
+def test_audit_modules_defer_heavy_imports():
+    # Importing the auditors must not pull pandas/pvlib until an audit runs
+    for action in ("energy_audit", "deep_audit", "portfolio_audit", "screening", "uncertainty_audit",
+                   "solar_orientation", "repowering", "streaming_audit"):
+        report = action_report(action)
+        assert not report["heavy_loaded"], f"{action} imports {report['heavy_loaded']} at load time"
+
+
+def test_canon_update_runs_without_heavy_modules(tmp_path):
+    loaded = _modules_after_dispatch({
+        "action": "canon_update",
+        "no_cache": True,
+        "data": {"current_canon": "1000", "old_date": "2023-01-01", "new_date": "2024-01-01"}
+    }, tmp_path)
+    heavy = sorted(m for m in HEAVY_MODULES if m in loaded)
+    assert not heavy, f"canon_update loaded {heavy}"
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,98 @@
+"""
+Test Job Queue (submit/status, recovery of orphaned jobs, jobs through dispatch)
+"""
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import api_wrapper
+import job_queue
+import metrics
+from job_queue import JobQueue, JobStore, format_job
+from result_cache import ResultCache
+
+
+def _wait(store, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return format_job(job)
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _running(store, worker_pid, worker_token="other", started_at=None):
+    job_id = store.create("deep_audit", {})
+    with store._connect() as conn:
+        conn.execute("update jobs set status = 'running', started_at = ?, worker_pid = ?, worker_token = ? "
+                     "where id = ?", (started_at or time.time(), worker_pid, worker_token, job_id))
+    return job_id
+
+
+def test_submit_and_status(tmp_path):
+    def runner(action, data, progress):
+        progress("halfway", 0.5)
+        if data.get("fail"):
+            return {"error": "bad input"}
+        return {"echo": data["n"]}
+
+    queue = JobQueue(runner, store=JobStore(str(tmp_path / "jobs.sqlite3")), workers=1)
+    try:
+        ok = _wait(queue.store, queue.submit("deep_audit", {"n": 7}))
+        failed = _wait(queue.store, queue.submit("deep_audit", {"fail": True}))
+    finally:
+        queue.shutdown()
+
+    assert ok["status"] == "done" and ok["result"] == {"echo": 7} and ok["progress"]["fraction"] == 1
+    assert [s["stage"] for s in ok["progress"]["stages"]] == ["halfway"]
+    assert failed["status"] == "failed" and failed["error"] == "bad input"
+
+
+def test_restart_fails_orphaned_jobs_and_requeues_queued_ones(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    finished = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                              capture_output=True, text=True)
+    dead = _running(store, int(finished.stdout))                      # worker process gone
+    restarted = _running(store, os.getpid())                          # our PID, earlier process (PID 1 restarts)
+    stale = _running(store, os.getppid(), started_at=time.time() - job_queue.STALE_JOB_SECONDS - 1)
+    alive = _running(store, os.getppid())                             # detached runner still working
+    own = _running(store, os.getpid(), worker_token=job_queue.WORKER_TOKEN)
+    queued = store.create("deep_audit", {"n": 1})
+
+    queue = JobQueue(lambda action, data, progress: {"echo": data["n"]}, store=store, workers=1)
+    try:
+        assert _wait(store, queued)["status"] == "done"
+    finally:
+        queue.shutdown()
+    for job_id in (dead, restarted, stale):
+        assert store.get(job_id)["status"] == "failed" and "Interrupted" in store.get(job_id)["error"]
+    assert store.get(alive)["status"] == "running" and store.get(own)["status"] == "running"
+
+
+def test_progress_jobs_go_through_cache_and_metrics(monkeypatch, tmp_path):
+    calls = []
+
+    def handle_probe(data, progress=None):
+        calls.append(data)
+        progress("probed", 0.5)
+        return {"probe": data["n"]}
+    monkeypatch.setitem(api_wrapper.ACTIONS, "probe", handle_probe)
+    monkeypatch.setitem(api_wrapper.PROGRESS_ACTIONS, "probe", handle_probe)
+    monkeypatch.setitem(api_wrapper._instances, "result_cache", ResultCache(cache_dir=str(tmp_path)))
+    monkeypatch.setattr("result_cache.TTL_POLICIES", {"probe": lambda data: 60})
+
+    stages = []
+    for _ in range(2):
+        result = api_wrapper.run_job_action("probe", {"n": 3}, lambda stage, fraction: stages.append(stage))
+        assert result == {"probe": 3}
+    assert len(calls) == 1 and stages == ["probed"]  # second run is a cache hit
+    assert 'action="probe"' in metrics.REGISTRY.render_prometheus()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,112 @@
+"""
+Test Meteo Cache (incremental range fill, no network)
+A fake fetcher stands in for Open-Meteo and counts the requested spans.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from meteo_cache import MeteoCache
+
+
+class FakeArchive:
+    """Deterministic hourly values (hours since epoch) + a log of requested spans."""
+
+    def __init__(self):
+        self.calls = []
+
+    def multi(self, locations, start_date, end_date, variables):
+        return [self(lat, lon, start_date, end_date, variables) for lat, lon in locations]
+
+    def __call__(self, lat, lon, start_date, end_date, variables):
+        self.calls.append((start_date, end_date, tuple(variables)))
+        hours = np.arange(np.datetime64(start_date, "h"),
+                          np.datetime64(end_date, "D") + np.timedelta64(1, "D"), dtype="datetime64[h]")
+        base = hours.astype(np.int64).astype(np.float32) % 1000
+        return hours, {v: base + i for i, v in enumerate(variables)}
+
+
+def _cache(tmp_path):
+    archive = FakeArchive()
+    return MeteoCache(cache_dir=str(tmp_path), fetcher=archive, multi_fetcher=archive.multi), archive
+
+
+def test_overlapping_ranges_only_fetch_missing_dates(tmp_path):
+    cache, archive = _cache(tmp_path)
+    cache.get_frame(42.5, -7.8, "2023-03-01", "2023-03-31", ["wind_speed_100m"])
+    assert len(archive.calls) == 1
+
+    # Same park, overlapping period: only April is fetched
+    df = cache.get_frame(42.5, -7.8, "2023-03-15", "2023-04-30", ["wind_speed_100m"])
+    assert len(archive.calls) == 2
+    assert archive.calls[1][0] >= "2023-03-31" and archive.calls[1][1] == "2023-04-30"
+    assert not df["wind_speed_100m"].isna().any()
+
+    # Fully covered: zero fetches
+    cache.get_frame(42.5, -7.8, "2023-03-10", "2023-04-20", ["wind_speed_100m"])
+    assert len(archive.calls) == 2
+
+
+def test_nearby_coordinates_share_entry_and_new_variable_is_fetched(tmp_path):
+    cache, archive = _cache(tmp_path)
+    cache.get_frame(42.5, -7.8, "2023-01-02", "2023-01-10", ["wind_speed_100m"])
+    cache.get_frame(42.52, -7.79, "2023-01-02", "2023-01-10", ["wind_speed_100m"])
+    assert len(archive.calls) == 1
+    cache.get_frame(42.5, -7.8, "2023-01-02", "2023-01-10", ["wind_speed_100m", "temperature_2m"])
+    assert len(archive.calls) == 2
+
+
+def test_values_survive_across_years_and_dst(tmp_path):
+    cache, archive = _cache(tmp_path)
+    df = cache.get_frame(42.5, -7.8, "2022-12-30", "2023-12-31", ["wind_speed_100m"])
+    assert df.index.is_unique
+    # 2023 local: spring-forward hour missing, fall-back repeat dropped (24 labels that day)
+    assert len(df) == (2 + 365) * 24 - 1
+
+    fresh = MeteoCache(cache_dir=cache.cache_dir, fetcher=FakeArchive())
+    again = fresh.get_frame(42.5, -7.8, "2023-06-01", "2023-06-02", ["wind_speed_100m"])
+    assert not fresh.fetcher.calls
+    assert np.allclose(again["wind_speed_100m"], df.loc["2023-06-01":"2023-06-02", "wind_speed_100m"])
+
+
+def test_prefetch_fills_distinct_cells_with_shared_requests(tmp_path):
+    cache, archive = _cache(tmp_path)
+    parks = [(42.51, -7.81), (42.53, -7.78), (43.02, -8.11)]
+    cache.get_frame(43.02, -8.11, "2023-06-01", "2023-06-10", ["wind_speed_100m"])
+    calls = len(archive.calls)
+
+    summary = cache.prefetch(parks, "2023-06-01", "2023-06-30", ["wind_speed_100m"])
+    # 2 grid cells, each missing different dates: one request per group
+    assert summary["cells"] == 2 and summary["requests"] == 2
+    assert len(archive.calls) == calls + 2
+    for lat, lon in parks:
+        cache.get_frame(lat, lon, "2023-06-01", "2023-06-30", ["wind_speed_100m"])
+    assert len(archive.calls) == calls + 2
+
+
+def test_multi_year_range_is_fetched_by_year_and_gaps_are_reported(tmp_path):
+    cache, archive = _cache(tmp_path)
+    df = cache.get_frame(42.5, -7.8, "2020-01-02", "2022-12-30", ["wind_speed_100m"])
+    assert sorted(call[:2] for call in archive.calls) == [
+        ("2020-01-01", "2020-12-31"), ("2021-01-01", "2021-12-31"), ("2022-01-01", "2022-12-30")]
+    assert df.attrs["gaps"]["missing_hours"] == 0
+
+    # A failing year doesn't lose the others; its hours come back as a gap
+    def flaky(lat, lon, start_date, end_date, variables):
+        if start_date.startswith("2019"):
+            raise ConnectionError("timeout")
+        return archive(lat, lon, start_date, end_date, variables)
+
+    cache.fetcher = flaky
+    df = cache.get_frame(42.5, -7.8, "2019-06-01", "2023-01-15", ["wind_speed_100m"])
+    gaps = df.attrs["gaps"]
+    assert gaps["gap_count"] == 1 and gaps["gaps"][0]["start"] == "2019-06-01T00:00"
+    assert not df.loc["2020-01-02":, "wind_speed_100m"].isna().any()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
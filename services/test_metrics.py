@@ -0,0 +1,139 @@
+"""
+Test Metrics (histogram rendering, HTTP vs compute split, worker-thread attribution, cache counters)
+Outbound calls go to the local scripted server, labelled as their own upstream.
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import api_wrapper
+import metrics
+from http_client import HTTPClient
+from range_planner import map_parallel, run_parallel
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A fresh global registry, and the local server host labelled as the "local" upstream."""
+    registry = metrics.MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    monkeypatch.setitem(metrics.UPSTREAMS, "127.0.0.1", "local")
+    return registry
+
+
+def _samples(text: str) -> dict:
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def test_upstream_labels():
+    assert metrics.upstream_for_url("https://archive-api.open-meteo.com/v1/archive?x=1") == "open_meteo"
+    assert metrics.upstream_for_url("https://api.esios.ree.es/indicators/1001") == "esios"
+    assert metrics.upstream_for_url("https://example.org/a") == "example.org"
+    assert metrics.upstream_for_url("not a url") == "unknown"
+
+
+def test_histogram_and_counter_rendering():
+    registry = metrics.MetricsRegistry()
+    for value in (0.003, 0.2, 0.25, 7.0, 500.0):
+        registry.observe("socm_test_seconds", value, "Test durations", action="a")
+    registry.inc("socm_test_total", 2, "Test counter", action="a", status="ok")
+    registry.inc("socm_test_total", 1, "Test counter", action="a", status="ok")
+    text = registry.render_prometheus()
+
+    assert "# HELP socm_test_seconds Test durations\n# TYPE socm_test_seconds histogram" in text
+    assert "# TYPE socm_test_total counter" in text
+    samples = _samples(text)
+    # Cumulative buckets, bounds inclusive (le), +Inf equal to _count
+    assert samples['socm_test_seconds_bucket{action="a",le="0.005"}'] == 1
+    assert samples['socm_test_seconds_bucket{action="a",le="0.1"}'] == 1
+    assert samples['socm_test_seconds_bucket{action="a",le="0.25"}'] == 3
+    assert samples['socm_test_seconds_bucket{action="a",le="5.0"}'] == 3
+    assert samples['socm_test_seconds_bucket{action="a",le="10.0"}'] == 4
+    assert samples['socm_test_seconds_bucket{action="a",le="120.0"}'] == 4
+    assert samples['socm_test_seconds_bucket{action="a",le="+Inf"}'] == 5
+    assert samples['socm_test_seconds_count{action="a"}'] == 5
+    assert samples['socm_test_seconds_sum{action="a"}'] == pytest.approx(507.453)
+    assert samples['socm_test_total{action="a",status="ok"}'] == 3
+
+
+def test_http_time_is_split_by_upstream_and_compute_is_the_rest(http_server, registry):
+    http_server.routes["/prices"] = [(200, {"ok": True})]
+    client = HTTPClient(retries=0)
+    with metrics.track_action("probe") as timings:
+        client.get(http_server.url + "/prices")
+        client.get(http_server.url + "/prices")
+        metrics.record_http("https://api.esios.ree.es/indicators/1001", 0.01)
+        time.sleep(0.05)
+
+    breakdown = timings.as_dict()
+    assert set(breakdown["http_ms"]) == {"local", "esios"} and breakdown["http_calls"] == 3
+    assert breakdown["http_ms"]["esios"] == 10.0
+    assert breakdown["compute_ms"] == pytest.approx(breakdown["wall_ms"] - sum(breakdown["http_ms"].values()), abs=0.02)
+    assert timings.compute_seconds >= 0.04
+
+    samples = _samples(registry.render_prometheus())
+    assert samples['socm_http_request_duration_seconds_count{upstream="local"}'] == 2
+    assert samples['socm_http_request_duration_seconds_count{upstream="esios"}'] == 1
+    assert samples['socm_action_requests_total{action="probe",status="ok"}'] == 1
+    assert samples['socm_action_http_seconds_sum{action="probe"}'] == pytest.approx(timings.total_http_seconds, abs=1e-6)
+    assert samples['socm_action_compute_seconds_sum{action="probe"}'] == pytest.approx(timings.compute_seconds, abs=1e-6)
+
+
+def test_calls_on_worker_threads_are_attributed_to_the_action(http_server, registry):
+    http_server.routes["/meteo"] = [(200, {"ok": True})]
+    client = HTTPClient(retries=0)
+    fetch = lambda *_: client.get(http_server.url + "/meteo").status_code
+    with metrics.track_action("probe") as timings:
+        assert run_parallel(fetch, fetch) == [200, 200]
+        assert map_parallel(fetch, [1, 2, 3], max_workers=3) == [200] * 3
+        # A bare thread doesn't copy the context: counted globally, not for the action
+        outside = threading.Thread(target=fetch)
+        outside.start()
+        outside.join()
+
+    assert timings.http_calls == 5
+    assert _samples(registry.render_prometheus())['socm_http_request_duration_seconds_count{upstream="local"}'] == 6
+    assert metrics.current_timings() is None
+
+
+def test_dispatch_counts_cache_hits_and_attaches_timings(http_server, registry, monkeypatch, tmp_path):
+    http_server.routes["/prices"] = [(200, {"ok": True})]
+    client = HTTPClient(retries=0)
+
+    def handle_probe(data):
+        if data.get("fail"):
+            return {"error": "no data"}
+        client.get(http_server.url + "/prices")
+        return {"probe": data["n"]}
+    monkeypatch.setitem(api_wrapper.ACTIONS, "probe", handle_probe)
+    monkeypatch.setitem(api_wrapper._instances, "result_cache", ResultCache(cache_dir=str(tmp_path)))
+    monkeypatch.setattr("result_cache.TTL_POLICIES", {"probe": lambda data: 60})
+
+    first = api_wrapper.dispatch({"action": "probe", "data": {"n": 1}, "timings": True})
+    second = api_wrapper.dispatch({"action": "probe", "data": {"n": 1}, "timings": True})
+    plain = api_wrapper.dispatch({"action": "probe", "data": {"n": 2}})
+    failed = api_wrapper.dispatch({"action": "probe", "data": {"fail": True}, "no_cache": True})
+
+    assert first["probe"] == 1 and first["_timings"]["cache"] == "miss"
+    assert first["_timings"]["http_calls"] == 1 and "local" in first["_timings"]["http_ms"]
+    assert second["_timings"]["cache"] == "hit" and second["_timings"]["http_calls"] == 0
+    assert plain == {"probe": 2} and failed == {"error": "no data"}
+
+    samples = _samples(registry.render_prometheus())
+    assert samples['socm_cache_requests_total{action="probe",result="miss"}'] == 2
+    assert samples['socm_cache_requests_total{action="probe",result="hit"}'] == 1
+    assert samples['socm_cache_requests_total{action="probe",result="bypass"}'] == 1
+    assert samples['socm_action_requests_total{action="probe",status="ok"}'] == 3
+    assert samples['socm_action_requests_total{action="probe",status="error"}'] == 1
+    assert samples['socm_action_duration_seconds_count{action="probe"}'] == 4
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
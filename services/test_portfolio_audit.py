@@ -0,0 +1,69 @@
+"""
+Test Portfolio Audit (shared prices, one meteo fetch per location, no network)
+SyntheticWeather (conftest.py) stands in for Open-Meteo; prices come from the mock.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from portfolio_audit import PortfolioAuditor
+
+PARKS = [
+    {"id": "norte-1", "type": "wind", "lat": 42.5, "lon": -7.8, "turbine_model": "Vestas V90 3MW",
+     "num_turbines": 4, "company_payment": 20000},
+    {"id": "norte-2", "type": "wind", "lat": 42.5001, "lon": -7.8001, "turbine_model": "Gamesa G90 2MW",
+     "num_turbines": 2, "company_payment": 15000},
+    {"id": "sur", "type": "solar", "lat": 42.3, "lon": -7.9, "peak_power_kwp": 2000, "company_payment": 8000},
+    {"id": "roto", "type": "wind", "lat": 42.3, "lon": -7.9, "company_payment": 1000},
+]
+
+
+def test_portfolio_shares_meteo_and_aggregates(synthetic_weather, offline_prices):
+    archive = synthetic_weather
+    stages = []
+    result = PortfolioAuditor().run({"start_date": "2023-05-01", "end_date": "2023-05-07", "parks": PARKS},
+                                    progress=lambda stage, fraction: stages.append(stage))
+
+    # Both "norte" parks sit in the same grid cells; each grid's cells come in one request
+    # (ERA5-Land for most variables, ERA5 for the 100 m wind)
+    assert result["summary"]["meteo_locations"] == 2
+    assert archive.locations == {(42.5, -7.8), (42.5, -7.75), (42.3, -7.9), (42.25, -8.0)}
+    assert archive.requests == 2
+    assert [p["status"] for p in result["parks"]] == ["ok", "ok", "ok", "error"]
+    assert result["parks"][3]["error"] == "Missing fields: turbine_model, num_turbines"
+
+    summary = result["summary"]
+    ok = result["parks"][:3]
+    assert summary["failed"] == 1 and summary["total"]["parks"] == 3
+    assert np.isclose(summary["total"]["estimated_revenue_eur"], sum(p["estimated_revenue_eur"] for p in ok))
+    assert summary["total"]["company_payment_eur"] == 43000
+    assert summary["by_type"]["solar"]["parks"] == 1 and summary["by_type"]["wind"]["parks"] == 2
+    assert stages == ["data_fetched", "parks_done"]
+
+
+def test_malformed_parks_are_reported_and_the_rest_still_run(synthetic_weather, offline_prices):
+    good = PARKS[0]
+    bad = [dict(good, id="payment", company_payment="abc"), dict(good, id="lat", lat="abc"),
+           dict(good, id="turbines", num_turbines=[3]), dict(good, id="half", num_turbines=2.5),
+           dict(PARKS[2], id="solar", peak_power_kwp=-1, lon=float("nan")),
+           dict(good, id="layout", turbines="abc")]
+    result = PortfolioAuditor().run({"start_date": "2023-05-01", "end_date": "2023-05-02",
+                                     "parks": [good] + bad})
+
+    statuses = {p["id"]: (p["status"], p.get("error")) for p in result["parks"]}
+    assert statuses["norte-1"] == ("ok", None)
+    assert statuses["payment"] == ("error", "Invalid fields: company_payment")
+    assert statuses["lat"] == ("error", "Invalid fields: lat")
+    assert statuses["turbines"] == ("error", "Invalid fields: num_turbines")
+    assert statuses["half"] == ("error", "Invalid fields: num_turbines")
+    assert statuses["solar"] == ("error", "Invalid fields: lon, peak_power_kwp")
+    assert statuses["layout"] == ("error", "Invalid fields: turbines")
+    assert result["summary"]["failed"] == len(bad) and result["summary"]["total"]["parks"] == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
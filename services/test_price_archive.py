@@ -0,0 +1,101 @@
+"""
+Test Price Archive (incremental sync, mock fallback, no network)
+A fake fetcher stands in for ESIOS.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from price_archive import PriceArchive, mock_prices
+
+
+class FakeESIOS:
+    """Hourly prices (or quarter-hourly from October 2025) + a log of requested chunks."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, token, indicator, geo_id, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        step = np.timedelta64(15 if start_date >= "2025-10-01" else 60, "m")
+        times = np.arange(np.datetime64(start_date, "m"),
+                          np.datetime64(end_date, "D") + np.timedelta64(1, "D"), step)
+        return times, (times.astype(np.int64) % 97).astype(np.float32)
+
+
+def _archive(tmp_path):
+    esios = FakeESIOS()
+    return PriceArchive(archive_dir=str(tmp_path), fetcher=esios), esios
+
+
+def test_sync_fetches_only_missing_days(tmp_path):
+    archive, esios = _archive(tmp_path)
+    archive.sync("token", "2024-01-01", "2024-02-29")
+    assert esios.calls == [("2024-01-01", "2024-01-31"), ("2024-02-01", "2024-02-29")]
+
+    archive.sync("token", "2024-02-01", "2024-03-10")
+    assert esios.calls[2:] == [("2024-03-01", "2024-03-10")]
+
+    prices, real_share = archive.local_series("2024-01-15", "2024-03-01", token="token")
+    assert real_share == 1.0 and len(esios.calls) == 3
+    assert not prices.isna().any() and prices.index.is_unique
+
+
+def test_missing_hours_get_deterministic_mock(tmp_path):
+    archive, esios = _archive(tmp_path)
+    first, real_share = archive.local_series("2023-06-01", "2023-06-03")
+    again, _ = archive.local_series("2023-06-02", "2023-06-03")
+    assert real_share == 0.0 and not esios.calls
+    assert (first.loc["2023-06-02":] == again).all()
+
+    hours = np.arange(np.datetime64("2023-06-01T00"), np.datetime64("2023-06-02T00"))
+    assert np.array_equal(mock_prices(hours), mock_prices(hours))
+
+    # Any slice of a period gets the same prices, across the turn of the year too
+    period = np.arange(np.datetime64("2022-12-30T00"), np.datetime64("2023-01-03T00"))
+    assert np.array_equal(mock_prices(period)[30:70], mock_prices(period[30:70]))
+
+
+def test_quarter_hourly_prices_and_hourly_mean(tmp_path):
+    archive, esios = _archive(tmp_path)
+    archive.sync("token", "2025-09-30", "2025-10-01")
+    quarters = archive.quarter_hourly("2025-10-01T00", "2025-10-01T00")
+    hourly = archive.hourly("2025-10-01T00", "2025-10-01T00")
+    assert len(quarters) == 4 and len(set(quarters.tolist())) == 4
+    assert np.isclose(hourly[0], quarters.mean())
+    # Hourly-only period: the hourly price repeated
+    september = archive.quarter_hourly("2025-09-30T12", "2025-09-30T12")
+    assert len(set(september.tolist())) == 1
+
+
+def test_sync_reports_failed_months_and_keeps_the_rest(tmp_path):
+    archive, esios = _archive(tmp_path)
+
+    def flaky(token, indicator, geo_id, start_date, end_date):
+        if start_date.startswith("2024-02"):
+            raise ConnectionError("timeout")
+        return esios(token, indicator, geo_id, start_date, end_date)
+
+    archive.fetcher = flaky
+    summary = archive.sync("token", "2024-01-01", "2024-03-31")
+    assert summary["requests"] == 3
+    assert [f["start"] for f in summary["failed"]] == ["2024-02-01"]
+    assert archive.missing_days("2024-01-01", "2024-03-31") == [("2024-02-01", "2024-02-29")]
+
+
+def test_legacy_price_dict_matches_the_local_series(offline_prices):
+    from energy_audit_advanced import AdvancedEnergyAuditor
+
+    # Covers the end of DST (2023-10-29 has 25 UTC hours, 24 local labels)
+    prices = AdvancedEnergyAuditor().get_esios_hourly_prices("2023-10-28", "2023-10-30")
+    series, _ = offline_prices.local_series("2023-10-28", "2023-10-30")
+    assert len(prices) == 3 * 24 and list(prices) == list(series.index.strftime("%Y-%m-%dT%H:%M:%S"))
+    assert np.allclose(list(prices.values()), series.to_numpy(), atol=0.005)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
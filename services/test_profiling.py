@@ -0,0 +1,41 @@
+"""
+Test On-demand Profiling (collapsed-stack output stays in the profile directory)
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import api_wrapper
+import profiling
+from profiling import run_profiled
+
+
+def test_sample_output_is_a_file_name_under_the_profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "DEFAULT_PROFILE_DIR", str(tmp_path / "profiles"))
+    result, report = run_profiled(lambda: sum(range(100_000)), {"mode": "sample", "interval_ms": 1,
+                                                                "output": "audit.collapsed"})
+    assert result == sum(range(100_000))
+    assert report["collapsed_stack_file"] == str(tmp_path / "profiles" / "audit.collapsed")
+    assert os.path.exists(report["collapsed_stack_file"])
+
+
+@pytest.mark.parametrize("output", ["/tmp/owned.collapsed", "../owned.collapsed", "..", "sub/dir.collapsed",
+                                    "..\\owned.collapsed", "C:\\owned.collapsed"])
+def test_paths_and_traversal_are_rejected(tmp_path, monkeypatch, output):
+    monkeypatch.setattr(profiling, "DEFAULT_PROFILE_DIR", str(tmp_path / "profiles"))
+    calls = []
+    with pytest.raises(ValueError):
+        run_profiled(lambda: calls.append(1), {"mode": "sample", "output": output})
+    assert not calls and not os.path.exists(tmp_path / "profiles")
+
+    # Through dispatch the request fails as a structured error, before the handler runs
+    result = api_wrapper.dispatch({"action": "metrics", "data": {},
+                                   "profile": {"mode": "sample", "output": output}})
+    assert "Invalid profile output name" in result["error"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
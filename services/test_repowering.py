@@ -0,0 +1,59 @@
+"""
+Test Repowering comparison (all options on one meteo series, canon per option)
+SyntheticMeteo (conftest.py) replaces Open-Meteo; prices come from the mock.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from energy_audit_deep_research import DeepResearchAuditor
+from repowering import RepoweringComparator
+
+PERIOD = {"lat": 42.5, "lon": -7.8, "start_date": "2023-01-01", "end_date": "2023-03-31"}
+
+
+def test_options_match_single_park_audits_and_carry_the_canon(synthetic_meteo, offline_prices):
+    options = [{"turbine_model": "Vestas V90 3MW", "num_turbines": 12},
+               {"turbine_model": "Vestas V162 6MW", "num_turbines": [4, 6], "hub_height": [125, 149]}]
+    stages = []
+    result = RepoweringComparator().run(dict(PERIOD, options=options),
+                                        progress=lambda stage, fraction: stages.append(stage))
+
+    rows = result["options"]
+    assert len(synthetic_meteo.calls) == 1 and len(rows) == 5
+    assert [(r["num_turbines"], r["hub_height"]) for r in rows[1:]] == [(4, 125), (4, 149), (6, 125), (6, 149)]
+    assert stages == ["data_fetched", "options_done"]
+
+    # Same numbers as the deep audit of each park
+    auditor = DeepResearchAuditor()
+    prices = auditor.get_prices(PERIOD["start_date"], PERIOD["end_date"])
+    meteo = synthetic_meteo.frame(PERIOD["start_date"], PERIOD["end_date"])
+    for row in (rows[0], rows[2]):
+        park = dict(PERIOD, type="wind", turbine_model=row["turbine_model"], num_turbines=row["num_turbines"])
+        audit = auditor.price_production(auditor.simulate_park(park, meteo), prices)
+        assert np.isclose(row["production_mwh"], audit["production_mwh"], atol=0.01)
+        assert np.isclose(row["revenue_eur"], audit["revenue_eur"], atol=0.01)
+
+    # Canon brackets by tip height, prorated to 90 days
+    assert rows[0]["tip_height"] == 150 and rows[2]["tip_height"] == 230
+    assert rows[0]["canon_eur"] == round(5000 * 12 * 90 / 365, 2)
+    assert rows[1]["canon_per_unit_eur"] == 5000
+    assert rows[0]["vs_baseline"] == {"production_mwh": 0, "revenue_eur": 0, "canon_eur": 0}
+    assert rows[2]["revenue_eur"] > rows[1]["revenue_eur"]  # taller tower, more wind
+    assert result["best_revenue"] == 4
+
+
+def test_invalid_options(synthetic_meteo, offline_prices):
+    comparator = RepoweringComparator()
+    assert comparator.run(dict(PERIOD, options=[])) == {"error": "options must be a non-empty list of repowering options"}
+    assert "Unknown turbine" in comparator.run(dict(PERIOD, options=[{"turbine_model": "X", "num_turbines": 1}]))["error"]
+    invalid = comparator.run(dict(PERIOD, options=[{"turbine_model": "Vestas V90 3MW", "num_turbines": 0}]))
+    assert invalid == {"error": "Invalid option: Vestas V90 3MW, 0 turbines at 105.0 m"}
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,83 @@
+"""
+Test Result Cache (TTL choice per period and result, key contents)
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from meteo_cache import ARCHIVE_FINAL_DAYS
+from result_cache import (CANON_UPDATE_TTL, CLOSED_PERIOD_TTL, LIVE_PERIOD_TTL, ResultCache,
+                          is_degraded)
+
+CLEAN = {"production_mwh": 1200.0, "data_gaps": {"missing_hours": 0, "gap_count": 0, "gaps": []}}
+
+
+def _days_ago(days: int) -> str:
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+def test_closed_period_waits_for_the_final_archive(tmp_path, monkeypatch):
+    monkeypatch.setenv("ESIOS_TOKEN", "token")
+    cache = ResultCache(cache_dir=str(tmp_path))
+    audit = lambda end: cache.ttl_for("deep_audit", {"start_date": "2020-01-01", "end_date": end}, CLEAN)
+
+    assert audit(_days_ago(1)) == LIVE_PERIOD_TTL                       # meteo still provisional
+    assert audit(_days_ago(ARCHIVE_FINAL_DAYS)) == LIVE_PERIOD_TTL
+    assert audit(_days_ago(ARCHIVE_FINAL_DAYS + 1)) == CLOSED_PERIOD_TTL
+    assert cache.ttl_for("energy_audit", {"year": date.today().year}) == LIVE_PERIOD_TTL
+    assert cache.ttl_for("energy_audit", {"year": 2020}) == CLOSED_PERIOD_TTL
+    assert cache.ttl_for("canon_update", {}) == CANON_UPDATE_TTL
+    assert cache.ttl_for("screening", {"year": 2020}) is None
+
+
+def test_degraded_results_only_get_the_live_ttl(tmp_path, monkeypatch):
+    monkeypatch.setenv("ESIOS_TOKEN", "token")
+    cache = ResultCache(cache_dir=str(tmp_path))
+    data = {"start_date": "2020-01-01", "end_date": "2020-12-31"}
+    degraded = [
+        {"data_gaps": {"missing_hours": 24, "gap_count": 1, "gaps": []}},
+        {"failed_chunks": [{"start": "2020-03-01", "end": "2020-03-31"}]},
+        {"hour_coverage": {"hours": 8784, "matched": 8000, "imputed": 784, "missing": 0}},
+        {"parks": [CLEAN, {"data_gaps": {"missing_hours": 5}}]},
+    ]
+    for result in degraded:
+        assert is_degraded(result) and cache.ttl_for("deep_audit", data, result) == LIVE_PERIOD_TTL
+    assert not is_degraded(CLEAN) and cache.ttl_for("deep_audit", data, CLEAN) == CLOSED_PERIOD_TTL
+
+    # Without a token every audit is priced (at least partly) with the mock
+    monkeypatch.delenv("ESIOS_TOKEN")
+    assert cache.ttl_for("deep_audit", data, CLEAN) == LIVE_PERIOD_TTL
+    assert cache.ttl_for("canon_update", {}) == CANON_UPDATE_TTL
+
+
+def test_key_normalizes_data_and_includes_the_price_source(tmp_path, monkeypatch):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    monkeypatch.delenv("ESIOS_TOKEN", raising=False)
+    mock_key = cache.make_key("deep_audit", {"lat": "42.5", "lon": -7.8, "note": None})
+    assert mock_key == cache.make_key("deep_audit", {"lon": -7.8, "lat": 42.5})
+    canon_key = cache.make_key("canon_update", {"current_canon": 1000})
+
+    monkeypatch.setenv("ESIOS_TOKEN", "token")
+    assert cache.make_key("deep_audit", {"lat": 42.5, "lon": -7.8}) != mock_key
+    assert cache.make_key("canon_update", {"current_canon": 1000}) == canon_key
+    assert ResultCache(cache_dir=str(tmp_path), version="other").make_key("canon_update", {"current_canon": 1000}) != canon_key
+
+
+def test_mock_priced_result_is_not_served_once_a_token_is_set(tmp_path, monkeypatch):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    data = {"start_date": "2020-01-01", "end_date": "2020-12-31"}
+    monkeypatch.delenv("ESIOS_TOKEN", raising=False)
+    assert cache.get_or_compute("deep_audit", data, lambda: {"prices": "mock"}) == ({"prices": "mock"}, "miss")
+    assert cache.get_or_compute("deep_audit", data, lambda: {"prices": "new"}) == ({"prices": "mock"}, "hit")
+
+    monkeypatch.setenv("ESIOS_TOKEN", "token")
+    assert cache.get_or_compute("deep_audit", data, lambda: {"prices": "esios"}) == ({"prices": "esios"}, "miss")
+    assert cache.get_or_compute("deep_audit", data, lambda: {"error": "x"}) == ({"prices": "esios"}, "hit")
+    assert cache.get_or_compute("deep_audit", data, lambda: {"error": "x"}, bypass=True) == ({"error": "x"}, "bypass")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,64 @@
+"""
+Test Regional Screening (polygon grid and parcels, no network)
+Synthetic weather stands in for Open-Meteo; prices come from the mock.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from screening import RegionalScreener, grid_sites, polygon_ring
+
+POLYGON = {"type": "Polygon", "coordinates": [[[-7.9, 42.3], [-7.6, 42.3], [-7.6, 42.5], [-7.9, 42.5], [-7.9, 42.3]]]}
+
+
+def test_grid_keeps_only_cells_inside_polygon():
+    triangle = polygon_ring([[0, 0], [1, 0], [0, 1]])
+    grid = grid_sites(triangle, 0.1)
+    # Centers strictly below the diagonal x + y = 1
+    assert len(grid["lats"]) == 45 and ((grid["lats"] + grid["lons"]) < 1).all()
+
+
+def test_polygon_screening_runs_once_per_meteo_cell(synthetic_weather, offline_prices):
+    archive = synthetic_weather
+    result = RegionalScreener(block=4).run({"polygon": POLYGON, "resolution_deg": 0.05, "year": 2023})
+
+    summary = result["summary"]
+    # 0.1° cells (3 rows x 4 cols), none straddling two 0.25° cells of the 100 m wind
+    assert summary["sites"] == 24 and summary["meteo_cells"] == 12
+    assert len(archive.locations) == 12 + 6
+    # One multi-location request per grid and UTC year touched (2022-12-31 + 2023)
+    assert archive.requests == 4
+    properties = [f["properties"] for f in result["features"]]
+    assert all(p["wind_mwh"] > 0 and p["solar_mwh"] > 0 for p in properties)
+    assert all(0 < p["solar_capacity_factor"] < 0.4 for p in properties)
+    assert result["features"][0]["geometry"]["type"] == "Polygon"
+
+    raster = RegionalScreener().run({"polygon": POLYGON, "resolution_deg": 0.05, "year": 2023,
+                                     "technology": "wind", "output": "raster"})
+    assert raster["shape"] == [4, 6] and "solar_mwh" not in raster["layers"]
+    assert archive.requests == 4
+
+
+def test_parcels_are_points_and_bad_ones_are_reported(synthetic_weather, offline_prices):
+    result = RegionalScreener().run({"technology": "solar", "year": 2023, "parcels": [
+        {"id": "A", "lat": 42.41, "lon": -7.81}, {"id": "B", "lat": 42.42, "lon": -7.79}, {"id": "C"}]})
+    a, b = (f["properties"] for f in result["features"])
+    assert result["features"][0]["geometry"]["type"] == "Point"
+    # Same meteo cell: same weather, almost the same sun
+    assert np.isclose(a["solar_mwh"], b["solar_mwh"], rtol=1e-3)
+    assert result["errors"] == [{"id": "C", "error": "Missing lat/lon or rc"}]
+
+
+def test_invalid_resolution_is_rejected(synthetic_weather, offline_prices):
+    for resolution in (0, -0.1, "fine", None, float("inf")):
+        result = RegionalScreener().run({"polygon": POLYGON, "resolution_deg": resolution, "year": 2023})
+        assert result == {"error": "resolution_deg must be a positive number"}, resolution
+    assert synthetic_weather.requests == 0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,83 @@
+"""
+Test Solar Orientation (tilt x azimuth x tracker grid, ranked by revenue)
+Clear-sky-like meteo built from the sun position; prices come from the mock.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sun_cache
+from energy_audit_deep_research import DeepResearchAuditor
+from solar_orientation import OrientationOptimizer
+
+SITE = {"lat": 42.5, "lon": -7.8, "start_date": "2023-03-01", "end_date": "2023-09-30", "peak_power_kwp": 1000}
+
+
+def _clear_sky(start, end):
+    index = pd.date_range(start, f"{end} 23:00", freq="h")
+    index = index[~index.duplicated()]
+    zenith = sun_cache.get_sun_cache().for_index(SITE["lat"], SITE["lon"], index)["apparent_zenith"]
+    mu = np.clip(np.cos(np.radians(zenith)), 0, None)
+    dni = np.where(mu > 0.05, 850.0, 0.0)
+    dhi = 100 * mu
+    return pd.DataFrame({"ghi": dni * mu + dhi, "dni": dni, "dhi": dhi, "temp_air": np.full(len(index), 20.0),
+                         "wind_speed_10m": np.full(len(index), 2.0)}, index=index)
+
+
+@pytest.fixture
+def clear_sky(monkeypatch, fresh_sun_cache, offline_prices):
+    monkeypatch.setattr(DeepResearchAuditor, "get_meteo_data",
+                        lambda self, lat, lon, start, end, variables=None: _clear_sky(start, end))
+
+
+def test_grid_is_ranked_by_revenue_with_the_audit_as_reference(clear_sky):
+    stages = []
+    result = OrientationOptimizer(block=7).run(dict(SITE, azimuths=[90, 135, 180, 225, 270]),
+                                               progress=lambda stage, fraction: stages.append(stage))
+
+    revenues = [entry["revenue_eur"] for entry in result["ranking"]]
+    assert revenues == sorted(revenues, reverse=True) and result["best"] == result["ranking"][0]
+    assert np.array(result["grid"]["revenue_eur"]).shape == (13, 5)
+    assert stages == ["data_fetched", "orientations_done"]
+
+    # Clear sky: south faces produce the most among fixed mounts, a tracker more than any of them
+    fixed = [e for e in result["ranking"] if e["mount"] == "fixed"]
+    assert result["best_yield"]["mount"] == "tracker"
+    grid = np.array(result["grid"]["production_mwh"])
+    assert result["grid"]["azimuths"][int(np.argmax(grid.max(axis=0)))] == 180
+    assert fixed[0]["revenue_eur"] >= result["reference"]["revenue_eur"]
+
+    # The reference is exactly what the deep audit estimates for 30°/180°
+    auditor = DeepResearchAuditor()
+    meteo = auditor.get_meteo_data(SITE["lat"], SITE["lon"], SITE["start_date"], SITE["end_date"])
+    audit = auditor.price_production(auditor.simulate_park(dict(SITE, type="solar"), meteo),
+                                     auditor.get_prices(SITE["start_date"], SITE["end_date"]))
+    assert np.isclose(result["reference"]["revenue_eur"], audit["revenue_eur"], atol=0.02)
+    assert np.isclose(result["reference"]["production_mwh"], audit["production_mwh"], atol=0.02)
+
+
+def test_reference_and_repeated_angles_are_evaluated_once(clear_sky):
+    result = OrientationOptimizer().run(dict(SITE, tilts=[20, 30, 30], azimuths=[180, 200], top=100))
+
+    configurations = [(e["mount"], e["tilt"], e["azimuth"]) for e in result["ranking"]]
+    assert len(configurations) == len(set(configurations)) == 4 + 1
+    assert result["reference"] in result["ranking"] and result["reference"]["revenue_vs_reference_pct"] == 0
+    grid = np.array(result["grid"]["revenue_eur"])
+    assert grid.shape == (3, 2) and grid[1, 0] == grid[2, 0] == result["reference"]["revenue_eur"]
+
+
+def test_invalid_orientations(clear_sky):
+    optimizer = OrientationOptimizer()
+    assert optimizer.run(dict(SITE, tilts=[95])) == {"error": "Tilts must be within 0-90° and azimuths within 0-360°"}
+    assert optimizer.run(dict(SITE, azimuths=[])) == {"error": "tilts and azimuths must be non-empty lists of angles"}
+    too_many = optimizer.run(dict(SITE, tilts=list(range(91)), azimuths=list(range(360))))
+    assert too_many["error"].startswith("Too many orientations")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
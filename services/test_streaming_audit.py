@@ -0,0 +1,78 @@
+"""
+Test Streaming audit (chunked deep audit: same totals, memory of one chunk)
+SyntheticMeteo (conftest.py) replaces Open-Meteo; prices come from the mock.
+"""
+import collections
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from energy_audit_deep_research import DeepResearchAuditor
+from streaming_audit import StreamingAuditor
+
+PARK = {"type": "wind", "lat": 42.5, "lon": -7.8, "turbine_model": "Vestas V90 3MW", "num_turbines": 12}
+
+
+def test_chunked_totals_match_the_deep_audit(synthetic_meteo, offline_prices):
+    config = dict(PARK, start_date="2022-11-15", end_date="2023-02-10", chunk="month", rollup="month",
+                  company_payment=100000)
+    stages = []
+    result = StreamingAuditor().run(config, progress=lambda stage, fraction: stages.append(stage))
+    audit = DeepResearchAuditor().run_audit(config)
+
+    assert result["chunks"] == 4 and stages == ["chunk_done"] * 4
+    for key in ("production_mwh", "revenue_eur", "avg_market_price", "capture_price"):
+        assert np.isclose(result[key], audit[key], atol=0.01), key
+    assert result["hourly_sample"] == audit["hourly_sample"]
+    assert [r["period"] for r in result["rollups"]] == ["2022-11", "2022-12", "2023-01", "2023-02"]
+    assert np.isclose(sum(r["revenue_eur"] for r in result["rollups"]), result["revenue_eur"], atol=0.05)
+    assert sum(r["hours"] for r in result["rollups"]) == result["hours"] == 88 * 24
+    assert result["discrepancy_eur"] == round(result["revenue_eur"] - 100000, 2)
+
+    rows = list(StreamingAuditor().iter_hours(config))
+    assert len(rows) == result["hours"] and rows[0]["time"] == "2022-11-15 00:00:00"
+    assert np.isclose(sum(row["rev"] for row in rows), result["revenue_eur"], atol=0.01)
+
+
+def test_peak_memory_does_not_grow_with_the_period(synthetic_meteo, offline_prices):
+    auditor = StreamingAuditor()
+    # The fixture's call log is test instrumentation: keep it from growing with the period
+    synthetic_meteo.calls = collections.deque(maxlen=1)
+
+    def peak(start, end, **options):
+        config = dict(PARK, start_date=start, end_date=end, chunk="month", **options)
+        auditor.run(config)  # warm caches and imports
+        gc.collect()
+        tracemalloc.start()
+        result = auditor.run(config)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, peak_bytes
+
+    # Keeping 30 years of hours would take ~6 MB. The reference is March, the heaviest month
+    # chunk (DST); on top of one chunk a 30-year run only keeps its running totals, the 30
+    # yearly rollups and the hourly sample
+    _, month_peak = peak("2023-03-01", "2023-03-31")
+    decades, decades_peak = peak("1994-01-01", "2023-12-31")
+    assert decades["chunks"] == 360 and len(decades["rollups"]) == 30
+    assert decades_peak < 1.5 * month_peak
+    # Prefetching keeps a second chunk alive, still not more as the period grows
+    _, prefetch_peak = peak("1994-01-01", "2023-12-31", prefetch=True)
+    assert prefetch_peak < 2.5 * month_peak
+
+
+def test_invalid_config(synthetic_meteo, offline_prices):
+    auditor = StreamingAuditor()
+    weekly = auditor.run(dict(PARK, start_date="2023-01-01", end_date="2023-01-31", chunk="week"))
+    assert weekly == {"error": "chunk and rollup must be 'month' or 'year'"}
+    assert auditor.run(dict(PARK, start_date="2023-02-01", end_date="2023-01-31")) == {"error": "The period is empty"}
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,46 @@
+"""
+Test Sun Cache (solar geometry per site and UTC year, on disk and in memory)
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from pvlib import location
+
+from sun_cache import SunCache
+
+
+def test_years_are_computed_once_and_read_back_from_disk(tmp_path):
+    cache_dir = str(tmp_path)
+    cache = SunCache(cache_dir=cache_dir)
+    hours = np.arange(np.datetime64("2023-06-01T00", "h"), np.datetime64("2023-06-03T00", "h"))
+    first = cache.block([(42.5, -7.8), (42.503, -7.801)], hours)
+    assert first["apparent_zenith"].shape == (2, 48)
+    # Both sites snap to the same 0.01° cell
+    assert cache.computed == 1 and np.array_equal(first["azimuth"][0], first["azimuth"][1])
+
+    again = SunCache(cache_dir=cache_dir).geometry(42.5, -7.8, hours.astype(np.int64))
+    assert np.array_equal(again["airmass"], first["airmass"][0], equal_nan=True)
+
+    reference = location.Location(42.5, -7.8, tz="UTC").get_solarposition(pd.DatetimeIndex(hours).tz_localize("UTC"))
+    assert np.allclose(first["apparent_zenith"][0], reference["apparent_zenith"], atol=1e-3)
+
+
+def test_naive_timestamps_are_local_and_may_span_years(tmp_path):
+    cache = SunCache(cache_dir=str(tmp_path))
+    # Local New Year's Eve to New Year's Day: two UTC years
+    index = pd.date_range("2022-12-31 12:00", "2023-01-01 12:00", freq="h")
+    local = cache.for_index(42.5, -7.8, index, timezone="Europe/Madrid")
+    utc = cache.for_index(42.5, -7.8, index.tz_localize("Europe/Madrid"))
+    assert cache.computed == 2
+    assert np.array_equal(local["apparent_zenith"], utc["apparent_zenith"])
+    # Solar noon at -7.8° is ~12:34 UTC in winter: nearest hour 14:00 local (13:00 if read as UTC)
+    assert index[np.argmin(local["apparent_zenith"][:12])].hour == 14
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,71 @@
+"""
+Test Uncertainty Audit (Monte Carlo bands around the deep audit)
+SyntheticMeteo (conftest.py) replaces Open-Meteo; prices come from the mock.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import uncertainty
+from uncertainty import DEFAULT_SPREADS, MAX_SCENARIOS, MEAN_AVAILABILITY, UncertaintyAuditor
+
+WIND_PARK = {"type": "wind", "lat": 42.5, "lon": -7.8, "turbine_model": "Vestas V90 3MW", "num_turbines": 5,
+             "start_date": "2023-05-01", "end_date": "2023-05-31"}
+
+
+def test_without_spread_every_scenario_is_the_point_estimate_times_availability(synthetic_meteo, offline_prices):
+    auditor = UncertaintyAuditor()
+    meteo = synthetic_meteo.frame("2023-05-01", "2023-05-31")
+    prices = auditor.auditor.get_prices("2023-05-01", "2023-05-31")
+    expected = auditor.auditor.price_production(auditor.auditor.simulate_park(WIND_PARK, meteo), prices)
+
+    config = dict(WIND_PARK, scenarios=50, spreads={name: 0.0 for name in DEFAULT_SPREADS})
+    default = auditor.run(config)
+    full = auditor.run(dict(config, availability=1.0))
+    assert default["availability"] == MEAN_AVAILABILITY == 0.97
+    for band in ("p90", "p50", "p10"):
+        # The default 97% availability, then the deterministic audit itself
+        assert np.isclose(default["revenue_eur"][band], 0.97 * expected["revenue_eur"], rtol=1e-4)
+        assert np.isclose(default["production_mwh"][band], 0.97 * expected["production_mwh"], atol=0.01)
+        assert np.isclose(full["revenue_eur"][band], expected["revenue_eur"], rtol=1e-4)
+        assert np.isclose(full["production_mwh"][band], expected["production_mwh"], rtol=1e-6)
+
+
+def test_bands_are_ordered_and_reproducible(monkeypatch, synthetic_meteo, offline_prices):
+    # Small chunks: many of them, on one or several workers
+    monkeypatch.setattr(uncertainty, "CHUNK_MB", 0.5)
+    config = dict(WIND_PARK, scenarios=2000, seed=3, company_payment=1000)
+
+    stages = []
+    result = UncertaintyAuditor(workers=1).run(config, progress=lambda stage, fraction: stages.append(stage))
+    again = UncertaintyAuditor(workers=4).run(config)
+
+    assert result == again
+    revenue = result["revenue_eur"]
+    assert revenue["p90"] < revenue["p50"] < revenue["p10"]
+    # Availability below 100% moves the bulk of the scenarios under the point estimate
+    assert revenue["p50"] < result["point_estimate"]["revenue_eur"] < revenue["p10"]
+    assert result["underpaid_probability"] == 1.0
+    assert result["discrepancy_eur"]["p90"] == round(revenue["p90"] - 1000, 2)
+    assert stages == ["data_fetched", "simulation_done", "scenarios_done"]
+
+
+def test_solar_and_invalid_requests(synthetic_meteo, offline_prices):
+    auditor = UncertaintyAuditor()
+    solar = {"type": "solar", "lat": 42.5, "lon": -7.8, "peak_power_kwp": 1000,
+             "start_date": "2023-05-01", "end_date": "2023-05-31", "scenarios": 500}
+    result = auditor.run(solar)
+    assert result["production_mwh"]["p90"] < result["production_mwh"]["p10"]
+    assert "company_payment_eur" not in result
+
+    assert auditor.run(dict(solar, scenarios=0)) == {"error": f"scenarios must be between 1 and {MAX_SCENARIOS}"}
+    assert auditor.run(dict(solar, availability=0)) == {"error": "availability must be in (0, 1]"}
+    assert auditor.run(dict(WIND_PARK, turbine_model="Nope 1MW"))["error"].startswith("Simulation failed")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,77 @@
+"""
+Test Wake Model (directional Jensen wakes per turbine, layout parsing)
+SyntheticMeteo (conftest.py) series; no network, no Supabase.
+"""
+import os
+import struct
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from energy_audit_deep_research import DeepResearchAuditor
+from wake_model import WakeModel, parse_layout
+
+# Two turbines ~450 m (5 rotor diameters) apart on a north-south line
+PAIR = [{"id": "N", "lat": 42.5, "lon": -7.8, "model": "Vestas V90 3MW"},
+        {"id": "S", "lat": 42.49595, "lon": -7.8, "model": "Vestas V90 3MW"}]
+
+
+def test_downstream_turbine_only_loses_power_in_aligned_directions():
+    model = WakeModel(parse_layout(PAIR), k=0.075)
+    # From the north, the south, the west, and unknown
+    out = model.run(np.full(4, 9.0), np.full(4, 7.0), np.array([0.0, 180.0, 270.0, np.nan]),
+                    np.full(4, 15.0), np.full(4, 1000.0))
+
+    deficit = out["deficit"]
+    assert deficit[0, 0] == 0 and 0.1 < deficit[0, 1] < 0.3  # S behind N
+    assert deficit[1, 1] == 0 and np.isclose(deficit[1, 0], deficit[0, 1])  # N behind S
+    assert not deficit[2:].any()
+    assert out["power_kw"][0, 1] < out["free_power_kw"][0, 1]
+    assert np.array_equal(out["power_kw"][2], out["free_power_kw"][2])
+
+
+def test_layout_from_table_rows_matches_short_model_names():
+    lon, lat = -7.8, 42.5
+    ewkb = struct.pack("<BIIdd", 1, 0x20000001, 4326, lon, lat).hex()
+    rows = [{"id": 1, "model": "Vestas V90", "hub_height": 105, "geom": ewkb},
+            {"id": 2, "model": "Vestas V90", "geom": "SRID=4326;POINT(-7.806 42.5)"},
+            {"id": 3, "model": "Vestas V90", "geom": {"type": "Point", "coordinates": [-7.812, 42.5]}}]
+    layout = parse_layout(rows)
+
+    assert np.allclose(layout.lats, 42.5) and np.allclose(layout.lons, [-7.8, -7.806, -7.812])
+    assert [m.name for m in layout.models] == ["Vestas V90 3MW"] * 3
+    assert layout.hub_heights[0] == 105
+    # ~490 m between neighbours, centred on the middle turbine
+    assert np.isclose(layout.x[1], 0, atol=1e-6) and 480 < layout.x[0] - layout.x[1] < 500
+
+
+def test_deep_audit_keeps_per_turbine_production(synthetic_meteo):
+    # Steady 9 m/s from the four cardinal directions
+    meteo = synthetic_meteo.frame("2023-06-01", "2023-06-01", ["wind_direction_100m"]).iloc[:4].assign(
+        wind_speed_100m=9.0, wind_speed_10m=7.0, wind_direction_100m=[0.0, 90.0, 180.0, 270.0])
+    park = {"type": "wind", "lat": 42.5, "lon": -7.8, "turbines": PAIR}
+    production = DeepResearchAuditor().simulate_park(park, meteo)
+
+    turbines = production.attrs["turbines"]
+    assert [t["id"] for t in turbines] == ["N", "S"]
+    assert np.isclose(production.sum() / 1000, sum(t["production_mwh"] for t in turbines), atol=0.01)
+    # Each one is waked in one hour out of four
+    assert all(5 < t["wake_loss_pct"] < 20 for t in turbines)
+
+
+
+def test_only_layout_audits_request_the_wind_direction(synthetic_meteo, offline_prices):
+    period = {"type": "wind", "lat": 42.5, "lon": -7.8, "start_date": "2023-06-01", "end_date": "2023-06-07"}
+    auditor = DeepResearchAuditor()
+    layout = auditor.run_audit(dict(period, turbines=PAIR))
+    auditor.run_audit(dict(period, turbine_model="Vestas V90 3MW", num_turbines=2))
+
+    assert [t["id"] for t in layout["turbines"]] == ["N", "S"]
+    assert ["wind_direction_100m" in variables for _, _, variables in synthetic_meteo.calls] == [True, False]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
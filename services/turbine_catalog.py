@@ -0,0 +1,166 @@
+"""
+Turbine Catalog: one source of truth for wind turbine models.
+
+Models are loaded from turbine_catalog.json (or TURBINE_CATALOG_PATH) and
+each power/thrust curve is compiled once into a dense lookup table
+(power_curve.py), so evaluating a series costs the same for every model.
+
+Adding a model = adding an entry to the JSON file:
+
+    "Vendor Model X": {
+      "rated_power_kw": 4200, "hub_height_m": 120, "rotor_diameter_m": 136,
+      "cut_in_ms": 3.0, "rated_speed_ms": 12.0, "cut_out_ms": 25.0,
+      "density_correction": "power" | "speed" | "none",
+      "power_curve": [[speed, kW], ...],       (optional: cubic law if missing)
+      "thrust_curve": [[speed, Ct], ...]
+    }
+
+Density correction (air density rho vs 1.225 kg/m3):
+- power: P(v) * rho / rho_0 (simple scaling)
+- speed: P(v * (rho / rho_0)^(1/3)) (IEC 61400-12 equivalent wind speed)
+- none: curve used as is
+
+Usage:
+    from turbine_catalog import get_catalog
+    turbine = get_catalog().get("Vestas V90 3MW")     # ValueError if unknown
+    power_kw = turbine.power(v_hub, air_density=rho)
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from lazy_imports import lazy_module
+from power_curve import PowerCurve
+
+np = lazy_module("numpy")
+
+DEFAULT_CATALOG_PATH = os.environ.get(
+    "TURBINE_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "turbine_catalog.json")
+)
+
+RHO_0 = 1.225  # kg/m3, density the curves are given at
+DENSITY_MODES = ("power", "speed", "none")
+REQUIRED_FIELDS = ("rated_power_kw", "hub_height_m", "rotor_diameter_m", "cut_in_ms", "rated_speed_ms", "cut_out_ms")
+
+
+class TurbineModel:
+    """One catalog entry with its compiled power and thrust curves."""
+
+    def __init__(self, name: str, rated_power: float, hub_height: float, rotor_diameter: float,
+                 cut_in: float, rated_speed: float, cut_out: float, power_curve: PowerCurve,
+                 thrust_curve: Optional[PowerCurve] = None, density_correction: str = "power"):
+        if density_correction not in DENSITY_MODES:
+            raise ValueError(f"{name}: density_correction must be one of {DENSITY_MODES}")
+        self.name = name
+        self.rated_power = rated_power
+        self.hub_height = hub_height
+        self.rotor_diameter = rotor_diameter
+        self.cut_in = cut_in
+        self.rated_speed = rated_speed
+        self.cut_out = cut_out
+        self.power_curve = power_curve.compile()
+        self.thrust_curve = thrust_curve.compile() if thrust_curve is not None else None
+        self.density_correction = density_correction
+
+    @property
+    def rotor_radius(self) -> float:
+        return self.rotor_diameter / 2
+
+    @classmethod
+    def from_entry(cls, name: str, entry: Dict) -> "TurbineModel":
+        missing = [field for field in REQUIRED_FIELDS if field not in entry]
+        if missing:
+            raise ValueError(f"{name}: missing {', '.join(missing)}")
+
+        cut_out = float(entry["cut_out_ms"])
+        if entry.get("power_curve"):
+            power_curve = PowerCurve.from_table(entry["power_curve"], cut_out=cut_out)
+        else:
+            power_curve = PowerCurve.cubic(float(entry["rated_power_kw"]), float(entry["cut_in_ms"]),
+                                           float(entry["rated_speed_ms"]), cut_out)
+        thrust_curve = None
+        if entry.get("thrust_curve"):
+            thrust_curve = PowerCurve.from_table(entry["thrust_curve"], cut_out=cut_out)
+
+        return cls(
+            name=name,
+            rated_power=float(entry["rated_power_kw"]),
+            hub_height=float(entry["hub_height_m"]),
+            rotor_diameter=float(entry["rotor_diameter_m"]),
+            cut_in=float(entry["cut_in_ms"]),
+            rated_speed=float(entry["rated_speed_ms"]),
+            cut_out=cut_out,
+            power_curve=power_curve,
+            thrust_curve=thrust_curve,
+            density_correction=entry.get("density_correction", "power")
+        )
+
+    def power(self, wind_speed, air_density=None):
+        """Power (kW) per turbine for hub-height wind speeds, density corrected if given."""
+        if air_density is None or self.density_correction == "none":
+            return self.power_curve.power(wind_speed)
+        density_ratio = np.asarray(air_density, dtype=float) / RHO_0
+        if self.density_correction == "speed":
+            return self.power_curve.power(np.asarray(wind_speed, dtype=float) * np.cbrt(density_ratio))
+        return self.power_curve.power(wind_speed) * density_ratio
+
+    def thrust_coefficient(self, wind_speed):
+        """Thrust coefficient Ct for hub-height wind speeds (for wake models)."""
+        if self.thrust_curve is None:
+            raise ValueError(f"No thrust curve for turbine: {self.name}")
+        return self.thrust_curve.power(wind_speed)
+
+    def specs(self) -> Dict:
+        """Flat spec dict (format of AdvancedEnergyAuditor.turbine_models)."""
+        return {
+            "rated_power": self.rated_power,
+            "cut_in": self.cut_in,
+            "rated_speed": self.rated_speed,
+            "cut_out": self.cut_out,
+            "hub_height": self.hub_height,
+            "rotor_radius": self.rotor_radius
+        }
+
+    def __repr__(self):
+        return f"<TurbineModel {self.name} {self.rated_power:g} kW H={self.hub_height:g} D={self.rotor_diameter:g}>"
+
+
+class TurbineCatalog:
+    def __init__(self, models: Dict[str, TurbineModel]):
+        self.models = models
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CATALOG_PATH) -> "TurbineCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls({name: TurbineModel.from_entry(name, entry) for name, entry in data["models"].items()})
+
+    def get(self, name: str) -> TurbineModel:
+        model = self.models.get(name)
+        if model is None:
+            raise ValueError(f"Unknown turbine: {name}")
+        return model
+
+    def names(self) -> List[str]:
+        return list(self.models)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.models
+
+    def __iter__(self):
+        return iter(self.models.values())
+
+
+_catalog: Optional[TurbineCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> TurbineCatalog:
+    """Process-wide catalog; loaded and compiled on first use."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = TurbineCatalog.load()
+        return _catalog
@@ -0,0 +1,218 @@
+"""
+Wake Model: layout-aware Jensen (Park) wakes, turbine by turbine.
+
+A turbine behind another one sees a slower wind. With the turbine positions
+the loss depends on the wind direction, so per layout:
+
+    1. once: for every direction sector and every pair (upstream i,
+       downstream j), the geometric part of the Jensen deficit
+           G[s, j, i] = (R_i / (R_i + k x))^2 * overlap(wake of i, rotor of j)
+       where x is the downwind distance in that sector (0 if j is not behind i)
+    2. every hour: a_i = 1 - sqrt(1 - Ct_i(v)) from the catalog thrust curve,
+       deficits combined as a root sum of squares:
+           deficit_j^2 = sum_i a_i^2 * G[s, j, i]^2
+       i.e. one (hours x turbines) @ (turbines x turbines) product per sector,
+       blended linearly between the two sectors around the actual direction
+
+    layout = parse_layout([{"id": "A01", "lat": 42.51, "lon": -7.81, "model": "Vestas V90 3MW"}, ...])
+    model = WakeModel(layout, k=WAKE_DECAY["forest"])
+    out = model.run(v100, v10, direction, temp_air, pressure)
+    out["power_kw"]       # hours x turbines, with wakes
+    out["free_power_kw"]  # hours x turbines, without wakes
+
+Turbines may come from the wind_turbines table (model, hub_height,
+rotor_radius, geom as GeoJSON, WKT or EWKB hex) or from an input list.
+Simplifications: free-stream Ct for each upstream turbine, hub height
+differences ignored for the overlap, flat terrain.
+"""
+import math
+import os
+import struct
+from typing import Dict, List, Optional
+
+from energy_audit_deep_research import WAKE_DECAY, air_density, shear_exponent
+from lazy_imports import lazy_module
+from turbine_catalog import get_catalog
+
+np = lazy_module("numpy")
+
+WAKE_SECTORS = int(os.environ.get("WAKE_SECTORS", 72))  # 5 degrees
+# Thrust coefficient for catalog models without a thrust curve, while producing
+DEFAULT_CT = 0.8
+EARTH_RADIUS_M = 6371000.0
+
+
+# --- LAYOUT ---
+
+def _parse_point(geom) -> tuple:
+    """(lon, lat) from GeoJSON, WKT "POINT(lon lat)" or (E)WKB hex as PostGIS returns it."""
+    if isinstance(geom, dict):
+        lon, lat = geom["coordinates"][:2]
+        return float(lon), float(lat)
+    text = str(geom).strip()
+    if text.upper().startswith(("POINT", "SRID=")):
+        inside = text[text.index("(") + 1:text.index(")")].split()
+        return float(inside[0]), float(inside[1])
+    raw = bytes.fromhex(text)
+    endian = "<" if raw[0] == 1 else ">"
+    geometry_type = struct.unpack(endian + "I", raw[1:5])[0]
+    offset = 9 if geometry_type & 0x20000000 else 5  # EWKB with SRID
+    if geometry_type & 0xFF != 1:
+        raise ValueError("Turbine geometry is not a point")
+    lon, lat = struct.unpack(endian + "dd", raw[offset:offset + 16])
+    return lon, lat
+
+
+def _catalog_model(name: str):
+    catalog = get_catalog()
+    if name in catalog:
+        return catalog.get(name)
+    # The table stores short names ("Vestas V90"): match a unique catalog prefix
+    matches = [m for m in catalog.names() if m.lower().startswith(name.lower())]
+    if len(matches) != 1:
+        raise ValueError(f"Unknown turbine: {name}")
+    return catalog.get(matches[0])
+
+
+class Layout:
+    """Turbine positions in meters (x east, y north) around the park centroid."""
+
+    def __init__(self, ids: List, models: List, lats, lons, hub_heights, radii):
+        self.ids = ids
+        self.models = models
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.hub_heights = np.asarray(hub_heights, dtype=float)
+        self.radii = np.asarray(radii, dtype=float)
+        lat0 = math.radians(self.lats.mean())
+        self.x = np.radians(self.lons - self.lons.mean()) * EARTH_RADIUS_M * math.cos(lat0)
+        self.y = np.radians(self.lats - self.lats.mean()) * EARTH_RADIUS_M
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def parse_layout(turbines: List[Dict], default_model: Optional[str] = None) -> Layout:
+    """
+    Turbines as {"id", "lat", "lon", "model"} or wind_turbines rows
+    {"id", "model", "hub_height", "rotor_radius", "geom"}. Table values for
+    hub height and rotor radius override the catalog ones.
+    """
+    if not turbines:
+        raise ValueError("The park has no turbines")
+    ids, models, lats, lons, hubs, radii = [], [], [], [], [], []
+    for index, turbine in enumerate(turbines):
+        model = _catalog_model(turbine.get("model") or default_model or "")
+        if turbine.get("geom") is not None:
+            lon, lat = _parse_point(turbine["geom"])
+        else:
+            lat, lon = float(turbine["lat"]), float(turbine["lon"])
+        ids.append(turbine.get("id", index))
+        models.append(model)
+        lats.append(lat)
+        lons.append(lon)
+        hubs.append(float(turbine.get("hub_height") or model.hub_height))
+        radii.append(float(turbine.get("rotor_radius") or model.rotor_radius))
+    return Layout(ids, models, lats, lons, hubs, radii)
+
+
+# --- JENSEN ---
+
+def _overlap_fraction(distance, wake_radius, rotor_radius):
+    """Share of the downstream rotor area inside the wake circle."""
+    d, rw, r = np.broadcast_arrays(distance, wake_radius, rotor_radius)
+    fraction = np.zeros(d.shape)
+    full = d <= rw - r
+    fraction[full] = 1.0
+    inner = d <= r - rw  # wake narrower than the rotor
+    fraction[inner] = (rw[inner] / r[inner]) ** 2
+    partial = ~full & ~inner & (d < rw + r)
+    dp, rwp, rp = d[partial], rw[partial], r[partial]
+    a = np.clip((dp ** 2 + rwp ** 2 - rp ** 2) / (2 * dp * rwp), -1, 1)
+    b = np.clip((dp ** 2 + rp ** 2 - rwp ** 2) / (2 * dp * rp), -1, 1)
+    lens = (rwp ** 2 * np.arccos(a) + rp ** 2 * np.arccos(b)
+            - 0.5 * np.sqrt(np.clip((-dp + rwp + rp) * (dp + rwp - rp) * (dp - rwp + rp) * (dp + rwp + rp), 0, None)))
+    fraction[partial] = lens / (np.pi * rp ** 2)
+    return fraction
+
+
+def sector_matrices(layout: Layout, k: float, sectors: int = WAKE_SECTORS) -> "np.ndarray":
+    """G[s, j, i]: geometric Jensen deficit of turbine j behind turbine i, wind from sector s."""
+    theta = np.radians(np.arange(sectors) * 360.0 / sectors)
+    # Wind FROM theta blows towards (-sin, -cos)
+    down_x, down_y = -np.sin(theta)[:, None, None], -np.cos(theta)[:, None, None]
+    dx = layout.x[None, :] - layout.x[:, None]  # [i, j]: j relative to i
+    dy = layout.y[None, :] - layout.y[:, None]
+    downwind = dx[None] * down_x + dy[None] * down_y
+    crosswind = np.abs(dx[None] * down_y - dy[None] * down_x)
+
+    upstream_radius = layout.radii[None, :, None]
+    behind = downwind > 0
+    x = np.where(behind, downwind, 0.0)
+    wake_radius = upstream_radius + k * x
+    geometric = (upstream_radius / wake_radius) ** 2 * _overlap_fraction(crosswind, wake_radius,
+                                                                           layout.radii[None, None, :])
+    geometric = np.where(behind, geometric, 0.0)
+    return geometric.transpose(0, 2, 1)  # [s, j, i]
+
+
+class WakeModel:
+    def __init__(self, layout: Layout, k: float = WAKE_DECAY["forest"], sectors: int = WAKE_SECTORS):
+        self.layout = layout
+        self.k = k
+        self.sectors = sectors
+        # Squared, transposed for a2 @ G2[s]: hours x upstream @ upstream x downstream
+        self.g2 = (sector_matrices(layout, k, sectors) ** 2).transpose(0, 2, 1).copy()
+        self._groups = {}
+        for column, model in enumerate(layout.models):
+            self._groups.setdefault(model.name, (model, []))[1].append(column)
+
+    def _thrust(self, v_free):
+        ct = np.zeros(v_free.shape)
+        for model, columns in self._groups.values():
+            if model.thrust_curve is not None:
+                ct[:, columns] = model.thrust_coefficient(v_free[:, columns])
+            else:
+                ct[:, columns] = np.where(model.power(v_free[:, columns]) > 0, DEFAULT_CT, 0.0)
+        return np.clip(ct, 0.0, 0.999)
+
+    def _power(self, v, rho):
+        power = np.zeros(v.shape)
+        for model, columns in self._groups.values():
+            power[:, columns] = model.power(v[:, columns], air_density=rho)
+        return power
+
+    def deficits(self, v_free, direction):
+        """Velocity deficit (0..1) per hour and turbine for free-stream hub speeds and directions."""
+        a2 = (1 - np.sqrt(1 - self._thrust(v_free))) ** 2
+        position = np.mod(np.nan_to_num(direction), 360.0) / (360.0 / self.sectors)
+        lower = np.floor(position).astype(np.int64) % self.sectors
+        weight = (position - np.floor(position))[:, None]
+        upper = (lower + 1) % self.sectors
+
+        deficit2 = np.empty(v_free.shape)
+        for sector in np.unique(lower):
+            rows = np.flatnonzero(lower == sector)
+            deficit2[rows] = ((1 - weight[rows]) * (a2[rows] @ self.g2[sector])
+                              + weight[rows] * (a2[rows] @ self.g2[upper[rows[0]]]))
+        deficit = np.sqrt(deficit2)
+        # Unknown direction: no wake rather than a guess
+        deficit[np.isnan(direction)] = 0.0
+        return np.clip(deficit, 0.0, 1.0)
+
+    def run(self, wind_speed_100m, wind_speed_10m, direction, temp_air, pressure) -> Dict:
+        """
+        Hourly power per turbine (hours x turbines, kW) from ERA5 series (hours,):
+        shear to each hub height, air density, Jensen wakes.
+        """
+        v100 = np.asarray(wind_speed_100m, dtype=float)
+        alpha = shear_exponent(v100, np.asarray(wind_speed_10m, dtype=float))
+        v_free = v100[:, None] * (self.layout.hub_heights[None, :] / 100) ** alpha[:, None]
+        rho = air_density(np.asarray(temp_air, dtype=float), np.asarray(pressure, dtype=float))[:, None]
+
+        deficit = self.deficits(v_free, np.asarray(direction, dtype=float))
+        return {
+            "power_kw": self._power(v_free * (1 - deficit), rho),
+            "free_power_kw": self._power(v_free, rho),
+            "deficit": deficit
+        }
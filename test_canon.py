@@ -1,4 +1,7 @@
-from services.canon_indexer import CanonIndexer
+import sys
+sys.path.append('services')
+
+from canon_indexer import CanonIndexer
 import json
 
 try:
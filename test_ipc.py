@@ -1,4 +1,7 @@
-from services.ipc_rent_update import IPCRentUpdater
+import sys
+sys.path.append('services')
+
+from ipc_rent_update import IPCRentUpdater
 import json
 
 try: